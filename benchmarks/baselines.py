@@ -0,0 +1,45 @@
+"""
+Stores benchmark results as JSON baselines and compares new results with them.
+"""
+import json
+import os
+import typing
+
+
+def load_baseline(path: str) -> typing.Optional[typing.Dict[str, float]]:
+    if not os.path.exists(path):
+        return None
+
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_baseline(path: str, values: typing.Dict[str, float]) -> None:
+    with open(path, "w") as f:
+        json.dump(values, f, indent=4)
+        f.write("\n")
+
+
+def get_regressions(
+    values: typing.Dict[str, float],
+    baseline: typing.Dict[str, float],
+    tolerance: float,
+    min_regression: float = 0,
+) -> typing.List[str]:
+    """
+    Returns a description of every value exceeding its baseline by more than
+    `tolerance` (a fraction of the baseline) plus `min_regression`. Values
+    without a baseline are ignored.
+    """
+    regressions = []
+    for name, value in values.items():
+        baseline_value = baseline.get(name)
+        if baseline_value is None:
+            continue
+
+        if value > baseline_value * (1 + tolerance) + min_regression:
+            regressions.append(
+                "{}: {:.2f}, baseline {:.2f}".format(name, value, baseline_value)
+            )
+
+    return regressions
@@ -0,0 +1,409 @@
+"""
+Times the CPU hot paths run for every row of an import or every created
+resource, on synthetic payloads generated from the schema field definitions:
+`utils.validate_marshmallow_schema` for every read schema, with the details
+schemas projected like an import and like the state read of structure plans, the
+`ResourceInsights` pre/post-load flattening,
+`utils.convert_schema_list_and_dict_fields_to_json_string` on large creative and
+ad group payloads and the `json.dumps(indent=4)` of the uploader.
+
+Costs are reported in microseconds per row (per payload for the conversions) and, to compare them between
+machines, in units of a fixed pure Python calibration workload timed before
+every repeat. Both are medians over the repeats, so a single slow repeat does
+not move them. The relative costs are compared with a stored baseline, and the
+run fails when a benchmark regresses by more than the tolerance.
+
+    python -m benchmarks.hot_paths --rows 10000
+    python -m benchmarks.hot_paths --save-baseline
+"""
+import argparse
+import dataclasses
+import functools
+import gc
+import json
+import os
+import statistics
+import sys
+import time
+import typing
+
+import marshmallow
+
+from benchmarks import baselines
+from tiktok_manager import utils
+from tiktok_manager.integrations.clients.tiktok import client as tiktok_client
+from tiktok_manager.integrations.clients.tiktok import (
+    constants as tiktok_client_constants,
+)
+from tiktok_manager.integrations.clients.tiktok import schemas as tiktok_schemas
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "hot_paths_baseline.json")
+ADVERTISER_ID = "7000000000000000000"
+LIST_SIZE = 3
+LARGE_PAYLOAD_LIST_SIZE = 100
+REPEATS = 7
+CALIBRATION_ITERATIONS = 100000
+
+# Read schemas wrapping a list of records in their pre_load hook, with the
+# schema of one record.
+READ_SCHEMAS = [
+    (tiktok_schemas.AdAccounts, tiktok_schemas.AdAccount),
+    (tiktok_schemas.ImageDetailsResponse, tiktok_schemas.ImageDetails),
+    (tiktok_schemas.VideoDetailsResponse, tiktok_schemas.VideoDetails),
+]
+# Details schemas are validated projected on the fetched fields: the default
+# fields of an import, and the matching and state fields of a structure plan.
+DETAILS_PROJECTIONS = [
+    (resource_type, "", None)
+    for resource_type in tiktok_client_constants.TIKTOK_RESOURCE_DETAILS_SCHEMAS
+] + [
+    (
+        resource_type,
+        " state",
+        tiktok_client_constants.TIKTOK_RESOURCE_MATCHING_FIELDS[resource_type]
+        + tiktok_client_constants.TIKTOK_RESOURCE_STATE_FIELDS[resource_type],
+    )
+    for resource_type in tiktok_client_constants.TIKTOK_RESOURCE_DETAILS_SCHEMAS
+]
+# Insights reports, with the metrics and dimensions schemas of one row.
+INSIGHTS_SCHEMAS = [
+    (
+        tiktok_schemas.CampaignInsightsReport,
+        tiktok_schemas.CampaignInsightMetrics,
+        tiktok_schemas.CampaignInsightDimensions,
+    ),
+    (
+        tiktok_schemas.AdGroupInsightsReport,
+        tiktok_schemas.AdGroupInsightMetrics,
+        tiktok_schemas.AdGroupInsightDimensions,
+    ),
+    (
+        tiktok_schemas.AdInsightsReport,
+        tiktok_schemas.AdInsightsMetrics,
+        tiktok_schemas.AdInsightDimensions,
+    ),
+]
+PAYLOAD_SCHEMAS = [tiktok_schemas.CreativeCreate, tiktok_schemas.AdGroupCreate]
+
+
+@dataclasses.dataclass
+class BenchmarkResult:
+    name: str
+    seconds_per_row: float
+    relative_cost: float
+
+    @property
+    def microseconds_per_row(self) -> float:
+        return self.seconds_per_row * 1e6
+
+
+def get_field_value(
+    field: marshmallow.fields.Field, name: str, index: int, list_size: int
+) -> typing.Any:
+    if isinstance(field, marshmallow.fields.Nested):
+        if field.many:
+            return [
+                get_record(schema=field.schema, index=index, list_size=list_size)
+                for _ in range(list_size)
+            ]
+        return get_record(schema=field.schema, index=index, list_size=list_size)
+    if isinstance(field, marshmallow.fields.List):
+        return [
+            get_field_value(
+                field=field.inner, name=name, index=index + item, list_size=list_size
+            )
+            for item in range(list_size)
+        ]
+    if isinstance(field, marshmallow.fields.Dict):
+        return {"{}_{}".format(name, item): item for item in range(list_size)}
+    if isinstance(field, marshmallow.fields.Boolean):
+        return index % 2 == 0
+    if isinstance(field, marshmallow.fields.Float):
+        return index / 3
+    if isinstance(field, marshmallow.fields.Number):
+        return index
+    return "{}_{}".format(name, index)
+
+
+def get_record(
+    schema: marshmallow.Schema,
+    index: int,
+    list_size: int = LIST_SIZE,
+    by_data_key: bool = True,
+) -> typing.Dict:
+    """
+    Returns a record filling every field of `schema`, keyed by the field data keys
+    as sent by the API, or by the field names as passed to post_load hooks.
+    """
+    return {
+        (field.data_key or name if by_data_key else name): get_field_value(
+            field=field, name=name, index=index, list_size=list_size
+        )
+        for name, field in schema.fields.items()
+    }
+
+
+def get_insights_row(
+    metrics_schema: marshmallow.Schema,
+    dimensions_schema: marshmallow.Schema,
+    index: int,
+) -> typing.Dict:
+    return {
+        "metrics": get_record(schema=metrics_schema, index=index),
+        "dimensions": get_record(schema=dimensions_schema, index=index),
+    }
+
+
+def validate_schema(
+    data: typing.List[typing.Dict], schema: marshmallow.Schema
+) -> typing.Dict:
+    validated_data = utils.validate_marshmallow_schema(data=data, schema=schema)
+    if validated_data is None:
+        raise ValueError(
+            "Synthetic data is not valid for schema (schema={})".format(
+                schema.__class__.__name__
+            )
+        )
+
+    return validated_data
+
+
+def get_seconds(func: typing.Callable[[], typing.Any]) -> float:
+    """
+    Returns the CPU time of one call of `func`, which unlike the wall time does
+    not count the time the process waits for a shared CPU. The garbage collector
+    is paused like `timeit` does, as its collections would land in random
+    repeats.
+    """
+    gc.collect()
+    gc.disable()
+    try:
+        started_at = time.process_time()
+        func()
+        return time.process_time() - started_at
+    finally:
+        gc.enable()
+
+
+def calibrate() -> None:
+    """
+    A fixed workload of dictionary, string and integer operations similar to
+    those of the benchmarks.
+    """
+    record = {}
+    for index in range(CALIBRATION_ITERATIONS):
+        record["key_{}".format(index % 32)] = str(index)
+
+
+def measure(
+    name: str, func: typing.Callable[[], typing.Any], rows_count: int
+) -> BenchmarkResult:
+    """
+    Times `REPEATS` calls of `func`, each right after the calibration workload so
+    both run under the same machine load, and keeps the medians of the time per
+    row and of its ratio to the calibration time per iteration.
+    """
+    seconds_per_row = []
+    relative_costs = []
+    for _ in range(REPEATS):
+        calibration_seconds = get_seconds(func=calibrate) / CALIBRATION_ITERATIONS
+        seconds_per_row.append(get_seconds(func=func) / rows_count)
+        relative_costs.append(seconds_per_row[-1] / calibration_seconds)
+
+    return BenchmarkResult(
+        name=name,
+        seconds_per_row=statistics.median(seconds_per_row),
+        relative_cost=statistics.median(relative_costs),
+    )
+
+
+def get_benchmarks(
+    rows_count: int,
+) -> typing.List[typing.Tuple[str, typing.Callable[[], typing.Any], int]]:
+    benchmarks = []
+    for schema_class, record_schema_class in READ_SCHEMAS:
+        records = [
+            get_record(schema=record_schema_class(), index=index)
+            for index in range(rows_count)
+        ]
+        benchmarks.append(
+            (
+                "validate {}".format(schema_class.__name__),
+                functools.partial(validate_schema, data=records, schema=schema_class()),
+                rows_count,
+            )
+        )
+
+    for resource_type, name_suffix, fields in DETAILS_PROJECTIONS:
+        (
+            schema_class,
+            nested_field_name,
+        ) = tiktok_client_constants.TIKTOK_RESOURCE_DETAILS_SCHEMAS[resource_type]
+        schema = tiktok_client.TiktokClient._get_projected_schema(
+            schema_class=schema_class,
+            nested_field_name=nested_field_name,
+            fields=tiktok_client.TiktokClient._get_resource_details_fields(
+                resource_type=resource_type, fields=fields
+            ),
+        )
+        records = [
+            get_record(schema=schema.fields[nested_field_name].schema, index=index)
+            for index in range(rows_count)
+        ]
+        benchmarks.append(
+            (
+                "validate {}{}".format(schema_class.__name__, name_suffix),
+                functools.partial(validate_schema, data=records, schema=schema),
+                rows_count,
+            )
+        )
+
+    for schema_class, metrics_schema_class, dimensions_schema_class in INSIGHTS_SCHEMAS:
+        rows = [
+            get_insights_row(
+                metrics_schema=metrics_schema_class(),
+                dimensions_schema=dimensions_schema_class(),
+                index=index,
+            )
+            for index in range(rows_count)
+        ]
+        benchmarks.append(
+            (
+                "validate {}".format(schema_class.__name__),
+                functools.partial(
+                    validate_schema,
+                    data=rows,
+                    schema=schema_class(advertiser_id=ADVERTISER_ID),
+                ),
+                rows_count,
+            )
+        )
+
+    insights_schema = tiktok_schemas.AdInsights()
+    insights_rows = [
+        get_insights_row(
+            metrics_schema=tiktok_schemas.AdInsightsMetrics(),
+            dimensions_schema=tiktok_schemas.AdInsightDimensions(),
+            index=index,
+        )
+        for index in range(rows_count)
+    ]
+    flattened_rows = [insights_schema.pre_process_data(row) for row in insights_rows]
+    benchmarks.append(
+        (
+            "ResourceInsights.pre_process_data",
+            lambda: [insights_schema.pre_process_data(row) for row in insights_rows],
+            rows_count,
+        )
+    )
+    benchmarks.append(
+        (
+            "ResourceInsights.post_process_data",
+            lambda: [
+                insights_schema.post_process_data(dict(row)) for row in flattened_rows
+            ],
+            rows_count,
+        )
+    )
+
+    payloads_count = max(1, rows_count // LARGE_PAYLOAD_LIST_SIZE)
+    for schema_class in PAYLOAD_SCHEMAS:
+        payload = get_record(
+            schema=schema_class(),
+            index=0,
+            list_size=LARGE_PAYLOAD_LIST_SIZE,
+            by_data_key=False,
+        )
+        benchmarks.append(
+            (
+                "convert {}".format(schema_class.__name__),
+                lambda payload=payload: [
+                    utils.convert_schema_list_and_dict_fields_to_json_string(
+                        data=dict(payload)
+                    )
+                    for _ in range(payloads_count)
+                ],
+                payloads_count,
+            )
+        )
+
+    loaded_rows = validate_schema(
+        data=insights_rows,
+        schema=tiktok_schemas.AdInsightsReport(advertiser_id=ADVERTISER_ID),
+    )["resource_insights"]
+    benchmarks.append(
+        (
+            "json.dumps(indent=4)",
+            lambda: json.dumps(loaded_rows, indent=4).encode(encoding="utf-8"),
+            rows_count,
+        )
+    )
+    return benchmarks
+
+
+def run(
+    rows_count: int,
+    baseline_path: str,
+    tolerance: float,
+    save_baseline: bool,
+) -> int:
+    print("{:<40} {:>12} {:>16}".format("benchmark", "us per row", "relative cost"))
+    benchmark_results = []
+    for name, func, benchmark_rows_count in get_benchmarks(rows_count=rows_count):
+        benchmark_result = measure(
+            name=name, func=func, rows_count=benchmark_rows_count
+        )
+        benchmark_results.append(benchmark_result)
+        print(
+            "{:<40} {:>12.2f} {:>16.2f}".format(
+                name,
+                benchmark_result.microseconds_per_row,
+                benchmark_result.relative_cost,
+            )
+        )
+
+    relative_costs = {
+        benchmark_result.name: round(benchmark_result.relative_cost, 2)
+        for benchmark_result in benchmark_results
+    }
+    if save_baseline:
+        baselines.save_baseline(path=baseline_path, values=relative_costs)
+        print("Saved baseline to {}".format(baseline_path))
+        return 0
+
+    baseline = baselines.load_baseline(path=baseline_path)
+    if baseline is None:
+        print("No baseline found at {}".format(baseline_path))
+        return 0
+
+    regressions = baselines.get_regressions(
+        values=relative_costs, baseline=baseline, tolerance=tolerance
+    )
+    for regression in regressions:
+        print("CPU regression in {} relative cost per row".format(regression))
+
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.3,
+        help="allowed relative cost per row increase over the baseline",
+    )
+    parser.add_argument("--save-baseline", action="store_true")
+    arguments = parser.parse_args()
+    sys.exit(
+        run(
+            rows_count=arguments.rows,
+            baseline_path=arguments.baseline,
+            tolerance=arguments.tolerance,
+            save_baseline=arguments.save_baseline,
+        )
+    )
@@ -0,0 +1,290 @@
+"""
+Measures the memory held by each stage of an ad insights import on synthetic API
+pages: page accumulation in the gateway, the marshmallow load, the advertiser id
+injection of `InsightsReport.post_process_data` and the JSON serialization of
+`TiktokS3Uploader._upload_data`.
+
+For every scale, each stage reports its peak memory above the memory held when
+it started, the memory it still holds when it ends and the number of memory
+blocks it still holds, all traced with tracemalloc. The peak bytes per row of the
+largest scale are compared with a stored baseline, and the run fails when a stage
+regresses by more than the tolerance.
+
+    python -m benchmarks.memory --rows 10000 25000 50000
+    python -m benchmarks.memory --save-baseline
+
+Allocation sizes depend on the Python version, so the baseline must be saved
+with the Python version used to check it.
+"""
+import argparse
+import dataclasses
+import os
+import sys
+import tracemalloc
+import typing
+
+from benchmarks import baselines
+from tiktok_manager import utils
+from tiktok_manager.integrations.clients.s3 import client as s3_client
+from tiktok_manager.integrations.clients.tiktok import schemas as tiktok_schemas
+from tiktok_manager.integrations.gateways.tiktok import client as tiktok_api_client
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "memory_baseline.json")
+ADVERTISER_ID = "7000000000000000000"
+# Stages allocating almost nothing per row would otherwise fail on rounding noise.
+MIN_REGRESSION_BYTES_PER_ROW = 16
+
+
+@dataclasses.dataclass
+class StageMemory:
+    stage: str
+    rows_count: int
+    peak_bytes: int
+    retained_bytes: int
+    retained_blocks: int
+
+    @property
+    def peak_bytes_per_row(self) -> float:
+        return self.peak_bytes / self.rows_count
+
+
+def get_insights_page(page_number: int, page_size: int, rows_count: int) -> typing.Dict:
+    """
+    Returns one page of the `report/integrated/get` endpoint, as decoded from the
+    API response.
+    """
+    first_row = (page_number - 1) * page_size
+    rows = []
+    for index in range(first_row, min(first_row + page_size, rows_count)):
+        day = "2023-07-{:02d} 00:00:00".format(index % 28 + 1)
+        rows.append(
+            {
+                "dimensions": {
+                    "ad_id": str(1700000000000000 + index // 28),
+                    "stat_time_day": day,
+                },
+                "metrics": {
+                    "ad_name": "Ad {}".format(index // 28),
+                    "adgroup_id": str(1710000000000000 + index // 280),
+                    "adgroup_name": "Ad group {}".format(index // 280),
+                    "campaign_id": str(1720000000000000 + index // 2800),
+                    "campaign_name": "Campaign {}".format(index // 2800),
+                    "spend": "{:.2f}".format(index % 500 / 3),
+                    "impressions": str(index % 100000),
+                    "clicks": str(index % 1000),
+                    "ctr": "{:.2f}".format(index % 5 / 3),
+                    "cpm": "{:.2f}".format(index % 20 / 3),
+                    "cpc": "{:.2f}".format(index % 2 / 3),
+                    "reach": str(index % 80000),
+                    "conversion": str(index % 100),
+                    "cost_per_conversion": "{:.2f}".format(index % 50 / 3),
+                    "conversion_rate": "{:.2f}".format(index % 10 / 3),
+                },
+            }
+        )
+
+    return {
+        "data": {
+            "list": rows,
+            "page_info": {
+                "page": page_number,
+                "total_page": max(1, -(-rows_count // page_size)),
+            },
+        }
+    }
+
+
+def get_gateway_client(rows_count: int) -> tiktok_api_client.TikTokApiClient:
+    """
+    Returns a gateway client whose requests are answered with synthetic pages
+    instead of HTTP calls.
+    """
+    gateway_client = tiktok_api_client.TikTokApiClient(user_access_token="benchmark")
+    gateway_client._request = lambda endpoint, method, params, payload=None: (
+        get_insights_page(
+            page_number=params.get("page", 1),
+            page_size=params["page_size"],
+            rows_count=rows_count,
+        )
+    )
+    gateway_client._get_content = lambda response: response
+    return gateway_client
+
+
+def get_uploader() -> s3_client.TiktokS3Uploader:
+    """
+    Returns an uploader serializing data as usual but not sending it to S3.
+    """
+    uploader = s3_client.TiktokS3Uploader(s3_path="s3://benchmark/memory")
+    uploader._upload_body = lambda body, file_path: file_path
+    return uploader
+
+
+def measure_stage(
+    stage: str, rows_count: int, func: typing.Callable[[], typing.Any]
+) -> typing.Tuple[typing.Any, StageMemory]:
+    before_snapshot = tracemalloc.take_snapshot()
+    before_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.reset_peak()
+
+    output = func()
+
+    after_bytes, peak_bytes = tracemalloc.get_traced_memory()
+    after_snapshot = tracemalloc.take_snapshot()
+    retained_blocks = sum(
+        statistic.count_diff
+        for statistic in after_snapshot.compare_to(before_snapshot, "lineno")
+    )
+    return output, StageMemory(
+        stage=stage,
+        rows_count=rows_count,
+        peak_bytes=peak_bytes - before_bytes,
+        retained_bytes=after_bytes - before_bytes,
+        retained_blocks=retained_blocks,
+    )
+
+
+def run_stages(rows_count: int) -> typing.List[StageMemory]:
+    gateway_client = get_gateway_client(rows_count=rows_count)
+    uploader = get_uploader()
+    report_schema = tiktok_schemas.AdInsightsReport(advertiser_id=ADVERTISER_ID)
+
+    tracemalloc.start()
+    try:
+        pages, page_accumulation = measure_stage(
+            stage="page accumulation",
+            rows_count=rows_count,
+            func=lambda: gateway_client._get_paginated_content(
+                endpoint="report/integrated/get", params={}
+            ),
+        )
+        resource_insights, marshmallow_load = measure_stage(
+            stage="marshmallow load",
+            rows_count=rows_count,
+            func=lambda: utils.validate_marshmallow_schema(
+                data=pages, schema=tiktok_schemas.AdInsights(many=True)
+            ),
+        )
+        _, record_injection = measure_stage(
+            stage="record injection",
+            rows_count=rows_count,
+            func=lambda: report_schema.post_process_data(
+                data={"resource_insights": resource_insights}
+            ),
+        )
+        _, json_serialization = measure_stage(
+            stage="json serialization",
+            rows_count=rows_count,
+            func=lambda: uploader._upload_data(
+                data=resource_insights, file_path="performance.json"
+            ),
+        )
+    finally:
+        tracemalloc.stop()
+
+    stages_memory = [
+        page_accumulation,
+        marshmallow_load,
+        record_injection,
+        json_serialization,
+    ]
+    return stages_memory + [
+        StageMemory(
+            stage="total",
+            rows_count=rows_count,
+            peak_bytes=max(
+                sum(
+                    previous_stage_memory.retained_bytes
+                    for previous_stage_memory in stages_memory[:index]
+                )
+                + stage_memory.peak_bytes
+                for index, stage_memory in enumerate(stages_memory)
+            ),
+            retained_bytes=sum(
+                stage_memory.retained_bytes for stage_memory in stages_memory
+            ),
+            retained_blocks=sum(
+                stage_memory.retained_blocks for stage_memory in stages_memory
+            ),
+        )
+    ]
+
+
+def run(
+    rows_counts: typing.List[int],
+    baseline_path: str,
+    tolerance: float,
+    save_baseline: bool,
+) -> int:
+    print(
+        "{:<20} {:>10} {:>12} {:>14} {:>16} {:>16}".format(
+            "stage",
+            "rows",
+            "peak (MiB)",
+            "peak (B/row)",
+            "retained (B/row)",
+            "retained blocks",
+        )
+    )
+    for rows_count in sorted(rows_counts):
+        stages_memory = run_stages(rows_count=rows_count)
+        for stage_memory in stages_memory:
+            print(
+                "{:<20} {:>10,} {:>12.1f} {:>14.0f} {:>16.0f} {:>16,}".format(
+                    stage_memory.stage,
+                    rows_count,
+                    stage_memory.peak_bytes / 2**20,
+                    stage_memory.peak_bytes_per_row,
+                    stage_memory.retained_bytes / rows_count,
+                    stage_memory.retained_blocks,
+                )
+            )
+
+    peak_bytes_per_row = {
+        stage_memory.stage: round(stage_memory.peak_bytes_per_row)
+        for stage_memory in stages_memory
+    }
+    if save_baseline:
+        baselines.save_baseline(path=baseline_path, values=peak_bytes_per_row)
+        print("Saved baseline to {}".format(baseline_path))
+        return 0
+
+    baseline = baselines.load_baseline(path=baseline_path)
+    if baseline is None:
+        print("No baseline found at {}".format(baseline_path))
+        return 0
+
+    regressions = baselines.get_regressions(
+        values=peak_bytes_per_row,
+        baseline=baseline,
+        tolerance=tolerance,
+        min_regression=MIN_REGRESSION_BYTES_PER_ROW,
+    )
+    for regression in regressions:
+        print("Memory regression in {} bytes per row".format(regression))
+
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000, 25000, 50000])
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.2,
+        help="allowed peak bytes per row increase over the baseline",
+    )
+    parser.add_argument("--save-baseline", action="store_true")
+    arguments = parser.parse_args()
+    sys.exit(
+        run(
+            rows_counts=arguments.rows,
+            baseline_path=arguments.baseline,
+            tolerance=arguments.tolerance,
+            save_baseline=arguments.save_baseline,
+        )
+    )
@@ -0,0 +1,83 @@
+"""
+Compares the S3 output formats on synthetic insights rows: bytes written,
+serialization CPU time and the time needed to read the rows back.
+
+    python -m benchmarks.output_formats --rows 100000
+"""
+import argparse
+import random
+import time
+import typing
+
+from tiktok_manager.integrations.clients.s3 import enums as s3_client_enums
+from tiktok_manager.integrations.clients.s3 import exceptions as s3_client_exceptions
+from tiktok_manager.integrations.clients.s3 import serializers as s3_client_serializers
+
+
+def get_insights_rows(rows_count: int) -> typing.List[typing.Dict]:
+    randomizer = random.Random(0)
+    rows = []
+    for index in range(rows_count):
+        day = "2023-07-{:02d}".format(index % 28 + 1)
+        rows.append(
+            {
+                "ad_id": str(1700000000000000 + index // 28),
+                "ad_name": "Ad {}".format(index // 28),
+                "adgroup_id": str(1710000000000000 + index // 280),
+                "adgroup_name": "Ad group {}".format(index // 280),
+                "campaign_id": str(1720000000000000 + index // 2800),
+                "campaign_name": "Campaign {}".format(index // 2800),
+                "advertiser_id": "7000000000000000000",
+                "spend": "{:.2f}".format(randomizer.uniform(0, 500)),
+                "impressions": str(randomizer.randint(0, 100000)),
+                "clicks": str(randomizer.randint(0, 1000)),
+                "ctr": "{:.2f}".format(randomizer.uniform(0, 5)),
+                "cpm": "{:.2f}".format(randomizer.uniform(0, 20)),
+                "cpc": "{:.2f}".format(randomizer.uniform(0, 2)),
+                "reach": str(randomizer.randint(0, 80000)),
+                "conversions": str(randomizer.randint(0, 100)),
+                "cost_per_conversion": "{:.2f}".format(randomizer.uniform(0, 50)),
+                "conversion_rate": "{:.2f}".format(randomizer.uniform(0, 10)),
+                "start_date": day,
+                "end_date": day,
+            }
+        )
+
+    return rows
+
+
+def run(rows_count: int) -> None:
+    rows = get_insights_rows(rows_count=rows_count)
+    print(
+        "{:<12} {:>14} {:>16} {:>12}".format(
+            "format", "bytes", "serialize (s)", "read (s)"
+        )
+    )
+    for output_format in s3_client_enums.OutputFormat:
+        try:
+            serializer = s3_client_serializers.get_serializer(
+                output_format=output_format
+            )
+        except s3_client_exceptions.OutputFormatNotSupportedError as e:
+            print("{:<12} skipped: {}".format(output_format.value, e))
+            continue
+
+        started_at = time.process_time()
+        content = serializer.serialize(records=rows)
+        serialize_time = time.process_time() - started_at
+
+        started_at = time.perf_counter()
+        serializer.deserialize(content=content)
+        read_time = time.perf_counter() - started_at
+
+        print(
+            "{:<12} {:>14,} {:>16.3f} {:>12.3f}".format(
+                output_format.value, len(content), serialize_time, read_time
+            )
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=100000)
+    run(rows_count=parser.parse_args().rows)
@@ -16,6 +16,10 @@ setuptools.setup(
     version="1.0.0",
     author="GMUWorks",
     install_requires=_read_reqs("requirements.txt"),
-    packages=setuptools.find_packages(),
+    extras_require={
+        "parquet": ["pyarrow>=12.0.0"],
+        "zstd": ["zstandard>=0.21.0"],
+    },
+    packages=setuptools.find_packages(exclude=["benchmarks", "benchmarks.*"]),
     include_package_data=True,
 )
@@ -0,0 +1,383 @@
+import collections
+import concurrent.futures
+import os
+import queue
+import socket
+import threading
+import time
+import typing
+import uuid
+
+T = typing.TypeVar("T")
+R = typing.TypeVar("R")
+
+_QUEUE_POLL_SECONDS = 0.1
+_LEASE_SETTLE_SECONDS = 1
+_END_OF_ITEM = object()
+
+
+class _ItemFailure(object):
+    def __init__(self, exception: BaseException) -> None:
+        self.exception = exception
+
+
+class RateLimiter(object):
+    """
+    Token bucket shared between threads, allowing bursts of up to `burst` calls
+    and `rate` calls per second on average.
+    """
+
+    def __init__(self, rate: float, burst: typing.Optional[int] = None) -> None:
+        self._rate = rate
+        self._burst = burst
+        self._capacity = burst if burst else max(1, int(rate))
+        self._tokens = float(self._capacity)
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    @property
+    def rate(self) -> float:
+        return self._rate
+
+    def set_rate(self, rate: float) -> None:
+        """
+        Changes the rate for every thread sharing the bucket, keeping the tokens
+        accumulated so far up to the new capacity.
+        """
+        with self._lock:
+            self._refill()
+            self._rate = rate
+            self._capacity = self._burst if self._burst else max(1, int(rate))
+            self._tokens = min(self._capacity, self._tokens)
+
+    def acquire(self) -> None:
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+
+                wait_time = (1 - self._tokens) / self._rate
+
+            time.sleep(wait_time)
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(
+            self._capacity, self._tokens + (now - self._updated_at) * self._rate
+        )
+        self._updated_at = now
+
+
+def map_concurrently(
+    func: typing.Callable[[T], R],
+    items: typing.Iterable[T],
+    max_workers: int,
+) -> typing.List[R]:
+    """
+    Applies `func` to every item using a pool of `max_workers` threads and returns
+    the results in the order of `items`. The first raised exception is re-raised.
+    """
+    if max_workers <= 1:
+        return [func(item) for item in items]
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(func, items))
+
+
+def iter_concurrently(
+    func: typing.Callable[[T], typing.Iterable[R]],
+    items: typing.Iterable[T],
+    max_workers: int,
+    max_queue_size: int,
+) -> typing.Iterator[R]:
+    """
+    Streams the chunks produced by `func` for every item, in the order of `items`.
+
+    Up to `max_workers` items are produced at the same time. Every item gets its
+    own queue of at most `max_queue_size` chunks, so producers running ahead of
+    the consumer block instead of buffering, and memory stays bounded by
+    `max_workers * max_queue_size` chunks regardless of the total size.
+    """
+    items = list(items)
+    if max_workers <= 1:
+        for item in items:
+            yield from func(item)
+        return
+
+    item_queues = [queue.Queue(maxsize=max_queue_size) for _ in items]
+    stopped = threading.Event()
+
+    def put(item_queue: queue.Queue, chunk: typing.Any) -> bool:
+        while not stopped.is_set():
+            try:
+                item_queue.put(chunk, timeout=_QUEUE_POLL_SECONDS)
+                return True
+            except queue.Full:
+                continue
+
+        return False
+
+    def produce(index: int) -> None:
+        if stopped.is_set():
+            return
+
+        try:
+            for chunk in func(items[index]):
+                if not put(item_queue=item_queues[index], chunk=chunk):
+                    return
+        except BaseException as e:
+            put(item_queue=item_queues[index], chunk=_ItemFailure(exception=e))
+            return
+
+        put(item_queue=item_queues[index], chunk=_END_OF_ITEM)
+
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        for index in range(len(items)):
+            executor.submit(produce, index)
+
+        for item_queue in item_queues:
+            while True:
+                chunk = item_queue.get()
+                if chunk is _END_OF_ITEM:
+                    break
+                if isinstance(chunk, _ItemFailure):
+                    raise chunk.exception
+
+                yield chunk
+    finally:
+        stopped.set()
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+class FairShareExecutor(object):
+    """
+    Thread pool sharing its workers fairly between keys, e.g. access tokens.
+
+    Tasks are queued per key and workers pick the next task by weighted round
+    robin (stride scheduling): over time every busy key gets a share of the
+    workers proportional to its weight, so a key with a long queue cannot starve
+    keys with a few tasks. A key never runs more than its `max_concurrency` tasks
+    at once. Keys that were idle rejoin at the current round instead of
+    catching up on the turns they missed.
+    """
+
+    def __init__(self, max_workers: int) -> None:
+        self._condition = threading.Condition()
+        self._queues = {}
+        self._shares = {}
+        self._running = collections.Counter()
+        self._passes = {}
+        self._virtual_time = 0.0
+        self._shutdown = False
+        self._threads = [
+            threading.Thread(target=self._work, daemon=True) for _ in range(max_workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def set_share(
+        self,
+        key: typing.Hashable,
+        weight: float = 1.0,
+        max_concurrency: typing.Optional[int] = None,
+    ) -> None:
+        with self._condition:
+            self._shares[key] = (weight, max_concurrency)
+            self._condition.notify_all()
+
+    def submit(
+        self,
+        key: typing.Hashable,
+        func: typing.Callable[..., R],
+        *args: typing.Any,
+        **kwargs: typing.Any
+    ) -> concurrent.futures.Future:
+        future = concurrent.futures.Future()
+        with self._condition:
+            if self._shutdown:
+                raise RuntimeError("cannot schedule new futures after shutdown")
+
+            queue = self._queues.setdefault(key, collections.deque())
+            if not queue and not self._running[key]:
+                self._passes[key] = max(self._passes.get(key, 0.0), self._virtual_time)
+            queue.append((future, func, args, kwargs))
+            self._condition.notify()
+
+        return future
+
+    def get_queue(self, key: typing.Hashable) -> "FairShareQueue":
+        return FairShareQueue(executor=self, key=key)
+
+    def shutdown(self, wait: bool = True, cancel_futures: bool = False) -> None:
+        with self._condition:
+            self._shutdown = True
+            if cancel_futures:
+                for queue in self._queues.values():
+                    for future, _, _, _ in queue:
+                        future.cancel()
+                    queue.clear()
+            self._condition.notify_all()
+
+        if wait:
+            for thread in self._threads:
+                thread.join()
+
+    def _work(self) -> None:
+        while True:
+            with self._condition:
+                task = self._get_next_task()
+                while task is None:
+                    if self._shutdown and not any(self._queues.values()):
+                        return
+                    self._condition.wait()
+                    task = self._get_next_task()
+
+            key, (future, func, args, kwargs) = task
+            if future.set_running_or_notify_cancel():
+                try:
+                    result = func(*args, **kwargs)
+                except BaseException as e:
+                    future.set_exception(e)
+                else:
+                    future.set_result(result)
+
+            with self._condition:
+                self._running[key] -= 1
+                self._condition.notify_all()
+
+    def _get_next_task(self) -> typing.Optional[typing.Tuple[typing.Hashable, tuple]]:
+        next_key = None
+        for key, queue in self._queues.items():
+            weight, max_concurrency = self._shares.get(key, (1.0, None))
+            if not queue or (
+                max_concurrency is not None and self._running[key] >= max_concurrency
+            ):
+                continue
+            if next_key is None or self._passes[key] < self._passes[next_key]:
+                next_key = key
+
+        if next_key is None:
+            return None
+
+        weight, _ = self._shares.get(next_key, (1.0, None))
+        self._virtual_time = self._passes[next_key]
+        self._passes[next_key] += 1.0 / weight
+        self._running[next_key] += 1
+        return next_key, self._queues[next_key].popleft()
+
+
+class FairShareQueue(object):
+    """
+    Submits tasks of a single key to a `FairShareExecutor`, so it can be used
+    wherever an executor with `submit(func, *args, **kwargs)` is expected.
+    """
+
+    def __init__(self, executor: FairShareExecutor, key: typing.Hashable) -> None:
+        self._executor = executor
+        self._key = key
+
+    def submit(
+        self, func: typing.Callable[..., R], *args: typing.Any, **kwargs: typing.Any
+    ) -> concurrent.futures.Future:
+        return self._executor.submit(self._key, func, *args, **kwargs)
+
+
+class Lease(object):
+    """
+    Time-limited claim on a resource shared between processes or machines, stored
+    as a small document read with `get_lease` and written with `put_lease`.
+
+    A free or expired lease is taken by writing it and reading it back after a
+    short settle delay, so of several owners racing for the same lease only the
+    one whose write landed last keeps it. The storage must offer read-after-write
+    consistency, which both local files and S3 do. The owner must `renew` the
+    lease before `lease_seconds` pass, otherwise another owner may take it over.
+    """
+
+    def __init__(
+        self,
+        get_lease: typing.Callable[[], typing.Optional[typing.Dict]],
+        put_lease: typing.Callable[[typing.Dict], typing.Any],
+        lease_seconds: float,
+    ) -> None:
+        self._get_lease = get_lease
+        self._put_lease = put_lease
+        self._lease_seconds = lease_seconds
+        self._owner = "{}:{}:{}".format(socket.gethostname(), os.getpid(), uuid.uuid4())
+
+    @property
+    def owner(self) -> str:
+        return self._owner
+
+    def acquire(self) -> bool:
+        lease = self._get_lease()
+        if (
+            lease
+            and lease["owner"] != self._owner
+            and lease["expires_at"] > time.time()
+        ):
+            return False
+
+        self._put(expires_at=time.time() + self._lease_seconds)
+        time.sleep(_LEASE_SETTLE_SECONDS)
+        return self._is_owned()
+
+    def renew(self) -> bool:
+        if not self._is_owned():
+            return False
+
+        self._put(expires_at=time.time() + self._lease_seconds)
+        return True
+
+    def release(self) -> None:
+        if self._is_owned():
+            self._put(expires_at=0)
+
+    def _is_owned(self) -> bool:
+        lease = self._get_lease()
+        return bool(lease) and lease["owner"] == self._owner
+
+    def _put(self, expires_at: float) -> None:
+        self._put_lease({"owner": self._owner, "expires_at": expires_at})
+
+
+class LeaseHeartbeat(object):
+    """
+    Renews a lease every `interval_seconds` from a background thread while its
+    owner works, so work that outlasts the lease is not taken over. `is_lost`
+    turns True once a renewal finds the lease owned by someone else; failed
+    renewals are retried at the next beat.
+    """
+
+    def __init__(self, lease: Lease, interval_seconds: float) -> None:
+        self._lease = lease
+        self._interval_seconds = interval_seconds
+        self._stopped = threading.Event()
+        self._lost = threading.Event()
+        self._thread = threading.Thread(target=self._beat, daemon=True)
+
+    def __enter__(self) -> "LeaseHeartbeat":
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self._stopped.set()
+        self._thread.join()
+
+    @property
+    def is_lost(self) -> bool:
+        return self._lost.is_set()
+
+    def _beat(self) -> None:
+        while not self._stopped.wait(timeout=self._interval_seconds):
+            try:
+                renewed = self._lease.renew()
+            except Exception:
+                continue
+
+            if not renewed:
+                self._lost.set()
+                return
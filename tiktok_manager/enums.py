@@ -16,3 +16,25 @@ class ResourceType(enum.Enum):
     CAMPAIGN = "campaign"
     AD_GROUP = "adgroup"
     AD = "ad"
+
+
+class ResultStatus(enum.Enum):
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+
+class Dataset(enum.Enum):
+    DETAILS = "details"
+    PERFORMANCE = "performance"
+
+
+class ChangeAction(enum.Enum):
+    CREATE = "create"
+    UPDATE = "update"
+    UPDATE_STATUS = "update_status"
+
+
+class AdjustedField(enum.Enum):
+    BUDGET = "budget"
+    BID_PRICE = "bid_price"
+    CONVERSION_BID_PRICE = "conversion_bid_price"
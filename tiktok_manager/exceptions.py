@@ -2,9 +2,17 @@ class ImporterException(Exception):
     pass
 
 
+class LeaseLostException(ImporterException):
+    pass
+
+
 class ActionException(Exception):
     pass
 
 
 class AdAssetsException(Exception):
     pass
+
+
+class SchedulerException(Exception):
+    pass
@@ -0,0 +1,229 @@
+import fcntl
+import hashlib
+import os
+import re
+import tempfile
+import threading
+import time
+import typing
+
+import requests
+import requests.adapters
+
+from tiktok_manager import utils
+from tiktok_manager.integrations.clients.asset_cache import (
+    constants as asset_cache_constants,
+)
+from tiktok_manager.integrations.clients.asset_cache import (
+    exceptions as asset_cache_exceptions,
+)
+
+
+class AssetCache(object):
+    """
+    Content-addressed cache of downloaded assets on the local disk.
+
+    Files are stored under the MD5 of their content, which is the `signature`
+    TikTok reports for images and videos, so an asset with a known signature is
+    read from disk instead of being downloaded again. Files are written to a
+    temporary file and renamed into place, so readers never see a partial file
+    and several processes can share one directory. Once the cache grows over
+    `max_size_bytes`, the least recently used files are evicted under a lock file
+    shared by all processes.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        max_size_bytes: int = asset_cache_constants.DEFAULT_MAX_SIZE_BYTES,
+    ) -> None:
+        self._objects_directory = os.path.join(
+            directory, asset_cache_constants.OBJECTS_DIRECTORY_NAME
+        )
+        self._temporary_directory = os.path.join(
+            directory, asset_cache_constants.TEMPORARY_DIRECTORY_NAME
+        )
+        self._lock_file_path = os.path.join(
+            directory, asset_cache_constants.LOCK_FILE_NAME
+        )
+        self._max_size_bytes = max_size_bytes
+        self._size_bytes = None
+        self._lock = threading.Lock()
+        self._session = None
+        os.makedirs(self._objects_directory, exist_ok=True)
+        os.makedirs(self._temporary_directory, exist_ok=True)
+
+    def open(self, content_hash: str) -> typing.Optional[typing.BinaryIO]:
+        """
+        Opens the cached file with the given MD5, or returns None when it is not
+        cached, and marks the file as recently used.
+        """
+        path = self._get_object_path(content_hash=content_hash)
+        try:
+            cached_file = open(path, "rb")
+        except FileNotFoundError:
+            return None
+
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            # Evicted by another process; the open file stays readable.
+            pass
+
+        return cached_file
+
+    def put(
+        self,
+        chunks: typing.Iterable[bytes],
+        content_hash: typing.Optional[str] = None,
+    ) -> typing.Tuple[str, typing.BinaryIO]:
+        """
+        Stores the file made of `chunks` and returns its MD5 and the stored file
+        opened for reading. When `content_hash` is given, a file with another MD5
+        is rejected.
+        """
+        file_descriptor, temporary_path = tempfile.mkstemp(
+            dir=self._temporary_directory
+        )
+        try:
+            file_hash = hashlib.md5()
+            size = 0
+            with os.fdopen(file_descriptor, "wb") as temporary_file:
+                for chunk in chunks:
+                    file_hash.update(chunk)
+                    temporary_file.write(chunk)
+                    size += len(chunk)
+
+            if content_hash and file_hash.hexdigest() != content_hash:
+                raise asset_cache_exceptions.ContentHashMismatchError(
+                    "Content hash of the file (content_hash={}) does not match the expected content hash (expected_content_hash={})".format(
+                        file_hash.hexdigest(), content_hash
+                    )
+                )
+
+            # Opened before the rename, so an eviction right after it cannot make
+            # the file disappear for the caller.
+            cached_file = open(temporary_path, "rb")
+            path = self._get_object_path(content_hash=file_hash.hexdigest())
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(temporary_path, path)
+        except BaseException:
+            if os.path.exists(temporary_path):
+                os.remove(temporary_path)
+            raise
+
+        self._add_size(size=size)
+        return file_hash.hexdigest(), cached_file
+
+    def fetch(
+        self, url: str, content_hash: typing.Optional[str] = None
+    ) -> typing.Tuple[str, typing.BinaryIO]:
+        """
+        Returns the MD5 and the opened cached file of the asset at `url`. The asset
+        is read from the cache when `content_hash` is given and cached, and is
+        downloaded into the cache otherwise.
+        """
+        if content_hash:
+            cached_file = self.open(content_hash=content_hash)
+            if cached_file:
+                return content_hash, cached_file
+
+        try:
+            with self._get_session().get(
+                url,
+                stream=True,
+                timeout=asset_cache_constants.DOWNLOAD_TIMEOUT_SECONDS,
+            ) as response:
+                response.raise_for_status()
+                return self.put(
+                    chunks=response.iter_content(
+                        chunk_size=asset_cache_constants.DOWNLOAD_CHUNK_SIZE
+                    ),
+                    content_hash=content_hash,
+                )
+        except requests.RequestException as e:
+            raise asset_cache_exceptions.AssetDownloadError(
+                "Unable to download asset (url={}). Error: {}".format(
+                    url, utils.get_exception_message(exception=e)
+                )
+            )
+
+    def evict(self) -> None:
+        """
+        Removes the least recently used files until the cache fits in
+        `max_size_bytes`, along with temporary files left by crashed writers.
+        """
+        with self._lock, open(self._lock_file_path, "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                self._remove_stale_temporary_files()
+                cached_files = sorted(self._iter_cached_files())
+                size_bytes = sum(size for _, size, _ in cached_files)
+                for _, size, path in cached_files:
+                    if size_bytes <= self._max_size_bytes:
+                        break
+
+                    try:
+                        os.remove(path)
+                    except FileNotFoundError:
+                        pass
+                    size_bytes -= size
+
+                self._size_bytes = size_bytes
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _add_size(self, size: int) -> None:
+        # Other processes write to the same directory, so the size is an estimate
+        # corrected by every eviction pass.
+        with self._lock:
+            if self._size_bytes is not None:
+                self._size_bytes += size
+                if self._size_bytes <= self._max_size_bytes:
+                    return
+
+        self.evict()
+
+    def _iter_cached_files(self) -> typing.Iterator[typing.Tuple[float, int, str]]:
+        for directory_entry in os.scandir(self._objects_directory):
+            if not directory_entry.is_dir():
+                continue
+
+            for file_entry in os.scandir(directory_entry.path):
+                try:
+                    stat = file_entry.stat()
+                except FileNotFoundError:
+                    continue
+
+                yield stat.st_mtime, stat.st_size, file_entry.path
+
+    def _remove_stale_temporary_files(self) -> None:
+        stale_before = time.time() - asset_cache_constants.STALE_TEMPORARY_FILE_SECONDS
+        for file_entry in os.scandir(self._temporary_directory):
+            try:
+                if file_entry.stat().st_mtime < stale_before:
+                    os.remove(file_entry.path)
+            except FileNotFoundError:
+                pass
+
+    def _get_object_path(self, content_hash: str) -> str:
+        if not re.fullmatch("[0-9a-f]{32}", content_hash):
+            raise asset_cache_exceptions.AssetCacheError(
+                "Content hash (content_hash={}) is not a valid MD5".format(content_hash)
+            )
+
+        return os.path.join(self._objects_directory, content_hash[:2], content_hash)
+
+    def _get_session(self) -> requests.Session:
+        with self._lock:
+            if self._session is None:
+                self._session = requests.Session()
+                self._session.mount(
+                    "https://",
+                    requests.adapters.HTTPAdapter(
+                        pool_connections=asset_cache_constants.DOWNLOAD_POOL_SIZE,
+                        pool_maxsize=asset_cache_constants.DOWNLOAD_POOL_SIZE,
+                    ),
+                )
+
+            return self._session
@@ -0,0 +1,8 @@
+DEFAULT_MAX_SIZE_BYTES = 10 * 1024 * 1024 * 1024
+OBJECTS_DIRECTORY_NAME = "objects"
+TEMPORARY_DIRECTORY_NAME = "tmp"
+LOCK_FILE_NAME = ".lock"
+STALE_TEMPORARY_FILE_SECONDS = 60 * 60
+DOWNLOAD_POOL_SIZE = 32
+DOWNLOAD_TIMEOUT_SECONDS = (10, 60)  # (connect, read)
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
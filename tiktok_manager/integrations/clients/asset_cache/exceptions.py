@@ -0,0 +1,10 @@
+class AssetCacheError(Exception):
+    pass
+
+
+class AssetDownloadError(AssetCacheError):
+    pass
+
+
+class ContentHashMismatchError(AssetCacheError):
+    pass
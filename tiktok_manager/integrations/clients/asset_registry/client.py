@@ -0,0 +1,163 @@
+import contextlib
+import sqlite3
+import time
+import typing
+
+from tiktok_manager import utils
+from tiktok_manager.integrations.clients.asset_registry import (
+    constants as asset_registry_constants,
+)
+from tiktok_manager.integrations.clients.asset_registry import (
+    enums as asset_registry_enums,
+)
+from tiktok_manager.integrations.clients.asset_registry import (
+    exceptions as asset_registry_exceptions,
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS assets (
+    advertiser_id TEXT NOT NULL,
+    asset_type TEXT NOT NULL,
+    signature TEXT NOT NULL,
+    asset_id TEXT NOT NULL,
+    PRIMARY KEY (advertiser_id, asset_type, signature)
+);
+CREATE TABLE IF NOT EXISTS seeds (
+    advertiser_id TEXT NOT NULL,
+    asset_type TEXT NOT NULL,
+    seeded_at REAL NOT NULL,
+    PRIMARY KEY (advertiser_id, asset_type)
+);
+"""
+
+
+class AssetRegistry(object):
+    """
+    Maps the MD5 signature of images and videos to their id in each advertiser's
+    library, stored in a local SQLite database.
+
+    The library of an advertiser is seeded from TikTok once and kept up to date
+    with every upload made through the registry, so an asset already in the
+    library can be reused without uploading it again. Every method opens its own
+    connection, so the registry can be shared by several threads and processes.
+    """
+
+    def __init__(
+        self,
+        database_path: str = asset_registry_constants.DEFAULT_DATABASE_PATH,
+        seed_max_age_seconds: float = asset_registry_constants.SEED_MAX_AGE_SECONDS,
+    ) -> None:
+        self._database_path = database_path
+        self._seed_max_age_seconds = seed_max_age_seconds
+        with self._connect() as connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.executescript(_SCHEMA)
+
+    def is_seeded(
+        self, advertiser_id: str, asset_type: asset_registry_enums.AssetType
+    ) -> bool:
+        with self._connect() as connection:
+            row = connection.execute(
+                "SELECT seeded_at FROM seeds WHERE advertiser_id = ? AND asset_type = ?",
+                (advertiser_id, asset_type.value),
+            ).fetchone()
+
+        return bool(row) and row[0] >= time.time() - self._seed_max_age_seconds
+
+    def seed(
+        self,
+        advertiser_id: str,
+        asset_type: asset_registry_enums.AssetType,
+        assets: typing.Iterable[typing.Tuple[str, str]],
+    ) -> int:
+        """
+        Replaces the registered assets of the advertiser with the
+        `(signature, asset_id)` pairs read from its library, so assets removed
+        from the library no longer resolve, and marks the library as seeded.
+        Returns the number of assets.
+        """
+        rows = [
+            (advertiser_id, asset_type.value, signature, asset_id)
+            for signature, asset_id in assets
+        ]
+        with self._connect() as connection:
+            connection.execute("BEGIN IMMEDIATE")
+            connection.execute(
+                "DELETE FROM assets WHERE advertiser_id = ? AND asset_type = ?",
+                (advertiser_id, asset_type.value),
+            )
+            connection.executemany(
+                "INSERT OR REPLACE INTO assets "
+                "(advertiser_id, asset_type, signature, asset_id) VALUES (?, ?, ?, ?)",
+                rows,
+            )
+            connection.execute(
+                "INSERT OR REPLACE INTO seeds (advertiser_id, asset_type, seeded_at) "
+                "VALUES (?, ?, ?)",
+                (advertiser_id, asset_type.value, time.time()),
+            )
+
+        return len(rows)
+
+    def get_asset_id(
+        self,
+        advertiser_id: str,
+        asset_type: asset_registry_enums.AssetType,
+        signature: str,
+    ) -> typing.Optional[str]:
+        with self._connect() as connection:
+            row = connection.execute(
+                "SELECT asset_id FROM assets "
+                "WHERE advertiser_id = ? AND asset_type = ? AND signature = ?",
+                (advertiser_id, asset_type.value, signature),
+            ).fetchone()
+
+        return row[0] if row else None
+
+    def add_asset(
+        self,
+        advertiser_id: str,
+        asset_type: asset_registry_enums.AssetType,
+        signature: str,
+        asset_id: str,
+    ) -> None:
+        with self._connect() as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO assets "
+                "(advertiser_id, asset_type, signature, asset_id) VALUES (?, ?, ?, ?)",
+                (advertiser_id, asset_type.value, signature, asset_id),
+            )
+
+    @contextlib.contextmanager
+    def _connect(self) -> typing.Iterator[sqlite3.Connection]:
+        try:
+            connection = sqlite3.connect(
+                self._database_path,
+                timeout=asset_registry_constants.DATABASE_TIMEOUT_SECONDS,
+                isolation_level=None,
+            )
+        except sqlite3.Error as e:
+            raise asset_registry_exceptions.AssetRegistryError(
+                "Unable to open asset registry (database_path={}). Error: {}".format(
+                    self._database_path, utils.get_exception_message(exception=e)
+                )
+            )
+
+        try:
+            yield connection
+            if connection.in_transaction:
+                connection.execute("COMMIT")
+        except sqlite3.Error as e:
+            if connection.in_transaction:
+                connection.execute("ROLLBACK")
+            raise asset_registry_exceptions.AssetRegistryError(
+                "Unable to update asset registry (database_path={}). Error: {}".format(
+                    self._database_path, utils.get_exception_message(exception=e)
+                )
+            )
+        except BaseException:
+            if connection.in_transaction:
+                connection.execute("ROLLBACK")
+            raise
+        finally:
+            connection.close()
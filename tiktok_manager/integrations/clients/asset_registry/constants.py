@@ -0,0 +1,5 @@
+DEFAULT_DATABASE_PATH = "tiktok_manager_assets.db"
+DATABASE_TIMEOUT_SECONDS = 30
+# Libraries seeded longer ago than this are read again, to pick up assets
+# uploaded outside of the registry.
+SEED_MAX_AGE_SECONDS = 24 * 60 * 60
@@ -0,0 +1,6 @@
+import enum
+
+
+class AssetType(enum.Enum):
+    IMAGE = "image"
+    VIDEO = "video"
@@ -0,0 +1,2 @@
+class AssetRegistryError(Exception):
+    pass
@@ -1,27 +1,143 @@
+import collections
+import concurrent.futures
 import datetime
+import hashlib
+import io
 import json
 import logging
+import threading
 import typing
 
 import boto3
+import boto3.s3.transfer
+import botocore.config
+import botocore.exceptions
 import requests
+import requests.adapters
 
-from tiktok_manager import enums, utils
+from tiktok_manager import concurrency, enums, utils
+from tiktok_manager.integrations.clients.asset_cache import client as asset_cache_client
 from tiktok_manager.integrations.clients.s3 import constants as s3_client_constants
+from tiktok_manager.integrations.clients.s3 import enums as s3_client_enums
 from tiktok_manager.integrations.clients.s3 import exceptions as s3_client_exceptions
+from tiktok_manager.integrations.clients.s3 import serializers as s3_client_serializers
+from tiktok_manager.integrations.clients.s3 import streams as s3_client_streams
 
 logger = logging.getLogger(__name__)
 
+_s3_client = None
+_s3_client_lock = threading.Lock()
+_http_session = None
+_http_session_lock = threading.Lock()
+
+
+def get_s3_client() -> typing.Any:
+    """
+    Returns the S3 client shared by every uploader in the process. boto3 clients
+    are thread-safe, so one client and its connection pool serve all threads.
+    """
+    global _s3_client
+    with _s3_client_lock:
+        if _s3_client is None:
+            _s3_client = boto3.session.Session().client(
+                service_name="s3",
+                config=botocore.config.Config(
+                    max_pool_connections=s3_client_constants.MAX_POOL_CONNECTIONS,
+                    retries={
+                        "max_attempts": s3_client_constants.MAX_RETRY_ATTEMPTS,
+                        "mode": "adaptive",
+                    },
+                ),
+            )
+
+    return _s3_client
+
+
+def get_http_session() -> requests.Session:
+    """
+    Returns the HTTP session shared by every uploader in the process to download
+    assets, so downloads reuse pooled connections to the CDN.
+    """
+    global _http_session
+    with _http_session_lock:
+        if _http_session is None:
+            _http_session = requests.Session()
+            _http_session.mount(
+                "https://",
+                requests.adapters.HTTPAdapter(
+                    pool_connections=s3_client_constants.ASSET_DOWNLOAD_POOL_SIZE,
+                    pool_maxsize=s3_client_constants.ASSET_DOWNLOAD_POOL_SIZE,
+                ),
+            )
+
+    return _http_session
+
 
 class TiktokS3Uploader(object):
-    def __init__(self, s3_path: str) -> None:
+    def __init__(
+        self,
+        s3_path: str,
+        max_workers: int = s3_client_constants.DEFAULT_MAX_WORKERS,
+        multipart_threshold: int = s3_client_constants.MULTIPART_THRESHOLD,
+        multipart_chunksize: int = s3_client_constants.MULTIPART_PART_SIZE,
+        output_format: s3_client_enums.OutputFormat = s3_client_enums.OutputFormat.JSON,
+        asset_cache: typing.Optional[asset_cache_client.AssetCache] = None,
+    ) -> None:
         self._bucket_name = None
         self._prefix = None
         self._setup_bucket_name_and_prefix(s3_path=s3_path)
 
-        self._bucket = (
-            boto3.Session().resource(service_name="s3").Bucket(self._bucket_name)
+        self._s3_client = get_s3_client()
+        self._max_workers = max_workers
+        self._multipart_threshold = multipart_threshold
+        self._multipart_chunksize = multipart_chunksize
+        self._transfer_config = boto3.s3.transfer.TransferConfig(
+            multipart_threshold=multipart_threshold,
+            multipart_chunksize=multipart_chunksize,
+            max_concurrency=max_workers,
+        )
+        self._executor = None
+        self._executor_lock = threading.Lock()
+        self._output_format = output_format
+        self._serializer = s3_client_serializers.get_serializer(
+            output_format=output_format
         )
+        # Records staged by resumable runs are read back and written again in
+        # the output format, so they are staged as NDJSON, which keeps their types.
+        self._run_records_serializer = s3_client_serializers.get_serializer(
+            output_format=s3_client_constants.RUN_RECORDS_OUTPUT_FORMAT
+        )
+        self._asset_cache = asset_cache
+
+    def __enter__(self) -> "TiktokS3Uploader":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    def close(self) -> None:
+        with self._executor_lock:
+            if self._executor:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+
+    def submit(
+        self, upload: typing.Callable[..., typing.Any], **kwargs: typing.Any
+    ) -> concurrent.futures.Future:
+        """
+        Runs an upload (usually one of the uploader methods) on the uploader's
+        executor and returns its future, so several uploads can run in parallel.
+        """
+        return self._get_executor().submit(upload, **kwargs)
+
+    def _get_executor(self) -> concurrent.futures.ThreadPoolExecutor:
+        with self._executor_lock:
+            if not self._executor:
+                self._executor = concurrent.futures.ThreadPoolExecutor(
+                    max_workers=self._max_workers
+                )
+
+            return self._executor
 
     def _setup_bucket_name_and_prefix(self, s3_path: str) -> None:
         if not s3_path.startswith("s3://"):
@@ -38,78 +154,484 @@ class TiktokS3Uploader(object):
         resource_details: typing.List[typing.Dict],
         resource_type: enums.ResourceType,
         date_created: datetime.datetime,
+        columns: typing.Optional[typing.List[str]] = None,
     ) -> str:
-        return self._upload_data(
+        serializer = self._get_serializer(columns=columns)
+        return self._upload_body(
+            body=serializer.serialize(records=resource_details),
+            file_path="{}/date_created={}/details.{}".format(
+                resource_type.value,
+                self._get_formatted_date_created(date_created=date_created),
+                serializer.extension,
+            ),
+        )
+
+    def stream_resource_details(
+        self,
+        resource_details: typing.Iterable[typing.Dict],
+        resource_type: enums.ResourceType,
+        date_created: datetime.datetime,
+        columns: typing.Optional[typing.List[str]] = None,
+    ) -> str:
+        serializer = self._get_serializer(columns=columns)
+        return self._stream_data(
             data=resource_details,
-            file_path="{}/date_created={}/details.json".format(
+            file_path="{}/date_created={}/details.{}".format(
                 resource_type.value,
                 self._get_formatted_date_created(date_created=date_created),
+                serializer.extension,
             ),
+            serializer=serializer,
+        )
+
+    def upload_resource_changes(
+        self,
+        resource_changes: typing.Dict[str, typing.List[typing.Dict]],
+        resource_type: enums.ResourceType,
+        date_created: datetime.datetime,
+    ) -> str:
+        return self._upload_data(
+            data=resource_changes,
+            file_path="{}/date_created={}/changes.json".format(
+                resource_type.value,
+                self._get_formatted_date_created(date_created=date_created),
+            ),
+        )
+
+    def upload_resource_state(
+        self, resource_state: typing.Dict, resource_type: enums.ResourceType
+    ) -> str:
+        return self._upload_data(
+            data=resource_state,
+            file_path=s3_client_constants.RESOURCE_STATE_FILE_PATH.format(
+                resource_type=resource_type.value
+            ),
+        )
+
+    def get_resource_state(
+        self, resource_type: enums.ResourceType
+    ) -> typing.Optional[typing.Dict]:
+        return self._download_data(
+            file_path=s3_client_constants.RESOURCE_STATE_FILE_PATH.format(
+                resource_type=resource_type.value
+            )
+        )
+
+    def stream_run_records(
+        self,
+        records: typing.Iterable[typing.Dict],
+        resource_type: enums.ResourceType,
+        dataset: enums.Dataset,
+        run_id: str,
+        unit_id: str,
+    ) -> str:
+        return self._stream_data(
+            data=records,
+            file_path=s3_client_constants.RUN_RECORDS_FILE_PATH.format(
+                run_id=run_id,
+                resource_type=resource_type.value,
+                dataset=dataset.value,
+                unit_id=unit_id,
+                extension=self._run_records_serializer.extension,
+            ),
+            serializer=self._run_records_serializer,
+        )
+
+    def get_run_records(
+        self,
+        resource_type: enums.ResourceType,
+        dataset: enums.Dataset,
+        run_id: str,
+        unit_id: str,
+    ) -> typing.Optional[typing.List[typing.Dict]]:
+        body = self._download_body(
+            file_path=s3_client_constants.RUN_RECORDS_FILE_PATH.format(
+                run_id=run_id,
+                resource_type=resource_type.value,
+                dataset=dataset.value,
+                unit_id=unit_id,
+                extension=self._run_records_serializer.extension,
+            )
+        )
+        return (
+            self._run_records_serializer.deserialize(content=body)
+            if body is not None
+            else None
+        )
+
+    def upload_run_checkpoint(
+        self,
+        run_checkpoint: typing.Dict,
+        resource_type: enums.ResourceType,
+        dataset: enums.Dataset,
+        run_id: str,
+        shard: typing.Optional[int] = None,
+    ) -> str:
+        return self._upload_data(
+            data=run_checkpoint,
+            file_path=self._get_run_checkpoint_file_path(
+                resource_type=resource_type, dataset=dataset, run_id=run_id, shard=shard
+            ),
+        )
+
+    def get_run_checkpoint(
+        self,
+        resource_type: enums.ResourceType,
+        dataset: enums.Dataset,
+        run_id: str,
+        shard: typing.Optional[int] = None,
+    ) -> typing.Optional[typing.Dict]:
+        return self._download_data(
+            file_path=self._get_run_checkpoint_file_path(
+                resource_type=resource_type, dataset=dataset, run_id=run_id, shard=shard
+            )
+        )
+
+    def upload_run_lease(
+        self,
+        lease: typing.Dict,
+        resource_type: enums.ResourceType,
+        dataset: enums.Dataset,
+        run_id: str,
+        lease_name: str,
+    ) -> str:
+        return self._upload_data(
+            data=lease,
+            file_path=s3_client_constants.RUN_LEASE_FILE_PATH.format(
+                run_id=run_id,
+                resource_type=resource_type.value,
+                dataset=dataset.value,
+                lease_name=lease_name,
+            ),
+        )
+
+    def get_run_lease(
+        self,
+        resource_type: enums.ResourceType,
+        dataset: enums.Dataset,
+        run_id: str,
+        lease_name: str,
+    ) -> typing.Optional[typing.Dict]:
+        return self._download_data(
+            file_path=s3_client_constants.RUN_LEASE_FILE_PATH.format(
+                run_id=run_id,
+                resource_type=resource_type.value,
+                dataset=dataset.value,
+                lease_name=lease_name,
+            )
         )
 
     def upload_resource_performance(
         self,
-        resource_performance: typing.List[typing.Dict],
+        resource_performance: typing.Iterable[typing.Dict],
         resource_type: enums.ResourceType,
         date_created: datetime.datetime,
     ) -> typing.List[str]:
-        uploaded_paths = []
         date_created_formatted = self._get_formatted_date_created(
             date_created=date_created
         )
+        pending_uploads = collections.deque()
+        uploaded_paths = []
         for performance_data in resource_performance:
-            uploaded_path = self._upload_data(
-                data=performance_data,
-                file_path="{}/{}={}/date_created={}/performance_{}.json".format(
-                    resource_type.value,
-                    resource_type.value,
-                    performance_data["{}_id".format(resource_type.value)],
-                    date_created_formatted,
-                    performance_data["date_start"],
-                ),
+            pending_uploads.append(
+                self.submit(
+                    self._upload_body,
+                    body=self._serializer.serialize_record(record=performance_data),
+                    file_path="{}/{}={}/date_created={}/performance_{}.{}".format(
+                        resource_type.value,
+                        resource_type.value,
+                        performance_data["{}_id".format(resource_type.value)],
+                        date_created_formatted,
+                        performance_data["start_date"],
+                        self._serializer.extension,
+                    ),
+                )
             )
-            uploaded_paths.append(uploaded_path)
+            # Bound the number of rows waiting for an upload slot.
+            if len(pending_uploads) >= 2 * self._max_workers:
+                uploaded_paths.append(pending_uploads.popleft().result())
+
+        uploaded_paths.extend(
+            pending_upload.result() for pending_upload in pending_uploads
+        )
 
         return uploaded_paths
 
+    def upload_partitioned_resource_performance(
+        self,
+        resource_performance: typing.Iterable[typing.Dict],
+        resource_type: enums.ResourceType,
+        date_created: datetime.datetime,
+        partition_key: str,
+        max_open_partitions: int = s3_client_constants.MAX_OPEN_PARTITION_WRITERS,
+    ) -> typing.List[str]:
+        """
+        Writes one file per value of `partition_key` instead of one file per row,
+        and a manifest listing the written files.
+
+        Partition files are streamed while rows are consumed, and their parts are
+        sent on the uploader's executor, so this must not itself run on it. At
+        most `max_open_partitions` files are written at once, each holding up to
+        one part in memory: when a row of another partition comes in, the least
+        recently written file is completed and later rows of its partition go to
+        a new file (`performance_1.json`, ...).
+        """
+        date_created_formatted = self._get_formatted_date_created(
+            date_created=date_created
+        )
+        open_writers = collections.OrderedDict()
+        files_counts = collections.Counter()
+        ended_writers = collections.deque()
+        partition_writers = []
+        try:
+            for performance_data in resource_performance:
+                partition = performance_data[partition_key]
+                if partition in open_writers:
+                    open_writers.move_to_end(partition)
+                else:
+                    if len(open_writers) >= max_open_partitions:
+                        _, partition_writer = open_writers.popitem(last=False)
+                        partition_writer.end()
+                        ended_writers.append(partition_writer)
+                        # Bound the number of completed files still being sent.
+                        if len(ended_writers) > self._max_workers:
+                            ended_writers.popleft().close()
+
+                    open_writers[partition] = self._get_record_writer(
+                        key="{}/{}/{}={}/date_created={}/performance{}.{}".format(
+                            self._prefix,
+                            resource_type.value,
+                            partition_key,
+                            partition,
+                            date_created_formatted,
+                            "_{}".format(files_counts[partition])
+                            if files_counts[partition]
+                            else "",
+                            self._serializer.extension,
+                        ),
+                        submit=self.submit,
+                    )
+                    files_counts[partition] += 1
+                    partition_writers.append((partition, open_writers[partition]))
+
+                open_writers[partition].write(record=performance_data)
+
+            for partition_writer in open_writers.values():
+                partition_writer.end()
+            for _, partition_writer in partition_writers:
+                partition_writer.close()
+        except BaseException:
+            self._abort_writers(
+                writers=[partition_writer for _, partition_writer in partition_writers]
+            )
+            raise
+
+        manifest = {
+            "resource_type": resource_type.value,
+            "partition_key": partition_key,
+            "output_format": self._output_format.value,
+            "files": [
+                {
+                    "path": self._get_full_s3_path(file_path=partition_writer.key),
+                    "partition": partition,
+                    "records_count": partition_writer.records_count,
+                }
+                for partition, partition_writer in partition_writers
+            ],
+        }
+        self._upload_data(
+            data=manifest,
+            file_path="{}/date_created={}/manifest.json".format(
+                resource_type.value, date_created_formatted
+            ),
+        )
+
+        return [file["path"] for file in manifest["files"]]
+
     def upload_resource_assets(
         self,
         asset_list: typing.List[typing.Dict],
         resource_type: enums.ResourceType,
         date_created: datetime.datetime,
+        url_key: str = "image_url",
+        file_name: str = "asset.png",
     ) -> typing.List[str]:
-        s3_paths = []
+        """
+        Mirrors the file at `url_key` of every asset to S3 and returns the S3 path
+        of every mirrored asset.
+
+        Assets are downloaded in parallel over pooled connections and streamed
+        into S3 without holding whole files in memory. An index of the mirrored
+        assets, with their `signature` and the MD5 of the mirrored content, is
+        kept next to the assets: an asset whose signature did not change since it
+        was mirrored is skipped, and an asset with the signature or content of
+        another mirrored asset is copied within S3 instead of being downloaded
+        again. The signature is only used as the expected content hash when
+        `url_key` points at the asset file itself (see `ASSET_FILE_URL_KEYS`), not
+        at a preview or cover.
+        """
+        is_asset_file = url_key in s3_client_constants.ASSET_FILE_URL_KEYS
+        asset_index = self._download_data(
+            file_path=s3_client_constants.ASSET_INDEX_FILE_PATH.format(
+                resource_type=resource_type.value
+            )
+        ) or {"assets": {}}
+        # Mirrored assets by content hash and by signature, to copy from.
+        content_sources = {
+            mirrored_asset["content_hash"]: mirrored_asset
+            for mirrored_asset in asset_index["assets"].values()
+        }
+        signature_sources = {
+            self._get_mirrored_signature(
+                mirrored_asset=mirrored_asset, url_key=url_key
+            ): mirrored_asset
+            for mirrored_asset in asset_index["assets"].values()
+        }
+        signature_sources.pop(None, None)
+        asset_index_lock = threading.Lock()
         date_created_formatted = self._get_formatted_date_created(
             date_created=date_created
         )
-        for asset in asset_list:
-            if not asset.get("image_url"):
-                continue
 
-            upload_path = self._upload_image_from_url(
-                file_path="{}/{}={}/date_created={}/asset.png".format(
-                    resource_type.value,
-                    resource_type.value,
-                    asset["id"],
-                    date_created_formatted,
-                ),
-                image_url=asset["image_url"],
+        def get_mirrored_path(asset: typing.Dict) -> typing.Optional[str]:
+            mirrored_asset = asset_index["assets"].get(str(asset["id"]))
+            if (
+                mirrored_asset
+                and asset.get("signature")
+                and self._get_mirrored_signature(
+                    mirrored_asset=mirrored_asset, url_key=url_key
+                )
+                == asset["signature"]
+            ):
+                return "{}/{}".format(self._prefix, mirrored_asset["path"])
+
+            return None
+
+        def mirror_asset(asset: typing.Dict) -> str:
+            file_path = "{}/{}={}/date_created={}/{}".format(
+                resource_type.value,
+                resource_type.value,
+                asset["id"],
+                date_created_formatted,
+                file_name,
+            )
+            signature = asset.get("signature")
+            expected_content_hash = signature if is_asset_file else None
+            with asset_index_lock:
+                source_asset = signature_sources.get(signature) or content_sources.get(
+                    expected_content_hash
+                )
+
+            if source_asset:
+                upload_path = self._copy_object(
+                    source_file_path=source_asset["path"], file_path=file_path
+                )
+                content_hash = source_asset["content_hash"]
+            else:
+                upload_path, content_hash = self._upload_file_from_url(
+                    file_path=file_path,
+                    url=asset[url_key],
+                    content_hash=expected_content_hash,
+                )
+
+            mirrored_asset = {
+                "path": file_path,
+                "content_hash": content_hash,
+                "signature": signature,
+                "url_key": url_key,
+            }
+            with asset_index_lock:
+                asset_index["assets"][str(asset["id"])] = mirrored_asset
+                content_sources.setdefault(content_hash, mirrored_asset)
+                if signature:
+                    signature_sources.setdefault(signature, mirrored_asset)
+
+            return upload_path
+
+        assets = [asset for asset in asset_list if asset.get(url_key)]
+        s3_paths = {
+            index: get_mirrored_path(asset=asset) for index, asset in enumerate(assets)
+        }
+        # Assets sharing a signature are mirrored once, the duplicates are copied
+        # from the first one afterwards.
+        pending_assets = [
+            index for index, s3_path in s3_paths.items() if s3_path is None
+        ]
+        first_pending_assets, duplicate_pending_assets = [], []
+        pending_signatures = set()
+        for index in pending_assets:
+            signature = assets[index].get("signature")
+            if signature and signature in pending_signatures:
+                duplicate_pending_assets.append(index)
+            else:
+                first_pending_assets.append(index)
+                pending_signatures.add(signature)
+
+        logger.warning(
+            "Mirroring {} of {} {} assets".format(
+                len(pending_assets), len(assets), resource_type.value
             )
-            s3_paths.append(upload_path)
+        )
+        try:
+            for indexes in (first_pending_assets, duplicate_pending_assets):
+                for index, s3_path in zip(
+                    indexes,
+                    concurrency.map_concurrently(
+                        func=lambda index: mirror_asset(asset=assets[index]),
+                        items=indexes,
+                        max_workers=self._max_workers,
+                    ),
+                ):
+                    s3_paths[index] = s3_path
+        finally:
+            if pending_assets:
+                self._upload_data(
+                    data=asset_index,
+                    file_path=s3_client_constants.ASSET_INDEX_FILE_PATH.format(
+                        resource_type=resource_type.value
+                    ),
+                )
 
-        return s3_paths
+        return [s3_paths[index] for index in range(len(assets))]
+
+    @staticmethod
+    def _get_mirrored_signature(
+        mirrored_asset: typing.Dict, url_key: str
+    ) -> typing.Optional[str]:
+        """
+        Returns the signature of a mirrored asset when it was mirrored from the
+        same `url_key`.
+        """
+        return (
+            mirrored_asset["signature"]
+            if mirrored_asset["url_key"] == url_key
+            else None
+        )
 
     def _upload_data(
         self,
         data: typing.Union[typing.List[typing.Dict], typing.Dict],
         file_path: str,
     ) -> str:
+        return self._upload_body(
+            body=json.dumps(data, indent=4).encode(encoding="utf-8"),
+            file_path=file_path,
+        )
+
+    def _upload_body(self, body: bytes, file_path: str) -> str:
         file_path_with_prefix = f"{self._prefix}/{file_path}"
         try:
-            self._bucket.put_object(
-                Key=file_path_with_prefix,
-                Body=json.dumps(data, indent=4),
-            )
+            if len(body) < self._multipart_threshold:
+                self._s3_client.put_object(
+                    Bucket=self._bucket_name, Key=file_path_with_prefix, Body=body
+                )
+            else:
+                self._s3_client.upload_fileobj(
+                    Fileobj=io.BytesIO(body),
+                    Bucket=self._bucket_name,
+                    Key=file_path_with_prefix,
+                    Config=self._transfer_config,
+                )
         except Exception as e:
             raise s3_client_exceptions.S3ClientError(
                 "Unable to upload data to S3 path (path_name={}). Error: {}".format(
@@ -119,27 +641,213 @@ class TiktokS3Uploader(object):
 
         return self._get_full_s3_path(file_path=file_path_with_prefix)
 
-    def _upload_image_from_url(
+    def _stream_data(
         self,
+        data: typing.Iterable[typing.Dict],
         file_path: str,
-        image_url: str,
+        serializer: typing.Optional[s3_client_serializers.Serializer] = None,
     ) -> str:
+        """
+        Records are pulled from `data` while the object is being written, so any
+        error raised by the iterable aborts the upload and propagates unchanged.
+        """
         file_path_with_prefix = f"{self._prefix}/{file_path}"
+        record_writer = self._get_record_writer(
+            key=file_path_with_prefix, serializer=serializer
+        )
         try:
-            self._bucket.upload_fileobj(
-                requests.get(image_url, stream=True).raw, file_path_with_prefix
+            for record in data:
+                record_writer.write(record=record)
+            record_writer.close()
+        except BaseException:
+            self._abort_writers(writers=[record_writer])
+            raise
+
+        return self._get_full_s3_path(file_path=file_path_with_prefix)
+
+    def _get_serializer(
+        self, columns: typing.Optional[typing.List[str]]
+    ) -> s3_client_serializers.Serializer:
+        """
+        Records with optional fields may not all have the same keys, so formats
+        with a fixed schema take the `columns` of the records up front.
+        """
+        if columns is None:
+            return self._serializer
+
+        return s3_client_serializers.get_serializer(
+            output_format=self._output_format, columns=columns
+        )
+
+    def _get_record_writer(
+        self,
+        key: str,
+        submit: typing.Optional[typing.Callable[..., concurrent.futures.Future]] = None,
+        serializer: typing.Optional[s3_client_serializers.Serializer] = None,
+    ) -> s3_client_streams.S3RecordWriter:
+        return s3_client_streams.S3RecordWriter(
+            s3_client=self._s3_client,
+            bucket_name=self._bucket_name,
+            key=key,
+            part_size=self._multipart_chunksize,
+            serializer=serializer or self._serializer,
+            submit=submit,
+        )
+
+    @staticmethod
+    def _abort_writers(
+        writers: typing.Iterable[s3_client_streams.S3RecordWriter],
+    ) -> None:
+        for writer in writers:
+            try:
+                writer.abort()
+            except s3_client_exceptions.S3ClientError as e:
+                logger.warning(utils.get_exception_message(exception=e))
+
+    def _download_data(
+        self, file_path: str
+    ) -> typing.Optional[typing.Union[typing.List[typing.Dict], typing.Dict]]:
+        body = self._download_body(file_path=file_path)
+        return json.loads(body) if body is not None else None
+
+    def _download_body(self, file_path: str) -> typing.Optional[bytes]:
+        file_path_with_prefix = f"{self._prefix}/{file_path}"
+        try:
+            return self._s3_client.get_object(
+                Bucket=self._bucket_name, Key=file_path_with_prefix
+            )["Body"].read()
+        except Exception as e:
+            if self._is_missing_key_error(exception=e):
+                return None
+
+            raise s3_client_exceptions.S3ClientError(
+                "Unable to download data from S3 path (path_name={}). Error: {}".format(
+                    file_path_with_prefix, utils.get_exception_message(exception=e)
+                )
+            )
+
+    def _upload_file_from_url(
+        self, file_path: str, url: str, content_hash: typing.Optional[str] = None
+    ) -> typing.Tuple[str, str]:
+        """
+        Streams the file at `url` to S3 and returns its S3 path and the MD5 of its
+        content. With an asset cache, the file is read from the cache when its
+        `content_hash` is cached and downloaded into the cache otherwise.
+        """
+        if self._asset_cache:
+            return self._upload_cached_file_from_url(
+                file_path=file_path, url=url, content_hash=content_hash
             )
+
+        file_path_with_prefix = f"{self._prefix}/{file_path}"
+        stream = s3_client_streams.S3MultipartWriter(
+            s3_client=self._s3_client,
+            bucket_name=self._bucket_name,
+            key=file_path_with_prefix,
+            part_size=self._multipart_chunksize,
+        )
+        file_hash = hashlib.md5()
+        try:
+            with get_http_session().get(
+                url,
+                stream=True,
+                timeout=s3_client_constants.ASSET_DOWNLOAD_TIMEOUT_SECONDS,
+            ) as response:
+                response.raise_for_status()
+                for chunk in response.iter_content(
+                    chunk_size=s3_client_constants.ASSET_DOWNLOAD_CHUNK_SIZE
+                ):
+                    file_hash.update(chunk)
+                    stream.write(chunk)
+            stream.close()
         except Exception as e:
+            stream.abort()
             raise s3_client_exceptions.S3ClientError(
-                "Unable to upload image data to S3 path (path_name={}, image_url={}). Error: {}".format(
+                "Unable to upload file data to S3 path (path_name={}, url={}). Error: {}".format(
+                    file_path_with_prefix,
+                    url,
+                    utils.get_exception_message(exception=e),
+                )
+            )
+
+        return file_path_with_prefix, file_hash.hexdigest()
+
+    def _upload_cached_file_from_url(
+        self, file_path: str, url: str, content_hash: typing.Optional[str]
+    ) -> typing.Tuple[str, str]:
+        file_path_with_prefix = f"{self._prefix}/{file_path}"
+        try:
+            content_hash, cached_file = self._asset_cache.fetch(
+                url=url, content_hash=content_hash
+            )
+            with cached_file:
+                self._s3_client.upload_fileobj(
+                    Fileobj=cached_file,
+                    Bucket=self._bucket_name,
+                    Key=file_path_with_prefix,
+                    Config=self._transfer_config,
+                )
+        except Exception as e:
+            raise s3_client_exceptions.S3ClientError(
+                "Unable to upload file data to S3 path (path_name={}, url={}). Error: {}".format(
+                    file_path_with_prefix,
+                    url,
+                    utils.get_exception_message(exception=e),
+                )
+            )
+
+        return file_path_with_prefix, content_hash
+
+    def _copy_object(self, source_file_path: str, file_path: str) -> str:
+        file_path_with_prefix = f"{self._prefix}/{file_path}"
+        try:
+            self._s3_client.copy(
+                CopySource={
+                    "Bucket": self._bucket_name,
+                    "Key": f"{self._prefix}/{source_file_path}",
+                },
+                Bucket=self._bucket_name,
+                Key=file_path_with_prefix,
+                Config=self._transfer_config,
+            )
+        except Exception as e:
+            raise s3_client_exceptions.S3ClientError(
+                "Unable to copy S3 object (source_path_name={}, path_name={}). Error: {}".format(
+                    source_file_path,
                     file_path_with_prefix,
-                    image_url,
                     utils.get_exception_message(exception=e),
                 )
             )
 
         return file_path_with_prefix
 
+    @staticmethod
+    def _is_missing_key_error(exception: Exception) -> bool:
+        return (
+            isinstance(exception, botocore.exceptions.ClientError)
+            and exception.response["Error"]["Code"]
+            in s3_client_constants.MISSING_KEY_ERROR_CODES
+        )
+
+    @staticmethod
+    def _get_run_checkpoint_file_path(
+        resource_type: enums.ResourceType,
+        dataset: enums.Dataset,
+        run_id: str,
+        shard: typing.Optional[int],
+    ) -> str:
+        if shard is None:
+            return s3_client_constants.RUN_CHECKPOINT_FILE_PATH.format(
+                run_id=run_id, resource_type=resource_type.value, dataset=dataset.value
+            )
+
+        return s3_client_constants.RUN_SHARD_CHECKPOINT_FILE_PATH.format(
+            run_id=run_id,
+            resource_type=resource_type.value,
+            dataset=dataset.value,
+            shard=shard,
+        )
+
     @staticmethod
     def _get_formatted_date_created(date_created: datetime) -> str:
         return date_created.strftime(s3_client_constants.DATE_CREATED_FORMAT)
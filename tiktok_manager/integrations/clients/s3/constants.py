@@ -1 +1,46 @@
+from tiktok_manager.integrations.clients.s3 import enums as s3_client_enums
+
 DATE_CREATED_FORMAT = "%Y-%m-%d-%H"  # "yyyy-MM-dd-hh"
+RESOURCE_STATE_FILE_PATH = "{resource_type}/cdc_state.json"
+ASSET_INDEX_FILE_PATH = "{resource_type}/asset_index.json"
+# Asset URL keys pointing at the asset file itself, whose MD5 is the `signature`
+# reported by TikTok. Other URLs (previews, covers) have content of their own.
+ASSET_FILE_URL_KEYS = ["image_url"]
+MISSING_KEY_ERROR_CODES = ["NoSuchKey", "404"]
+MULTIPART_PART_SIZE = 8 * 1024 * 1024  # S3 requires parts of at least 5 MiB
+MULTIPART_THRESHOLD = 16 * 1024 * 1024
+UPLOAD_PART_RETRIES = 3
+UPLOAD_PART_RETRY_BACKOFF_SECONDS = 1
+DEFAULT_MAX_WORKERS = 8
+MAX_POOL_CONNECTIONS = 50
+MAX_RETRY_ATTEMPTS = 5
+# Partition files written at once; each holds up to one part in memory.
+MAX_OPEN_PARTITION_WRITERS = 16
+# Parts of one object held in memory while they are sent in the background.
+MAX_PENDING_PARTS = 2
+PARQUET_ROW_GROUP_SIZE = 100000
+PARQUET_INTEGER_COLUMNS = ["impressions", "clicks", "reach", "conversions"]
+PARQUET_FLOAT_COLUMNS = [
+    "spend",
+    "ctr",
+    "cpm",
+    "cpc",
+    "cost_per_conversion",
+    "conversion_rate",
+]
+GZIP_COMPRESSION_LEVEL = 6
+ZSTD_COMPRESSION_LEVEL = 3
+RUN_RECORDS_OUTPUT_FORMAT = s3_client_enums.OutputFormat.NDJSON_GZIP
+RUN_RECORDS_FILE_PATH = (
+    "_runs/{run_id}/{resource_type}/{dataset}/unit={unit_id}/records.{extension}"
+)
+RUN_CHECKPOINT_FILE_PATH = "_runs/{run_id}/{resource_type}/{dataset}/checkpoint.json"
+RUN_SHARD_CHECKPOINT_FILE_PATH = (
+    "_runs/{run_id}/{resource_type}/{dataset}/checkpoint_shard={shard}.json"
+)
+RUN_LEASE_FILE_PATH = (
+    "_runs/{run_id}/{resource_type}/{dataset}/leases/{lease_name}.json"
+)
+ASSET_DOWNLOAD_POOL_SIZE = 32
+ASSET_DOWNLOAD_TIMEOUT_SECONDS = (10, 60)  # (connect, read)
+ASSET_DOWNLOAD_CHUNK_SIZE = 1024 * 1024
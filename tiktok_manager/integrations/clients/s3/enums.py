@@ -0,0 +1,14 @@
+import enum
+
+
+class OutputFormat(enum.Enum):
+    JSON = "json"
+    NDJSON = "ndjson"
+    NDJSON_GZIP = "ndjson_gzip"
+    NDJSON_ZSTD = "ndjson_zstd"
+    PARQUET = "parquet"
+
+
+class Compression(enum.Enum):
+    GZIP = "gzip"
+    ZSTD = "zstd"
@@ -8,3 +8,11 @@ class S3PathIsNotValidError(TiktokS3UploaderError):
 
 class S3ClientError(TiktokS3UploaderError):
     pass
+
+
+class OutputFormatNotSupportedError(TiktokS3UploaderError):
+    pass
+
+
+class ParquetSchemaMismatchError(S3ClientError):
+    pass
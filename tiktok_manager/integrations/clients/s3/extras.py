@@ -0,0 +1,12 @@
+# Optional dependencies of the output formats, None when their extra is not
+# installed (`pip install .[parquet]`, `pip install .[zstd]`).
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
@@ -0,0 +1,153 @@
+import abc
+import gzip
+import io
+import json
+import typing
+
+from tiktok_manager.integrations.clients.s3 import constants as s3_client_constants
+from tiktok_manager.integrations.clients.s3 import enums as s3_client_enums
+from tiktok_manager.integrations.clients.s3 import exceptions as s3_client_exceptions
+from tiktok_manager.integrations.clients.s3 import extras as s3_client_extras
+from tiktok_manager.integrations.clients.s3 import streams as s3_client_streams
+
+
+class Serializer(abc.ABC):
+    """
+    Converts records to and from the bytes of one output format. `get_writer`
+    returns a writer serializing records one by one into a binary stream.
+    """
+
+    extension = None
+
+    @abc.abstractmethod
+    def get_writer(self, stream: typing.Any) -> typing.Any:
+        pass
+
+    def serialize(self, records: typing.Iterable[typing.Dict]) -> bytes:
+        stream = io.BytesIO()
+        writer = self.get_writer(stream=stream)
+        for record in records:
+            writer.write(record=record)
+        writer.close()
+
+        return stream.getvalue()
+
+    def serialize_record(self, record: typing.Dict) -> bytes:
+        return self.serialize(records=[record])
+
+    @abc.abstractmethod
+    def deserialize(self, content: bytes) -> typing.List[typing.Dict]:
+        pass
+
+
+class JsonSerializer(Serializer):
+    extension = "json"
+
+    def get_writer(self, stream: typing.Any) -> s3_client_streams.JsonArrayWriter:
+        return s3_client_streams.JsonArrayWriter(stream=stream)
+
+    def serialize(self, records: typing.Iterable[typing.Dict]) -> bytes:
+        return json.dumps(list(records), indent=4).encode(encoding="utf-8")
+
+    def serialize_record(self, record: typing.Dict) -> bytes:
+        return json.dumps(record, indent=4).encode(encoding="utf-8")
+
+    def deserialize(self, content: bytes) -> typing.List[typing.Dict]:
+        return json.loads(content)
+
+
+class NdjsonSerializer(Serializer):
+    EXTENSIONS = {
+        None: "ndjson",
+        s3_client_enums.Compression.GZIP: "ndjson.gz",
+        s3_client_enums.Compression.ZSTD: "ndjson.zst",
+    }
+
+    def __init__(
+        self, compression: typing.Optional[s3_client_enums.Compression] = None
+    ) -> None:
+        self._compression = compression
+        self.extension = self.EXTENSIONS[compression]
+
+    def get_writer(self, stream: typing.Any) -> s3_client_streams.NdjsonWriter:
+        return s3_client_streams.NdjsonWriter(
+            stream=stream, compression=self._compression
+        )
+
+    def deserialize(self, content: bytes) -> typing.List[typing.Dict]:
+        if self._compression == s3_client_enums.Compression.GZIP:
+            content = gzip.decompress(content)
+        elif self._compression == s3_client_enums.Compression.ZSTD:
+            content = (
+                s3_client_extras.zstandard.ZstdDecompressor()
+                .decompressobj()
+                .decompress(content)
+            )
+
+        return [json.loads(line) for line in content.splitlines() if line]
+
+
+class ParquetSerializer(Serializer):
+    """
+    Writes Parquet files with the given `columns`, or with the columns of the
+    first row group when they are not known up front.
+    """
+
+    extension = "parquet"
+
+    def __init__(self, columns: typing.Optional[typing.List[str]] = None) -> None:
+        self._columns = columns
+
+    def get_writer(self, stream: typing.Any) -> s3_client_streams.ParquetWriter:
+        return s3_client_streams.ParquetWriter(
+            stream=stream,
+            columns=self._columns,
+            integer_columns=s3_client_constants.PARQUET_INTEGER_COLUMNS,
+            float_columns=s3_client_constants.PARQUET_FLOAT_COLUMNS,
+            row_group_size=s3_client_constants.PARQUET_ROW_GROUP_SIZE,
+        )
+
+    def deserialize(self, content: bytes) -> typing.List[typing.Dict]:
+        return s3_client_extras.pyarrow.parquet.read_table(
+            s3_client_extras.pyarrow.BufferReader(content)
+        ).to_pylist()
+
+
+def get_serializer(
+    output_format: s3_client_enums.OutputFormat,
+    columns: typing.Optional[typing.List[str]] = None,
+) -> Serializer:
+    """
+    `columns` are the columns of formats with a fixed schema (Parquet); other
+    formats write the keys of each record.
+    """
+    if output_format == s3_client_enums.OutputFormat.JSON:
+        return JsonSerializer()
+
+    if output_format == s3_client_enums.OutputFormat.NDJSON:
+        return NdjsonSerializer()
+
+    if output_format == s3_client_enums.OutputFormat.NDJSON_GZIP:
+        return NdjsonSerializer(compression=s3_client_enums.Compression.GZIP)
+
+    if output_format == s3_client_enums.OutputFormat.NDJSON_ZSTD:
+        if s3_client_extras.zstandard is None:
+            raise s3_client_exceptions.OutputFormatNotSupportedError(
+                "Output format (output_format={}) requires the zstd extra to be installed".format(
+                    output_format.value
+                )
+            )
+        return NdjsonSerializer(compression=s3_client_enums.Compression.ZSTD)
+
+    if output_format == s3_client_enums.OutputFormat.PARQUET:
+        if s3_client_extras.pyarrow is None:
+            raise s3_client_exceptions.OutputFormatNotSupportedError(
+                "Output format (output_format={}) requires the parquet extra to be installed".format(
+                    output_format.value
+                )
+            )
+        return ParquetSerializer(columns=columns)
+
+    raise s3_client_exceptions.OutputFormatNotSupportedError(
+        "Output format (output_format={}) is not supported".format(output_format)
+    )
@@ -0,0 +1,432 @@
+import collections
+import concurrent.futures
+import gzip
+import json
+import textwrap
+import time
+import typing
+
+from tiktok_manager import utils
+from tiktok_manager.integrations.clients.s3 import constants as s3_client_constants
+from tiktok_manager.integrations.clients.s3 import enums as s3_client_enums
+from tiktok_manager.integrations.clients.s3 import exceptions as s3_client_exceptions
+from tiktok_manager.integrations.clients.s3 import extras as s3_client_extras
+
+
+class S3MultipartWriter(object):
+    """
+    File-like writer streaming bytes to an S3 object.
+
+    Written bytes are buffered until `part_size` is reached and then sent as one
+    part of a multipart upload. Objects smaller than one part are sent with a
+    single `put_object` call on close. With a `submit` function (such as
+    `TiktokS3Uploader.submit`), parts are sent in the background while writing
+    goes on, with at most `max_pending_parts` parts in flight; otherwise they are
+    sent by the writing thread and at most one part is held in memory.
+    """
+
+    def __init__(
+        self,
+        s3_client: typing.Any,
+        bucket_name: str,
+        key: str,
+        part_size: int,
+        submit: typing.Optional[typing.Callable[..., concurrent.futures.Future]] = None,
+        max_pending_parts: int = s3_client_constants.MAX_PENDING_PARTS,
+    ) -> None:
+        self._s3_client = s3_client
+        self._bucket_name = bucket_name
+        self._key = key
+        self._part_size = part_size
+        self._submit = submit
+        self._max_pending_parts = max_pending_parts
+        self._buffer = bytearray()
+        self._upload_id = None
+        self._parts = []
+        self._pending_parts = collections.deque()
+        self._parts_count = 0
+        self._position = 0
+        self._ended = False
+        self._closed = False
+
+    @property
+    def key(self) -> str:
+        return self._key
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def tell(self) -> int:
+        return self._position
+
+    def write(self, data: bytes) -> int:
+        self._buffer.extend(data)
+        self._position += len(data)
+        if len(self._buffer) >= self._part_size:
+            self._upload_part()
+
+        return len(data)
+
+    def end(self) -> None:
+        """
+        Starts sending the bytes still buffered, the end of the object. No more
+        bytes can be written; `close` waits for the object to be complete, so
+        several writers can send their last part in parallel before being closed.
+        """
+        if self._ended:
+            return
+
+        self._ended = True
+        if self._upload_id is None:
+            self._pending_parts.append(
+                self._run(
+                    self._call_s3,
+                    method=self._s3_client.put_object,
+                    Bucket=self._bucket_name,
+                    Key=self._key,
+                    Body=bytes(self._buffer),
+                )
+            )
+            self._buffer = bytearray()
+        elif self._buffer:
+            self._upload_part()
+
+    def close(self) -> None:
+        self.end()
+        self._closed = True
+        pending_parts = [pending_part.result() for pending_part in self._pending_parts]
+        self._pending_parts.clear()
+        if self._upload_id is None:
+            return
+
+        self._parts.extend(pending_parts)
+        self._call_s3(
+            method=self._s3_client.complete_multipart_upload,
+            Bucket=self._bucket_name,
+            Key=self._key,
+            UploadId=self._upload_id,
+            MultipartUpload={"Parts": self._parts},
+        )
+
+    def abort(self) -> None:
+        self._ended = True
+        self._closed = True
+        self._buffer = bytearray()
+        for pending_part in self._pending_parts:
+            pending_part.cancel()
+        concurrent.futures.wait(self._pending_parts)
+        self._pending_parts.clear()
+        if self._upload_id is None:
+            return
+
+        self._call_s3(
+            method=self._s3_client.abort_multipart_upload,
+            Bucket=self._bucket_name,
+            Key=self._key,
+            UploadId=self._upload_id,
+        )
+
+    def _upload_part(self) -> None:
+        if self._upload_id is None:
+            self._upload_id = self._call_s3(
+                method=self._s3_client.create_multipart_upload,
+                Bucket=self._bucket_name,
+                Key=self._key,
+            )["UploadId"]
+
+        self._parts_count += 1
+        self._pending_parts.append(
+            self._run(
+                self._send_part, part_number=self._parts_count, body=bytes(self._buffer)
+            )
+        )
+        self._buffer = bytearray()
+        # Bound the number of parts held in memory while they are sent.
+        while len(self._pending_parts) > self._max_pending_parts:
+            self._parts.append(self._pending_parts.popleft().result())
+
+    def _send_part(self, part_number: int, body: bytes) -> typing.Dict:
+        response = self._call_s3(
+            method=self._s3_client.upload_part,
+            retries=s3_client_constants.UPLOAD_PART_RETRIES,
+            Bucket=self._bucket_name,
+            Key=self._key,
+            UploadId=self._upload_id,
+            PartNumber=part_number,
+            Body=body,
+        )
+        return {"ETag": response["ETag"], "PartNumber": part_number}
+
+    def _run(
+        self, func: typing.Callable, **kwargs: typing.Any
+    ) -> concurrent.futures.Future:
+        if self._submit:
+            return self._submit(func, **kwargs)
+
+        future = concurrent.futures.Future()
+        try:
+            future.set_result(func(**kwargs))
+        except Exception as e:
+            future.set_exception(e)
+
+        return future
+
+    def _call_s3(
+        self, method: typing.Callable, retries: int = 0, **kwargs: typing.Any
+    ) -> typing.Any:
+        retry = 0
+        while True:
+            try:
+                return method(**kwargs)
+            except Exception as e:
+                if retry >= retries:
+                    raise s3_client_exceptions.S3ClientError(
+                        "Unable to stream data to S3 path (path_name={}). Error: {}".format(
+                            self._key, utils.get_exception_message(exception=e)
+                        )
+                    )
+
+            time.sleep(
+                s3_client_constants.UPLOAD_PART_RETRY_BACKOFF_SECONDS * 2**retry
+            )
+            retry += 1
+
+
+class JsonArrayWriter(object):
+    """
+    Serializes records one by one into a JSON array, producing the same output as
+    `json.dumps(records, indent=4)` without materializing the whole list.
+    """
+
+    INDENT = "    "
+
+    def __init__(self, stream: typing.Any) -> None:
+        self._stream = stream
+        self._records_count = 0
+
+    @property
+    def records_count(self) -> int:
+        return self._records_count
+
+    def write(self, record: typing.Dict) -> None:
+        separator = "[\n" if not self._records_count else ",\n"
+        self._stream.write(
+            (
+                separator + textwrap.indent(json.dumps(record, indent=4), self.INDENT)
+            ).encode(encoding="utf-8")
+        )
+        self._records_count += 1
+
+    def close(self) -> None:
+        self._stream.write(b"\n]" if self._records_count else b"[]")
+
+
+class NdjsonWriter(object):
+    """
+    Serializes records as compact newline-delimited JSON, optionally compressed
+    while it is written.
+    """
+
+    def __init__(
+        self,
+        stream: typing.Any,
+        compression: typing.Optional[s3_client_enums.Compression] = None,
+    ) -> None:
+        self._stream = stream
+        self._compressed_stream = None
+        if compression == s3_client_enums.Compression.GZIP:
+            self._compressed_stream = gzip.GzipFile(
+                fileobj=stream,
+                mode="wb",
+                compresslevel=s3_client_constants.GZIP_COMPRESSION_LEVEL,
+                mtime=0,
+            )
+        elif compression == s3_client_enums.Compression.ZSTD:
+            self._compressed_stream = s3_client_extras.zstandard.ZstdCompressor(
+                level=s3_client_constants.ZSTD_COMPRESSION_LEVEL
+            ).stream_writer(stream, closefd=False)
+        self._records_count = 0
+
+    @property
+    def records_count(self) -> int:
+        return self._records_count
+
+    def write(self, record: typing.Dict) -> None:
+        (self._compressed_stream or self._stream).write(
+            (json.dumps(record, separators=(",", ":")) + "\n").encode(encoding="utf-8")
+        )
+        self._records_count += 1
+
+    def close(self) -> None:
+        if self._compressed_stream:
+            self._compressed_stream.close()
+
+
+class ParquetWriter(object):
+    """
+    Serializes records into a Parquet file, one row group per `row_group_size`
+    records. Columns listed in `integer_columns` and `float_columns` are stored
+    as numbers, every other column as a string.
+
+    The file has the given `columns`, or the columns of the first row group. A
+    file cannot change its schema once written, so a record with any other
+    column raises instead of losing it.
+    """
+
+    def __init__(
+        self,
+        stream: typing.Any,
+        integer_columns: typing.List[str],
+        float_columns: typing.List[str],
+        row_group_size: int,
+        columns: typing.Optional[typing.List[str]] = None,
+    ) -> None:
+        self._stream = stream
+        self._columns = columns
+        self._integer_columns = integer_columns
+        self._float_columns = float_columns
+        self._row_group_size = row_group_size
+        self._rows = []
+        self._schema = None
+        self._parquet_writer = None
+        self._records_count = 0
+
+    @property
+    def records_count(self) -> int:
+        return self._records_count
+
+    def write(self, record: typing.Dict) -> None:
+        self._rows.append(record)
+        self._records_count += 1
+        if len(self._rows) >= self._row_group_size:
+            self._write_row_group()
+
+    def close(self) -> None:
+        if self._rows or not self._parquet_writer:
+            self._write_row_group()
+
+        self._parquet_writer.close()
+
+    def _write_row_group(self) -> None:
+        if not self._schema:
+            self._schema = self._get_schema(
+                column_names=self._columns
+                or list(dict.fromkeys(key for row in self._rows for key in row))
+            )
+            self._parquet_writer = s3_client_extras.pyarrow.parquet.ParquetWriter(
+                where=s3_client_extras.pyarrow.PythonFile(self._stream, mode="w"),
+                schema=self._schema,
+            )
+
+        unknown_column_names = set(key for row in self._rows for key in row).difference(
+            self._schema.names
+        )
+        if unknown_column_names:
+            raise s3_client_exceptions.ParquetSchemaMismatchError(
+                "Records have columns missing from the Parquet schema (columns={}, schema_columns={})".format(
+                    sorted(unknown_column_names), self._schema.names
+                )
+            )
+
+        self._parquet_writer.write_table(
+            s3_client_extras.pyarrow.Table.from_pylist(
+                [self._get_typed_row(row=row) for row in self._rows],
+                schema=self._schema,
+            )
+        )
+        self._rows = []
+
+    def _get_schema(self, column_names: typing.List[str]) -> typing.Any:
+        return s3_client_extras.pyarrow.schema(
+            [
+                (column_name, self._get_column_type(column_name=column_name))
+                for column_name in column_names
+            ]
+        )
+
+    def _get_column_type(self, column_name: str) -> typing.Any:
+        if column_name in self._integer_columns:
+            return s3_client_extras.pyarrow.int64()
+        if column_name in self._float_columns:
+            return s3_client_extras.pyarrow.float64()
+        return s3_client_extras.pyarrow.string()
+
+    def _get_typed_row(self, row: typing.Dict) -> typing.Dict:
+        typed_row = {}
+        for column_name, value in row.items():
+            if column_name in self._integer_columns:
+                value = self._get_number(value=value, number_type=int)
+            elif column_name in self._float_columns:
+                value = self._get_number(value=value, number_type=float)
+            elif value is not None and not isinstance(value, str):
+                value = json.dumps(value)
+            typed_row[column_name] = value
+
+        return typed_row
+
+    @staticmethod
+    def _get_number(
+        value: typing.Any, number_type: typing.Callable
+    ) -> typing.Optional[typing.Union[int, float]]:
+        # The API reports missing metric values as "" or "-".
+        try:
+            return number_type(value)
+        except (TypeError, ValueError):
+            return None
+
+
+class S3RecordWriter(object):
+    """
+    Streams records into an S3 object in the format of the given serializer.
+    """
+
+    def __init__(
+        self,
+        s3_client: typing.Any,
+        bucket_name: str,
+        key: str,
+        part_size: int,
+        serializer: typing.Any,
+        submit: typing.Optional[typing.Callable[..., concurrent.futures.Future]] = None,
+    ) -> None:
+        self._stream = S3MultipartWriter(
+            s3_client=s3_client,
+            bucket_name=bucket_name,
+            key=key,
+            part_size=part_size,
+            submit=submit,
+        )
+        self._record_writer = serializer.get_writer(stream=self._stream)
+        self._ended = False
+
+    @property
+    def key(self) -> str:
+        return self._stream.key
+
+    @property
+    def records_count(self) -> int:
+        return self._record_writer.records_count
+
+    def write(self, record: typing.Dict) -> None:
+        self._record_writer.write(record=record)
+
+    def end(self) -> None:
+        """
+        Writes the end of the records and starts sending the end of the object,
+        which `close` waits for.
+        """
+        if self._ended:
+            return
+
+        self._ended = True
+        self._record_writer.close()
+        self._stream.end()
+
+    def close(self) -> None:
+        self.end()
+        self._stream.close()
+
+    def abort(self) -> None:
+        self._ended = True
+        self._stream.abort()
@@ -0,0 +1,84 @@
+import collections
+import threading
+import time
+import typing
+
+
+class AssetInfoCache(object):
+    """
+    In-memory cache of image or video info, keyed by access token, advertiser and
+    asset id, so info fetched with one token is never served to another token.
+
+    Every entry expires after its own time to live, and the least recently used
+    entries are dropped once the cache holds `max_entries`. The cache can be
+    shared by several threads.
+    """
+
+    def __init__(self, max_entries: int) -> None:
+        self._max_entries = max_entries
+        self._entries = collections.OrderedDict()
+        self._tokens_by_asset = collections.defaultdict(set)
+        self._lock = threading.Lock()
+
+    def get_many(
+        self, user_access_token: str, advertiser_id: str, asset_ids: typing.List[str]
+    ) -> typing.Dict[str, typing.Dict]:
+        """
+        Returns copies of the unexpired entries found for `asset_ids`.
+        """
+        now = time.monotonic()
+        assets_info = {}
+        with self._lock:
+            for asset_id in asset_ids:
+                key = (user_access_token, advertiser_id, asset_id)
+                entry = self._entries.get(key)
+                if not entry:
+                    continue
+
+                expires_at, asset_info = entry
+                if expires_at <= now:
+                    self._remove(key=key)
+                    continue
+
+                self._entries.move_to_end(key)
+                assets_info[asset_id] = dict(asset_info)
+
+        return assets_info
+
+    def put(
+        self,
+        user_access_token: str,
+        advertiser_id: str,
+        asset_id: str,
+        asset_info: typing.Dict,
+        ttl_seconds: float,
+    ) -> None:
+        if ttl_seconds <= 0:
+            return
+
+        key = (user_access_token, advertiser_id, asset_id)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl_seconds, dict(asset_info))
+            self._entries.move_to_end(key)
+            self._tokens_by_asset[(advertiser_id, asset_id)].add(user_access_token)
+            while len(self._entries) > self._max_entries:
+                self._remove(key=next(iter(self._entries)))
+
+    def invalidate(self, advertiser_id: str, asset_id: str) -> None:
+        """
+        Drops the entries of an asset for every access token.
+        """
+        with self._lock:
+            for user_access_token in list(
+                self._tokens_by_asset.get((advertiser_id, asset_id), ())
+            ):
+                self._remove(key=(user_access_token, advertiser_id, asset_id))
+
+    def _remove(self, key: typing.Tuple[str, str, str]) -> None:
+        user_access_token, advertiser_id, asset_id = key
+        self._entries.pop(key, None)
+        tokens = self._tokens_by_asset.get((advertiser_id, asset_id))
+        if tokens is not None:
+            tokens.discard(user_access_token)
+            if not tokens:
+                del self._tokens_by_asset[(advertiser_id, asset_id)]
@@ -1,7 +1,12 @@
 import datetime
+import hashlib
+import io
+import os
+import time
 import typing
 
 from tiktok_manager import enums, utils
+from tiktok_manager.integrations.clients.tiktok import cache as tiktok_client_cache
 from tiktok_manager.integrations.clients.tiktok import (
     constants as tiktok_client_constants,
 )
@@ -17,18 +22,42 @@ from tiktok_manager.integrations.gateways.tiktok import (
 
 
 class TiktokClient(object):
-    def __init__(self, user_access_token: str) -> None:
+    # Asset info is shared by every client of the process but keyed by access
+    # token, so a client only reads info fetched with its own token. Renaming an
+    # asset through any client invalidates it for every token.
+    _image_info_cache = tiktok_client_cache.AssetInfoCache(
+        max_entries=tiktok_client_constants.ASSET_INFO_CACHE_SIZE
+    )
+    _video_info_cache = tiktok_client_cache.AssetInfoCache(
+        max_entries=tiktok_client_constants.ASSET_INFO_CACHE_SIZE
+    )
+
+    def __init__(
+        self,
+        user_access_token: str,
+        requests_per_second: typing.Optional[float] = None,
+    ) -> None:
         self._user_access_token = user_access_token
+        self._requests_per_second = requests_per_second
         self._rest_api_client = None
 
     def get_rest_api_client(self) -> tiktok_api_client.TikTokApiClient:
         if not self._rest_api_client:
             self._rest_api_client = tiktok_api_client.TikTokApiClient(
-                user_access_token=self._user_access_token
+                user_access_token=self._user_access_token,
+                requests_per_second=self._requests_per_second,
             )
 
         return self._rest_api_client
 
+    def warm_up(self) -> None:
+        """
+        Creates the API client up front. `get_rest_api_client` creates it lazily
+        and without a lock, so a client is warmed up before worker threads share
+        it, to keep them on one API client and its rate limiter.
+        """
+        self.get_rest_api_client()
+
     def get_account_ids(self, app_id: str, secret: str) -> typing.List[str]:
         try:
             response = self.get_rest_api_client().get_ad_accounts(
@@ -56,95 +85,256 @@ class TiktokClient(object):
         return [data["advertiser_id"] for data in validated_data["ad_accounts"]]
 
     def get_account_campaigns_details(
-        self, advertiser_id: str
+        self,
+        advertiser_id: str,
+        modified_since: typing.Optional[str] = None,
+        fields: typing.Optional[typing.List[str]] = None,
     ) -> typing.List[typing.Dict]:
-        try:
-            response = self.get_rest_api_client().get_advertiser_campaigns(
-                advertiser_id=advertiser_id,
-                fields=tiktok_client_constants.TIKTOK_RESOURCE_DETAILS_FIELDS[
-                    enums.ResourceType.CAMPAIGN
-                ],
-            )
-        except tiktok_api_client_exceptions.TikTokAPIClientError as e:
-            raise tiktok_client_exceptions.TiktokClientProviderError(
-                "Unable to fetch campaign details (user_access_token={}, advertiser_id={}) through provider. Error: {}".format(
-                    self._user_access_token,
-                    advertiser_id,
-                    utils.get_exception_message(exception=e),
-                )
-            )
+        return self.get_account_resource_details(
+            advertiser_id=advertiser_id,
+            resource_type=enums.ResourceType.CAMPAIGN,
+            modified_since=modified_since,
+            fields=fields,
+        )
 
-        validated_data = utils.validate_marshmallow_schema(
-            data=response, schema=tiktok_client_schemas.CampaignsDetails()
+    def get_account_adgroups_details(
+        self,
+        advertiser_id: str,
+        modified_since: typing.Optional[str] = None,
+        fields: typing.Optional[typing.List[str]] = None,
+    ) -> typing.List[typing.Dict]:
+        return self.get_account_resource_details(
+            advertiser_id=advertiser_id,
+            resource_type=enums.ResourceType.AD_GROUP,
+            modified_since=modified_since,
+            fields=fields,
         )
-        if not validated_data:
-            raise tiktok_client_exceptions.ResponseDataNotValidError(
-                "Campaign details data fetched from provider (user_access_token={}, advertiser_id={}, response_data={}) is not valid".format(
-                    self._user_access_token, advertiser_id, response
-                )
-            )
 
-        return validated_data["campaigns_details"]
+    def get_account_ads_details(
+        self,
+        advertiser_id: str,
+        modified_since: typing.Optional[str] = None,
+        fields: typing.Optional[typing.List[str]] = None,
+    ) -> typing.List[typing.Dict]:
+        return self.get_account_resource_details(
+            advertiser_id=advertiser_id,
+            resource_type=enums.ResourceType.AD,
+            modified_since=modified_since,
+            fields=fields,
+        )
 
-    def get_account_adgroups_details(
-        self, advertiser_id: str
+    def get_account_resource_details(
+        self,
+        advertiser_id: str,
+        resource_type: enums.ResourceType,
+        modified_since: typing.Optional[str] = None,
+        fields: typing.Optional[typing.List[str]] = None,
     ) -> typing.List[typing.Dict]:
-        try:
-            response = self.get_rest_api_client().get_advertiser_adgroups(
-                advertiser_id=advertiser_id,
-                fields=tiktok_client_constants.TIKTOK_RESOURCE_DETAILS_FIELDS[
-                    enums.ResourceType.AD_GROUP
-                ],
-            )
-        except tiktok_api_client_exceptions.TikTokAPIClientError as e:
-            raise tiktok_client_exceptions.TiktokClientProviderError(
-                "Unable to fetch adgroup details (user_access_token={}, advertiser_id={}) through provider. Error: {}".format(
-                    self._user_access_token,
-                    advertiser_id,
-                    utils.get_exception_message(exception=e),
-                )
-            )
+        resource_details = []
+        for page_resource_details in self.iter_account_resource_details(
+            advertiser_id=advertiser_id,
+            resource_type=resource_type,
+            modified_since=modified_since,
+            fields=fields,
+        ):
+            resource_details.extend(page_resource_details)
+
+        return resource_details
+
+    def get_account_resource_state(
+        self, advertiser_id: str, resource_type: enums.ResourceType
+    ) -> typing.List[typing.Dict]:
+        """
+        Returns the fields a desired structure is matched on (name, parent and
+        status) together with the current settings it is compared against
+        (budgets, bids, creative fields), and nothing else, as this is read for
+        every entity of the account.
+        """
+        return self.get_account_resource_details(
+            advertiser_id=advertiser_id,
+            resource_type=resource_type,
+            fields=tiktok_client_constants.TIKTOK_RESOURCE_MATCHING_FIELDS[
+                resource_type
+            ]
+            + tiktok_client_constants.TIKTOK_RESOURCE_STATE_FIELDS[resource_type],
+        )
 
-        validated_data = utils.validate_marshmallow_schema(
-            data=response, schema=tiktok_client_schemas.AdGroupsDetails()
+    def iter_account_resource_details(
+        self,
+        advertiser_id: str,
+        resource_type: enums.ResourceType,
+        modified_since: typing.Optional[str] = None,
+        fields: typing.Optional[typing.List[str]] = None,
+    ) -> typing.Iterator[typing.List[typing.Dict]]:
+        """
+        Yields the validated resource details one API page at a time, so callers
+        can process large accounts without holding every page in memory.
+        """
+        fields = self._get_resource_details_fields(
+            resource_type=resource_type, fields=fields
         )
-        if not validated_data:
-            raise tiktok_client_exceptions.ResponseDataNotValidError(
-                "Adgroup details data fetched from provider (user_access_token={}, advertiser_id={}, response_data={}) is not valid".format(
-                    self._user_access_token, advertiser_id, response
+        filtering = self._get_modification_filtering(
+            resource_type=resource_type, modified_since=modified_since
+        )
+        rest_api_client = self.get_rest_api_client()
+        iter_resource_pages = {
+            enums.ResourceType.CAMPAIGN: rest_api_client.iter_advertiser_campaigns,
+            enums.ResourceType.AD_GROUP: rest_api_client.iter_advertiser_adgroups,
+            enums.ResourceType.AD: rest_api_client.iter_advertiser_ads,
+        }[resource_type]
+        (
+            schema_class,
+            nested_field_name,
+        ) = tiktok_client_constants.TIKTOK_RESOURCE_DETAILS_SCHEMAS[resource_type]
+        schema = self._get_projected_schema(
+            schema_class=schema_class,
+            nested_field_name=nested_field_name,
+            fields=fields,
+        )
+
+        resource_pages = iter_resource_pages(
+            advertiser_id=advertiser_id, fields=fields, filtering=filtering
+        )
+        while True:
+            try:
+                response = next(resource_pages, None)
+            except tiktok_api_client_exceptions.TikTokAPIClientError as e:
+                raise tiktok_client_exceptions.TiktokClientProviderError(
+                    "Unable to fetch {} details (user_access_token={}, advertiser_id={}) through provider. Error: {}".format(
+                        resource_type.value,
+                        self._user_access_token,
+                        advertiser_id,
+                        utils.get_exception_message(exception=e),
+                    )
                 )
-            )
 
-        return validated_data["adgroups_details"]
+            if response is None:
+                break
 
-    def get_account_ads_details(self, advertiser_id: str) -> typing.List[typing.Dict]:
-        try:
-            response = self.get_rest_api_client().get_advertiser_ads(
-                advertiser_id=advertiser_id,
-                fields=tiktok_client_constants.TIKTOK_RESOURCE_DETAILS_FIELDS[
-                    enums.ResourceType.AD
-                ],
+            validated_data = utils.validate_marshmallow_schema(
+                data=response, schema=schema
             )
-        except tiktok_api_client_exceptions.TikTokAPIClientError as e:
-            raise tiktok_client_exceptions.TiktokClientProviderError(
-                "Unable to fetch ad details (user_access_token={}, advertiser_id={}) through provider. Error: {}".format(
-                    self._user_access_token,
-                    advertiser_id,
-                    utils.get_exception_message(exception=e),
+            if not validated_data:
+                raise tiktok_client_exceptions.ResponseDataNotValidError(
+                    "{} details data fetched from provider (user_access_token={}, advertiser_id={}, response_data={}) is not valid".format(
+                        resource_type.value.capitalize(),
+                        self._user_access_token,
+                        advertiser_id,
+                        response,
+                    )
                 )
-            )
 
-        validated_data = utils.validate_marshmallow_schema(
-            data=response, schema=tiktok_client_schemas.AdsDetails()
+            yield validated_data[nested_field_name]
+
+    @staticmethod
+    def get_resource_details_columns(
+        resource_type: enums.ResourceType,
+        fields: typing.Optional[typing.List[str]] = None,
+    ) -> typing.List[str]:
+        """
+        Returns the keys of the resource details fetched with `fields`, including
+        the optional ones missing from some records.
+        """
+        fields = TiktokClient._get_resource_details_fields(
+            resource_type=resource_type, fields=fields
         )
-        if not validated_data:
-            raise tiktok_client_exceptions.ResponseDataNotValidError(
-                "Ad details data fetched from provider (user_access_token={}, advertiser_id={}, response_data={}) is not valid".format(
-                    self._user_access_token, advertiser_id, response
+        (
+            schema_class,
+            nested_field_name,
+        ) = tiktok_client_constants.TIKTOK_RESOURCE_DETAILS_SCHEMAS[resource_type]
+        nested_fields = schema_class().fields[nested_field_name].schema.fields
+        return [
+            field_name
+            for field_name, field in nested_fields.items()
+            if (field.data_key or field_name) in fields
+        ]
+
+    @staticmethod
+    def _get_resource_details_fields(
+        resource_type: enums.ResourceType, fields: typing.Optional[typing.List[str]]
+    ) -> typing.List[str]:
+        default_fields = tiktok_client_constants.TIKTOK_RESOURCE_DETAILS_FIELDS[
+            resource_type
+        ]
+        return TiktokClient._get_projected_fields(
+            available_fields=default_fields
+            + tiktok_client_constants.TIKTOK_RESOURCE_STATE_FIELDS[resource_type],
+            key_fields=tiktok_client_constants.TIKTOK_RESOURCE_DETAILS_KEY_FIELDS[
+                resource_type
+            ],
+            fields=fields if fields is not None else default_fields,
+        )
+
+    @staticmethod
+    def _get_projected_fields(
+        available_fields: typing.List[str],
+        key_fields: typing.List[str],
+        fields: typing.Optional[typing.List[str]],
+    ) -> typing.List[str]:
+        if fields is None:
+            return available_fields
+
+        unknown_fields = set(fields) - set(available_fields)
+        if unknown_fields:
+            raise tiktok_client_exceptions.FieldsNotValidError(
+                "Requested fields are not available (fields={}, available_fields={})".format(
+                    sorted(unknown_fields), available_fields
                 )
             )
 
-        return validated_data["ads_details"]
+        return [
+            field
+            for field in available_fields
+            if field in fields or field in key_fields
+        ]
+
+    @staticmethod
+    def _get_projected_schema(
+        schema_class: typing.Type[tiktok_client_schemas.Schema],
+        nested_field_name: str,
+        fields: typing.List[str],
+        **kwargs: typing.Any,
+    ) -> tiktok_client_schemas.Schema:
+        """
+        Builds the response schema restricted to the requested API fields, so only
+        the fetched columns are validated. API field names map to the schema
+        fields through their data keys.
+        """
+        schema = schema_class(**kwargs)
+        nested_fields = schema.fields[nested_field_name].schema.fields
+        only = [
+            "{}.{}".format(nested_field_name, field_name)
+            for field_name, field in nested_fields.items()
+            if (field.data_key or field_name) in fields
+        ]
+        if len(only) == len(nested_fields):
+            return schema
+
+        return schema_class(only=only, **kwargs)
+
+    @staticmethod
+    def supports_modification_filter(resource_type: enums.ResourceType) -> bool:
+        return resource_type in tiktok_client_constants.TIKTOK_MODIFICATION_FILTERS
+
+    @staticmethod
+    def _get_modification_filtering(
+        resource_type: enums.ResourceType, modified_since: typing.Optional[str]
+    ) -> typing.Optional[typing.Dict]:
+        if not modified_since:
+            return None
+
+        if not TiktokClient.supports_modification_filter(resource_type=resource_type):
+            raise tiktok_client_exceptions.FilterNotSupportedError(
+                "Modification time filter is not supported (resource_type={})".format(
+                    resource_type.name
+                )
+            )
+
+        return {
+            tiktok_client_constants.TIKTOK_MODIFICATION_FILTERS[
+                resource_type
+            ]: modified_since
+        }
 
     def create_ads(
         self, advertiser_id: str, adgroup_id: str, ad_details: typing.Dict
@@ -242,6 +432,84 @@ class TiktokClient(object):
 
         return bool(updated_ads["ad_ids"])
 
+    def update_campaigns_status(
+        self, advertiser_id: str, campaigns_status_details: typing.Dict
+    ) -> bool:
+        campaigns_status_details["advertiser_id"] = advertiser_id
+        validated_campaigns_status_details = utils.validate_marshmallow_schema(
+            data=campaigns_status_details,
+            schema=tiktok_client_schemas.CampaignStatusUpdate(),
+        )
+        if not validated_campaigns_status_details:
+            raise tiktok_client_exceptions.ResponseDataNotValidError(
+                "Failed to validate campaigns status details (user_access_token={}. advertiser_id={}, campaigns_status_details={})".format(
+                    self._user_access_token, advertiser_id, campaigns_status_details
+                )
+            )
+
+        try:
+            updated_campaigns = self.get_rest_api_client().update_campaigns_status(
+                campaigns_status_params=validated_campaigns_status_details
+            )
+        except tiktok_api_client_exceptions.TikTokAPIClientError as e:
+            raise tiktok_client_exceptions.TiktokClientProviderError(
+                "Unable to update campaigns status details (user_access_token={}, advertiser_id={}, campaigns_status_details={}). Error: {}".format(
+                    self._user_access_token,
+                    advertiser_id,
+                    validated_campaigns_status_details,
+                    utils.get_exception_message(exception=e),
+                )
+            )
+
+        return bool(updated_campaigns["campaign_ids"])
+
+    def update_adgroups_status(
+        self, advertiser_id: str, adgroups_status_details: typing.Dict
+    ) -> bool:
+        adgroups_status_details["advertiser_id"] = advertiser_id
+        validated_adgroups_status_details = utils.validate_marshmallow_schema(
+            data=adgroups_status_details,
+            schema=tiktok_client_schemas.AdGroupStatusUpdate(),
+        )
+        if not validated_adgroups_status_details:
+            raise tiktok_client_exceptions.ResponseDataNotValidError(
+                "Failed to validate adgroups status details (user_access_token={}. advertiser_id={}, adgroups_status_details={})".format(
+                    self._user_access_token, advertiser_id, adgroups_status_details
+                )
+            )
+
+        try:
+            updated_adgroups = self.get_rest_api_client().update_adgroups_status(
+                adgroups_status_params=validated_adgroups_status_details
+            )
+        except tiktok_api_client_exceptions.TikTokAPIClientError as e:
+            raise tiktok_client_exceptions.TiktokClientProviderError(
+                "Unable to update adgroups status details (user_access_token={}, advertiser_id={}, adgroups_status_details={}). Error: {}".format(
+                    self._user_access_token,
+                    advertiser_id,
+                    validated_adgroups_status_details,
+                    utils.get_exception_message(exception=e),
+                )
+            )
+
+        return bool(updated_adgroups["adgroup_ids"])
+
+    @staticmethod
+    def get_validation_errors(
+        resource_type: enums.ResourceType, details: typing.Dict, update: bool = False
+    ) -> typing.Dict:
+        """
+        Validates the create (or update) details of a campaign or adgroup without
+        calling the API. Returns the errors by field, empty when the details are
+        valid.
+        """
+        schemas = (
+            tiktok_client_constants.TIKTOK_UPDATE_SCHEMAS
+            if update
+            else tiktok_client_constants.TIKTOK_CREATE_SCHEMAS
+        )
+        return schemas[resource_type]().validate(data=details)
+
     def create_campaign(self, advertiser_id: str, campaign_details: typing.Dict) -> str:
         campaign_details["advertiser_id"] = advertiser_id
         validated_campaign_details = utils.validate_marshmallow_schema(
@@ -370,6 +638,91 @@ class TiktokClient(object):
 
         return bool(updated_adgroup)
 
+    def update_adgroups_budget(
+        self, advertiser_id: str, adgroups_budget_details: typing.Dict
+    ) -> typing.List[str]:
+        """
+        Updates the budgets of many adgroups of an advertiser in one request.
+        Returns the ids of the adgroups the API reports as not updated: when the
+        response lists the updated adgroup ids, the other adgroups of the request
+        failed, and a response without them means the whole request succeeded.
+        """
+        adgroups_budget_details["advertiser_id"] = advertiser_id
+        validated_adgroups_budget_details = utils.validate_marshmallow_schema(
+            data=adgroups_budget_details,
+            schema=tiktok_client_schemas.AdGroupBudgetUpdate(),
+        )
+        if not validated_adgroups_budget_details:
+            raise tiktok_client_exceptions.ResponseDataNotValidError(
+                "Failed to validate adgroups budget details (user_access_token={}. advertiser_id={}, adgroups_budget_details={})".format(
+                    self._user_access_token, advertiser_id, adgroups_budget_details
+                )
+            )
+
+        try:
+            updated_adgroups = self.get_rest_api_client().update_adgroups_budget(
+                adgroups_budget_params=validated_adgroups_budget_details
+            )
+        except tiktok_api_client_exceptions.TikTokAPIClientError as e:
+            raise tiktok_client_exceptions.TiktokClientProviderError(
+                "Unable to update adgroups budget (user_access_token={}, advertiser_id={}, adgroups_budget_details={}). Error: {}".format(
+                    self._user_access_token,
+                    advertiser_id,
+                    validated_adgroups_budget_details,
+                    utils.get_exception_message(exception=e),
+                )
+            )
+
+        updated_adgroup_ids = (updated_adgroups or {}).get("adgroup_ids")
+        if updated_adgroup_ids is None:
+            return []
+
+        updated_adgroup_ids = {str(adgroup_id) for adgroup_id in updated_adgroup_ids}
+        return [
+            str(adgroup_budget["adgroup_id"])
+            for adgroup_budget in adgroups_budget_details["budget"]
+            if str(adgroup_budget["adgroup_id"]) not in updated_adgroup_ids
+        ]
+
+    def update_adgroup_bid(
+        self, advertiser_id: str, adgroup_id: str, adgroup_bid_details: typing.Dict
+    ) -> bool:
+        """
+        Updates only the bids of an adgroup, without sending its other details.
+        """
+        adgroup_bid_details.update(
+            {"advertiser_id": advertiser_id, "adgroup_id": adgroup_id}
+        )
+        validated_adgroup_bid_details = utils.validate_marshmallow_schema(
+            data=adgroup_bid_details, schema=tiktok_client_schemas.AdGroupBidUpdate()
+        )
+        if not validated_adgroup_bid_details:
+            raise tiktok_client_exceptions.ResponseDataNotValidError(
+                "Failed to validate adgroup bid details (user_access_token={}. advertiser_id={}, adgroup_id={}, adgroup_bid_details={})".format(
+                    self._user_access_token,
+                    advertiser_id,
+                    adgroup_id,
+                    adgroup_bid_details,
+                )
+            )
+
+        try:
+            updated_adgroup = self.get_rest_api_client().update_adgroup(
+                adgroup_params=validated_adgroup_bid_details
+            )
+        except tiktok_api_client_exceptions.TikTokAPIClientError as e:
+            raise tiktok_client_exceptions.TiktokClientProviderError(
+                "Unable to update adgroup bid (user_access_token={}, advertiser_id={}, adgroup_id={}, adgroup_bid_details={}). Error: {}".format(
+                    self._user_access_token,
+                    advertiser_id,
+                    adgroup_id,
+                    validated_adgroup_bid_details,
+                    utils.get_exception_message(exception=e),
+                )
+            )
+
+        return bool(updated_adgroup)
+
     def create_image(self, advertiser_id: str, image_details: typing.Dict) -> str:
         image_details["advertiser_id"] = advertiser_id
         validated_image_details = utils.validate_marshmallow_schema(
@@ -382,9 +735,10 @@ class TiktokClient(object):
                 )
             )
 
+        image_file = validated_image_details.pop("image_file", None)
         try:
             created_image = self.get_rest_api_client().upload_image(
-                image_params=validated_image_details
+                image_params=validated_image_details, image_file=image_file
             )
         except tiktok_api_client_exceptions.TikTokAPIClientError as e:
             raise tiktok_client_exceptions.TiktokClientProviderError(
@@ -435,9 +789,36 @@ class TiktokClient(object):
                 )
             )
 
+        self._image_info_cache.invalidate(
+            advertiser_id=advertiser_id, asset_id=image_id
+        )
         return bool(updated_image)
 
     def get_images_info(
+        self,
+        advertiser_id: str,
+        image_ids: typing.List[str],
+        use_cache: bool = False,
+    ) -> typing.List[typing.Dict]:
+        """
+        Returns the info of the images found for `image_ids`, in the order of
+        `image_ids`, fetched in as few API calls as possible. With `use_cache`,
+        images fetched with the same access token within the last hour are read
+        from the process-wide cache instead.
+        """
+        return self._get_cached_assets_info(
+            advertiser_id=advertiser_id,
+            asset_ids=image_ids,
+            asset_id_key="image_id",
+            cache=self._image_info_cache if use_cache else None,
+            fetch_assets_info=self._fetch_images_info,
+            batch_size=tiktok_client_constants.IMAGE_INFO_BATCH_SIZE,
+            get_ttl_seconds=lambda image_info: (
+                tiktok_client_constants.ASSET_INFO_TTL_SECONDS
+            ),
+        )
+
+    def _fetch_images_info(
         self, advertiser_id: str, image_ids: typing.List[str]
     ) -> typing.List[typing.Dict]:
         image_params = {
@@ -499,9 +880,10 @@ class TiktokClient(object):
                 )
             )
 
+        video_file = validated_video_params.pop("video_file", None)
         try:
             created_video = self.get_rest_api_client().upload_video(
-                video_params=validated_video_params
+                video_params=validated_video_params, video_file=video_file
             )
         except tiktok_api_client_exceptions.TikTokAPIClientError as e:
             raise tiktok_client_exceptions.TiktokClientProviderError(
@@ -515,6 +897,203 @@ class TiktokClient(object):
 
         return created_video["video_id"]
 
+    def create_video_from_file(
+        self,
+        advertiser_id: str,
+        file_path: str,
+        video_details: typing.Optional[typing.Dict] = None,
+        upload_id: typing.Optional[str] = None,
+        start_offset: int = 0,
+    ) -> typing.Tuple[str, str]:
+        """
+        Uploads a local video file and returns the video id and the MD5 signature
+        of the file, computed while the file is read.
+
+        Files larger than `VIDEO_CHUNKED_UPLOAD_THRESHOLD_BYTES` are sent with the
+        chunked upload flow, holding one chunk in memory at a time. Failed chunks
+        are retried, and an upload interrupted with ChunkedUploadInterruptedError
+        can be resumed by passing back its `upload_id` and `start_offset`.
+        """
+        video_details = {
+            "file_name": os.path.basename(file_path),
+            **(video_details or {}),
+        }
+        try:
+            file_size = os.path.getsize(file_path)
+            with open(file_path, "rb") as video_file:
+                if (
+                    not upload_id
+                    and file_size
+                    <= tiktok_client_constants.VIDEO_CHUNKED_UPLOAD_THRESHOLD_BYTES
+                ):
+                    signature = self._get_file_signature(
+                        file=video_file, end_offset=file_size
+                    ).hexdigest()
+                    video_details.update(
+                        upload_type=tiktok_client_enums.UploadType.UPLOAD_BY_FILE.value,
+                        video_file=video_file,
+                        video_signature=signature,
+                    )
+                    return (
+                        self.create_video(
+                            advertiser_id=advertiser_id, video_details=video_details
+                        ),
+                        signature,
+                    )
+
+                file_id, signature = self._upload_file_chunks(
+                    advertiser_id=advertiser_id,
+                    file=video_file,
+                    file_size=file_size,
+                    upload_id=upload_id,
+                    start_offset=start_offset,
+                )
+        except OSError as e:
+            raise tiktok_client_exceptions.TiktokClientError(
+                "Unable to read video file (file_path={}). Error: {}".format(
+                    file_path, utils.get_exception_message(exception=e)
+                )
+            )
+
+        video_details.update(
+            upload_type=tiktok_client_enums.UploadType.UPLOAD_BY_FILE_ID.value,
+            file_id=file_id,
+        )
+        return (
+            self.create_video(advertiser_id=advertiser_id, video_details=video_details),
+            signature,
+        )
+
+    def _upload_file_chunks(
+        self,
+        advertiser_id: str,
+        file: typing.BinaryIO,
+        file_size: int,
+        upload_id: typing.Optional[str],
+        start_offset: int,
+    ) -> typing.Tuple[str, str]:
+        # The part of the file sent before a resumed upload is hashed first.
+        signature = self._get_file_signature(file=file, end_offset=start_offset)
+        hashed_offset = start_offset
+        end_offset = None
+        if not upload_id:
+            try:
+                upload = self.get_rest_api_client().start_file_upload(
+                    upload_params={
+                        "advertiser_id": advertiser_id,
+                        "size": file_size,
+                        "content_type": "video",
+                    }
+                )
+            except tiktok_api_client_exceptions.TikTokAPIClientError as e:
+                raise tiktok_client_exceptions.TiktokClientProviderError(
+                    "Unable to start video upload (user_access_token={}, advertiser_id={}, size={}). Error: {}".format(
+                        self._user_access_token,
+                        advertiser_id,
+                        file_size,
+                        utils.get_exception_message(exception=e),
+                    )
+                )
+            upload_id = upload["upload_id"]
+            start_offset = upload.get("start_offset", 0)
+            end_offset = upload.get("end_offset")
+
+        while start_offset < file_size:
+            end_offset = min(
+                end_offset
+                or start_offset + tiktok_client_constants.VIDEO_UPLOAD_CHUNK_SIZE,
+                file_size,
+            )
+            file.seek(start_offset)
+            chunk = file.read(end_offset - start_offset)
+            if start_offset <= hashed_offset < start_offset + len(chunk):
+                signature.update(chunk[hashed_offset - start_offset :])
+                hashed_offset = start_offset + len(chunk)
+
+            transferred_chunk = self._transfer_file_chunk(
+                advertiser_id=advertiser_id,
+                upload_id=upload_id,
+                start_offset=start_offset,
+                chunk=chunk,
+            )
+            start_offset = transferred_chunk.get("start_offset", end_offset)
+            end_offset = transferred_chunk.get("end_offset")
+
+        try:
+            finished_upload = self.get_rest_api_client().finish_file_upload(
+                upload_params={
+                    "advertiser_id": advertiser_id,
+                    "upload_id": upload_id,
+                    "content_type": "video",
+                }
+            )
+        except tiktok_api_client_exceptions.TikTokAPIClientError as e:
+            raise tiktok_client_exceptions.ChunkedUploadInterruptedError(
+                message="Unable to finish video upload (user_access_token={}, advertiser_id={}, upload_id={}). Error: {}".format(
+                    self._user_access_token,
+                    advertiser_id,
+                    upload_id,
+                    utils.get_exception_message(exception=e),
+                ),
+                upload_id=upload_id,
+                start_offset=file_size,
+            )
+
+        return finished_upload["file_id"], signature.hexdigest()
+
+    def _transfer_file_chunk(
+        self, advertiser_id: str, upload_id: str, start_offset: int, chunk: bytes
+    ) -> typing.Dict:
+        upload_params = {
+            "advertiser_id": advertiser_id,
+            "upload_id": upload_id,
+            "start_offset": start_offset,
+            "signature": hashlib.md5(chunk).hexdigest(),
+        }
+        retry = 0
+        while True:
+            try:
+                return self.get_rest_api_client().transfer_file_chunk(
+                    upload_params=upload_params, chunk_file=io.BytesIO(chunk)
+                )
+            except tiktok_api_client_exceptions.TikTokAPIClientError as e:
+                if retry >= tiktok_client_constants.VIDEO_CHUNK_UPLOAD_RETRIES:
+                    raise tiktok_client_exceptions.ChunkedUploadInterruptedError(
+                        message="Unable to upload video chunk (user_access_token={}, advertiser_id={}, upload_id={}, start_offset={}). Error: {}".format(
+                            self._user_access_token,
+                            advertiser_id,
+                            upload_id,
+                            start_offset,
+                            utils.get_exception_message(exception=e),
+                        ),
+                        upload_id=upload_id,
+                        start_offset=start_offset,
+                    )
+
+            time.sleep(
+                tiktok_client_constants.VIDEO_CHUNK_UPLOAD_RETRY_BACKOFF_SECONDS
+                * 2**retry
+            )
+            retry += 1
+
+    @staticmethod
+    def _get_file_signature(file: typing.BinaryIO, end_offset: int) -> typing.Any:
+        signature = hashlib.md5()
+        file.seek(0)
+        while file.tell() < end_offset:
+            data = file.read(
+                min(
+                    tiktok_client_constants.VIDEO_READ_BUFFER_SIZE,
+                    end_offset - file.tell(),
+                )
+            )
+            if not data:
+                break
+            signature.update(data)
+
+        file.seek(0)
+        return signature
+
     def update_video_name(
         self, advertiser_id: str, video_id: str, video_name: str
     ) -> bool:
@@ -552,9 +1131,34 @@ class TiktokClient(object):
                 )
             )
 
+        self._video_info_cache.invalidate(
+            advertiser_id=advertiser_id, asset_id=video_id
+        )
         return bool(updated_video)
 
     def get_videos_info(
+        self,
+        advertiser_id: str,
+        video_ids: typing.List[str],
+        use_cache: bool = False,
+    ) -> typing.List[typing.Dict]:
+        """
+        Returns the info of the videos found for `video_ids`, in the order of
+        `video_ids`, fetched in as few API calls as possible. With `use_cache`,
+        videos fetched with the same access token are read from the process-wide
+        cache until their preview URL expires (an hour at most).
+        """
+        return self._get_cached_assets_info(
+            advertiser_id=advertiser_id,
+            asset_ids=video_ids,
+            asset_id_key="video_id",
+            cache=self._video_info_cache if use_cache else None,
+            fetch_assets_info=self._fetch_videos_info,
+            batch_size=tiktok_client_constants.VIDEO_INFO_BATCH_SIZE,
+            get_ttl_seconds=self._get_video_info_ttl_seconds,
+        )
+
+    def _fetch_videos_info(
         self, advertiser_id: str, video_ids: typing.List[str]
     ) -> typing.List[typing.Dict]:
         video_params = {
@@ -602,59 +1206,226 @@ class TiktokClient(object):
 
         return validated_video_details["video_details"]
 
-    def get_insights(
+    def _get_cached_assets_info(
         self,
         advertiser_id: str,
-        resource_type: enums.ResourceType,
-        from_datetime: datetime.datetime,
-        to_datetime: datetime.datetime,
-    ) -> typing.List:
-        try:
-            insights_report = self.get_rest_api_client().get_insights_report(
+        asset_ids: typing.List[str],
+        asset_id_key: str,
+        cache: typing.Optional[tiktok_client_cache.AssetInfoCache],
+        fetch_assets_info: typing.Callable[
+            [str, typing.List[str]], typing.List[typing.Dict]
+        ],
+        batch_size: int,
+        get_ttl_seconds: typing.Callable[[typing.Dict], float],
+    ) -> typing.List[typing.Dict]:
+        assets_info = (
+            cache.get_many(
+                user_access_token=self._user_access_token,
                 advertiser_id=advertiser_id,
-                service_type=tiktok_client_enums.ServiceType.AUCTION.value,
-                report_type=tiktok_client_enums.ReportType.BASIC.value,
-                data_level=tiktok_client_enums.DataLevel.from_service_and_resource_type(
-                    service_type=tiktok_client_enums.ServiceType.AUCTION,
-                    resource_type=resource_type,
-                ).value,
-                dimensions=tiktok_client_constants.TIKTOK_INSIGHTS_DETAILS_FIELDS[
-                    resource_type
-                ]["dimensions"],
-                metrics=tiktok_client_constants.TIKTOK_INSIGHTS_DETAILS_FIELDS[
-                    resource_type
-                ]["metrics"],
-                from_datetime=from_datetime,
-                to_datetime=to_datetime,
+                asset_ids=asset_ids,
             )
-        except tiktok_api_client_exceptions.TikTokAPIClientError as e:
-            raise tiktok_client_exceptions.TiktokClientError(
-                "Unable to get insights report (user_access_token={}, advertiser_id={}, resource_type={}, from_datetime={}, to_datetime={}). Error: {}".format(
-                    self._user_access_token,
-                    advertiser_id,
-                    resource_type.name,
-                    from_datetime,
-                    to_datetime,
-                    utils.get_exception_message(exception=e),
+            if cache
+            else {}
+        )
+        missing_asset_ids = [
+            asset_id
+            for asset_id in dict.fromkeys(asset_ids)
+            if asset_id not in assets_info
+        ]
+        for index in range(0, len(missing_asset_ids), batch_size):
+            for asset_info in fetch_assets_info(
+                advertiser_id, missing_asset_ids[index : index + batch_size]
+            ):
+                assets_info[asset_info[asset_id_key]] = asset_info
+                if cache:
+                    cache.put(
+                        user_access_token=self._user_access_token,
+                        advertiser_id=advertiser_id,
+                        asset_id=asset_info[asset_id_key],
+                        asset_info=asset_info,
+                        ttl_seconds=get_ttl_seconds(asset_info),
+                    )
+
+        return [
+            assets_info[asset_id]
+            for asset_id in dict.fromkeys(asset_ids)
+            if asset_id in assets_info
+        ]
+
+    @staticmethod
+    def _get_video_info_ttl_seconds(video_info: typing.Dict) -> float:
+        """
+        Video info is cached until shortly before its preview URL expires.
+        """
+        try:
+            preview_url_expires_at = (
+                datetime.datetime.strptime(
+                    video_info["preview_url_expire_time"],
+                    tiktok_client_constants.PREVIEW_URL_EXPIRE_TIME_FORMAT,
                 )
+                .replace(tzinfo=datetime.timezone.utc)
+                .timestamp()
             )
+        except (KeyError, TypeError, ValueError):
+            return tiktok_client_constants.ASSET_INFO_TTL_SECONDS
+
+        return min(
+            preview_url_expires_at
+            - time.time()
+            - tiktok_client_constants.PREVIEW_URL_EXPIRY_MARGIN_SECONDS,
+            tiktok_client_constants.ASSET_INFO_TTL_SECONDS,
+        )
 
-        validated_insights_report = utils.validate_marshmallow_schema(
-            data=insights_report,
-            schema=tiktok_client_constants.TIKTOK_INSIGHTS_SCHEMAS[resource_type](
+    def iter_images(
+        self, advertiser_id: str
+    ) -> typing.Iterator[typing.List[typing.Dict]]:
+        """
+        Yields the images of the advertiser's library one API page at a time.
+        """
+        return self._iter_library_assets(
+            advertiser_id=advertiser_id,
+            asset_pages=self.get_rest_api_client().iter_images(
                 advertiser_id=advertiser_id
             ),
+            schema=tiktok_client_schemas.ImageDetailsResponse(),
+            nested_field_name="image_details",
         )
-        if not validated_insights_report:
-            raise tiktok_client_exceptions.ResponseDataNotValidError(
-                "Resource insights data fetched from provider (user_access_token={}, advertiser_id={}, resource_type={}, from_datetime={}, to_datetime={}, insights_report={}) is not valid".format(
-                    self._user_access_token,
-                    advertiser_id,
-                    resource_type.name,
-                    from_datetime,
-                    to_datetime,
-                    insights_report,
+
+    def iter_videos(
+        self, advertiser_id: str
+    ) -> typing.Iterator[typing.List[typing.Dict]]:
+        """
+        Yields the videos of the advertiser's library one API page at a time.
+        """
+        return self._iter_library_assets(
+            advertiser_id=advertiser_id,
+            asset_pages=self.get_rest_api_client().iter_videos(
+                advertiser_id=advertiser_id
+            ),
+            schema=tiktok_client_schemas.VideoDetailsResponse(),
+            nested_field_name="video_details",
+        )
+
+    def _iter_library_assets(
+        self,
+        advertiser_id: str,
+        asset_pages: typing.Iterator[typing.List[typing.Dict]],
+        schema: tiktok_client_schemas.Schema,
+        nested_field_name: str,
+    ) -> typing.Iterator[typing.List[typing.Dict]]:
+        while True:
+            try:
+                response = next(asset_pages, None)
+            except tiktok_api_client_exceptions.TikTokAPIClientError as e:
+                raise tiktok_client_exceptions.TiktokClientProviderError(
+                    "Unable to fetch library assets (user_access_token={}, advertiser_id={}) through provider. Error: {}".format(
+                        self._user_access_token,
+                        advertiser_id,
+                        utils.get_exception_message(exception=e),
+                    )
                 )
+
+            if response is None:
+                break
+
+            validated_data = utils.validate_marshmallow_schema(
+                data=response, schema=schema
             )
+            if not validated_data:
+                raise tiktok_client_exceptions.ResponseDataNotValidError(
+                    "Library assets fetched from provider (user_access_token={}, advertiser_id={}, response_data={}) are not valid".format(
+                        self._user_access_token, advertiser_id, response
+                    )
+                )
+
+            yield validated_data[nested_field_name]
+
+    def get_insights(
+        self,
+        advertiser_id: str,
+        resource_type: enums.ResourceType,
+        from_datetime: datetime.datetime,
+        to_datetime: datetime.datetime,
+        metrics: typing.Optional[typing.List[str]] = None,
+    ) -> typing.List:
+        resource_insights = []
+        for page_resource_insights in self.iter_insights(
+            advertiser_id=advertiser_id,
+            resource_type=resource_type,
+            from_datetime=from_datetime,
+            to_datetime=to_datetime,
+            metrics=metrics,
+        ):
+            resource_insights.extend(page_resource_insights)
+
+        return resource_insights
+
+    def iter_insights(
+        self,
+        advertiser_id: str,
+        resource_type: enums.ResourceType,
+        from_datetime: datetime.datetime,
+        to_datetime: datetime.datetime,
+        metrics: typing.Optional[typing.List[str]] = None,
+    ) -> typing.Iterator[typing.List[typing.Dict]]:
+        insights_fields = tiktok_client_constants.TIKTOK_INSIGHTS_DETAILS_FIELDS[
+            resource_type
+        ]
+        dimensions = insights_fields["dimensions"]
+        metrics = self._get_projected_fields(
+            available_fields=insights_fields["metrics"], key_fields=[], fields=metrics
+        )
+        schema = self._get_projected_schema(
+            schema_class=tiktok_client_constants.TIKTOK_INSIGHTS_SCHEMAS[resource_type],
+            nested_field_name="resource_insights",
+            fields=dimensions + metrics,
+            advertiser_id=advertiser_id,
+        )
+
+        insights_report_pages = self.get_rest_api_client().iter_insights_report(
+            advertiser_id=advertiser_id,
+            service_type=tiktok_client_enums.ServiceType.AUCTION.value,
+            report_type=tiktok_client_enums.ReportType.BASIC.value,
+            data_level=tiktok_client_enums.DataLevel.from_service_and_resource_type(
+                service_type=tiktok_client_enums.ServiceType.AUCTION,
+                resource_type=resource_type,
+            ).value,
+            dimensions=dimensions,
+            metrics=metrics,
+            from_datetime=from_datetime,
+            to_datetime=to_datetime,
+        )
+        while True:
+            try:
+                insights_report = next(insights_report_pages, None)
+            except tiktok_api_client_exceptions.TikTokAPIClientError as e:
+                raise tiktok_client_exceptions.TiktokClientError(
+                    "Unable to get insights report (user_access_token={}, advertiser_id={}, resource_type={}, from_datetime={}, to_datetime={}). Error: {}".format(
+                        self._user_access_token,
+                        advertiser_id,
+                        resource_type.name,
+                        from_datetime,
+                        to_datetime,
+                        utils.get_exception_message(exception=e),
+                    )
+                )
+
+            if insights_report is None:
+                break
+
+            validated_insights_report = utils.validate_marshmallow_schema(
+                data=insights_report, schema=schema
+            )
+            if not validated_insights_report:
+                raise tiktok_client_exceptions.ResponseDataNotValidError(
+                    "Resource insights data fetched from provider (user_access_token={}, advertiser_id={}, resource_type={}, from_datetime={}, to_datetime={}, insights_report={}) is not valid".format(
+                        self._user_access_token,
+                        advertiser_id,
+                        resource_type.name,
+                        from_datetime,
+                        to_datetime,
+                        insights_report,
+                    )
+                )
 
-        return validated_insights_report["resource_insights"]
+            yield validated_insights_report["resource_insights"]
@@ -34,6 +34,47 @@ TIKTOK_RESOURCE_DETAILS_FIELDS = {
     ],
 }
 
+# Fields that can be requested in addition to the default details fields. They
+# hold the current settings compared by structure plans.
+TIKTOK_RESOURCE_STATE_FIELDS = {
+    enums.ResourceType.CAMPAIGN: ["budget", "budget_mode"],
+    enums.ResourceType.AD_GROUP: [
+        "budget",
+        "budget_mode",
+        "bid_price",
+        "conversion_bid_price",
+        "schedule_end_time",
+    ],
+    enums.ResourceType.AD: [
+        "ad_text",
+        "call_to_action",
+        "landing_page_url",
+        "display_name",
+        "video_id",
+        "image_ids",
+    ],
+}
+
+# Fields a desired structure is matched on (name, parent and status), fetched
+# with the state fields.
+TIKTOK_RESOURCE_MATCHING_FIELDS = {
+    enums.ResourceType.CAMPAIGN: ["campaign_name", "operation_status"],
+    enums.ResourceType.AD_GROUP: ["campaign_id", "adgroup_name", "operation_status"],
+    enums.ResourceType.AD: ["adgroup_id", "ad_name", "operation_status"],
+}
+
+# Fields that are always fetched, regardless of the requested projection.
+TIKTOK_RESOURCE_DETAILS_KEY_FIELDS = {
+    enums.ResourceType.CAMPAIGN: ["advertiser_id", "campaign_id", "modify_time"],
+    enums.ResourceType.AD_GROUP: ["advertiser_id", "adgroup_id", "modify_time"],
+    enums.ResourceType.AD: ["advertiser_id", "ad_id", "modify_time"],
+}
+
+# Resource types whose "get" endpoint can filter on the entity modification time.
+TIKTOK_MODIFICATION_FILTERS = {
+    enums.ResourceType.AD: "modification_filter_start_time",
+}
+
 
 TIKTOK_INSIGHTS_DETAILS_FIELDS = {
     enums.ResourceType.CAMPAIGN: {
@@ -92,8 +133,53 @@ TIKTOK_INSIGHTS_DETAILS_FIELDS = {
     },
 }
 
+TIKTOK_RESOURCE_DETAILS_SCHEMAS = {
+    enums.ResourceType.CAMPAIGN: (
+        tiktok_client_schemas.CampaignsDetails,
+        "campaigns_details",
+    ),
+    enums.ResourceType.AD_GROUP: (
+        tiktok_client_schemas.AdGroupsDetails,
+        "adgroups_details",
+    ),
+    enums.ResourceType.AD: (tiktok_client_schemas.AdsDetails, "ads_details"),
+}
+
 TIKTOK_INSIGHTS_SCHEMAS = {
     enums.ResourceType.CAMPAIGN: tiktok_client_schemas.CampaignInsightsReport,
     enums.ResourceType.AD_GROUP: tiktok_client_schemas.AdGroupInsightsReport,
     enums.ResourceType.AD: tiktok_client_schemas.AdInsightsReport,
 }
+
+# Videos larger than this are sent with the chunked upload flow.
+VIDEO_CHUNKED_UPLOAD_THRESHOLD_BYTES = 50 * 1024 * 1024
+# Chunk size used when the upload session does not return the next chunk range.
+VIDEO_UPLOAD_CHUNK_SIZE = 10 * 1024 * 1024
+VIDEO_READ_BUFFER_SIZE = 1024 * 1024
+VIDEO_CHUNK_UPLOAD_RETRIES = 5
+VIDEO_CHUNK_UPLOAD_RETRY_BACKOFF_SECONDS = 1
+
+ASSET_INFO_CACHE_SIZE = 100000
+# Asset info is refreshed at least this often, to pick up changes made outside
+# of this client.
+ASSET_INFO_TTL_SECONDS = 60 * 60
+IMAGE_INFO_BATCH_SIZE = 100
+VIDEO_INFO_BATCH_SIZE = 60
+PREVIEW_URL_EXPIRE_TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+PREVIEW_URL_EXPIRY_MARGIN_SECONDS = 5 * 60
+
+TIKTOK_CREATE_SCHEMAS = {
+    enums.ResourceType.CAMPAIGN: tiktok_client_schemas.CampaignCreate,
+    enums.ResourceType.AD_GROUP: tiktok_client_schemas.AdGroupCreate,
+}
+
+TIKTOK_UPDATE_SCHEMAS = {
+    enums.ResourceType.CAMPAIGN: tiktok_client_schemas.CampaignUpdate,
+    enums.ResourceType.AD_GROUP: tiktok_client_schemas.AdGroupUpdate,
+}
+
+# Maximum number of entities whose status is changed in one request.
+STATUS_UPDATE_BATCH_SIZE = 100
+
+# Maximum number of adgroups whose budget is changed in one request.
+ADGROUP_BUDGET_UPDATE_BATCH_SIZE = 100
@@ -13,6 +13,13 @@ class ReportType(enum.Enum):
     BASIC = "BASIC"
 
 
+class UploadType(enum.Enum):
+    UPLOAD_BY_FILE = "UPLOAD_BY_FILE"
+    UPLOAD_BY_URL = "UPLOAD_BY_URL"
+    UPLOAD_BY_FILE_ID = "UPLOAD_BY_FILE_ID"
+    UPLOAD_BY_VIDEO_ID = "UPLOAD_BY_VIDEO_ID"
+
+
 class DataLevel(enum.Enum):
     AUCTION_CAMPAIGN = "AUCTION_CAMPAIGN"
     AUCTION_ADGROUP = "AUCTION_ADGROUP"
@@ -8,3 +8,19 @@ class TiktokClientProviderError(TiktokClientError):
 
 class ResponseDataNotValidError(TiktokClientError):
     pass
+
+
+class FilterNotSupportedError(TiktokClientError):
+    pass
+
+
+class FieldsNotValidError(TiktokClientError):
+    pass
+
+
+class ChunkedUploadInterruptedError(TiktokClientProviderError):
+    def __init__(self, message: str, upload_id: str, start_offset: int) -> None:
+        TiktokClientProviderError.__init__(self)
+        self.message = message
+        self.upload_id = upload_id
+        self.start_offset = start_offset
@@ -33,6 +33,8 @@ class CampaignDetails(Schema):
     configured_status = fields.Str(required=False, data_key="secondary_status")
     created_time = fields.Str(required=True, data_key="create_time")
     updated_time = fields.Str(required=True, data_key="modify_time")
+    budget = fields.Float(required=False, allow_none=True, data_key="budget")
+    budget_mode = fields.Str(required=False, allow_none=True, data_key="budget_mode")
 
 
 class CampaignsDetails(Schema):
@@ -54,6 +56,15 @@ class AdGroupDetails(Schema):
     configured_status = fields.Str(required=False, data_key="secondary_status")
     created_time = fields.Str(required=True, data_key="create_time")
     updated_time = fields.Str(required=True, data_key="modify_time")
+    budget = fields.Float(required=False, allow_none=True, data_key="budget")
+    budget_mode = fields.Str(required=False, allow_none=True, data_key="budget_mode")
+    bid_price = fields.Float(required=False, allow_none=True, data_key="bid_price")
+    conversion_bid_price = fields.Float(
+        required=False, allow_none=True, data_key="conversion_bid_price"
+    )
+    schedule_end_time = fields.Str(
+        required=False, allow_none=True, data_key="schedule_end_time"
+    )
 
 
 class AdGroupsDetails(Schema):
@@ -76,6 +87,18 @@ class AdDetails(Schema):
     configured_status = fields.Str(required=False, data_key="secondary_status")
     created_time = fields.Str(required=True, data_key="create_time")
     updated_time = fields.Str(required=True, data_key="modify_time")
+    ad_text = fields.Str(required=False, allow_none=True, data_key="ad_text")
+    call_to_action = fields.Str(
+        required=False, allow_none=True, data_key="call_to_action"
+    )
+    landing_page_url = fields.Str(
+        required=False, allow_none=True, data_key="landing_page_url"
+    )
+    display_name = fields.Str(required=False, allow_none=True, data_key="display_name")
+    video_id = fields.Str(required=False, allow_none=True, data_key="video_id")
+    image_ids = fields.List(
+        fields.Str(), required=False, allow_none=True, data_key="image_ids"
+    )
 
 
 class AdsDetails(Schema):
@@ -213,6 +236,26 @@ class AdStatusUpdate(Schema):
         return utils.convert_schema_list_and_dict_fields_to_json_string(data=data)
 
 
+class CampaignStatusUpdate(Schema):
+    advertiser_id = fields.Str(required=True, data_key="advertiser_id")
+    campaign_ids = fields.List(fields.Str(), required=True, data_key="campaign_ids")
+    operation_status = fields.Str(required=True, data_key="operation_status")
+
+    @post_load
+    def post_process_data(self, data: typing.Dict, **kwargs: typing.Any) -> typing.Dict:
+        return utils.convert_schema_list_and_dict_fields_to_json_string(data=data)
+
+
+class AdGroupStatusUpdate(Schema):
+    advertiser_id = fields.Str(required=True, data_key="advertiser_id")
+    adgroup_ids = fields.List(fields.Str(), required=True, data_key="adgroup_ids")
+    operation_status = fields.Str(required=True, data_key="operation_status")
+
+    @post_load
+    def post_process_data(self, data: typing.Dict, **kwargs: typing.Any) -> typing.Dict:
+        return utils.convert_schema_list_and_dict_fields_to_json_string(data=data)
+
+
 class CampaignCreate(Schema):
     advertiser_id = fields.Str(required=True, data_key="advertiser_id")
     campaign_name = fields.Str(required=True, data_key="campaign_name")
@@ -404,6 +447,27 @@ class AdGroupUpdate(AdGroupCreate):
     adgroup_name = fields.Str(required=False, data_key="adgroup_name")
 
 
+class AdGroupBudget(Schema):
+    adgroup_id = fields.Str(required=True, data_key="adgroup_id")
+    budget = fields.Float(required=True, data_key="budget")
+
+
+class AdGroupBudgetUpdate(Schema):
+    advertiser_id = fields.Str(required=True, data_key="advertiser_id")
+    budget = fields.Nested(AdGroupBudget, many=True, required=True, data_key="budget")
+
+    @post_load
+    def post_process_data(self, data: typing.Dict, **kwargs: typing.Any) -> typing.Dict:
+        return utils.convert_schema_list_and_dict_fields_to_json_string(data=data)
+
+
+class AdGroupBidUpdate(Schema):
+    advertiser_id = fields.Str(required=True, data_key="advertiser_id")
+    adgroup_id = fields.Str(required=True, data_key="adgroup_id")
+    bid_price = fields.Float(required=False, data_key="bid_price")
+    conversion_bid_price = fields.Float(required=False, data_key="conversion_bid_price")
+
+
 class ImageCreate(Schema):
     advertiser_id = fields.Str(required=True, data_key="advertiser_id")
     file_name = fields.Str(required=False, data_key="file_name")
@@ -591,8 +655,8 @@ class AdInsights(ResourceInsights, AdInsightsMetrics, AdInsightDimensions):
 
 
 class InsightsReport(Schema):
-    def __init__(self, advertiser_id):
-        super(InsightsReport, self).__init__()
+    def __init__(self, advertiser_id, **kwargs):
+        super(InsightsReport, self).__init__(**kwargs)
         self.advertiser_id = advertiser_id
 
     resource_insights = fields.Nested(ResourceInsights, many=True)
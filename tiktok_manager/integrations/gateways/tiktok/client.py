@@ -1,10 +1,13 @@
 import datetime
 import json
+import threading
+import time
 import typing
 
 import requests
+import requests.adapters
 
-from tiktok_manager import enums, utils
+from tiktok_manager import concurrency, enums, utils
 from tiktok_manager.integrations.gateways.tiktok import (
     exceptions as tiktok_api_exceptions,
 )
@@ -14,10 +17,58 @@ class TikTokApiClient(object):
     BASE_URL = "https://business-api.tiktok.com/open_api/v1.3"
     VALID_STATUS_CODES = [200]
     VALID_PAYLOAD_STATUS_CODES = [0, 20001]
+    RATE_LIMIT_STATUS_CODES = [429]
+    RATE_LIMIT_PAYLOAD_CODES = [40100]
     LIMIT = 1000
+    LIBRARY_LIMIT = 100
+    REQUESTS_PER_SECOND = 10
+    MAX_RATE_LIMIT_RETRIES = 5
+    RATE_LIMIT_BACKOFF_SECONDS = 1
+    CONNECTION_POOL_SIZE = 32
 
-    def __init__(self, user_access_token: str) -> None:
+    _rate_limiters = {}
+    _rate_limiters_lock = threading.Lock()
+
+    def __init__(
+        self,
+        user_access_token: str,
+        requests_per_second: typing.Optional[float] = None,
+    ) -> None:
         self._user_access_token = user_access_token
+        self._rate_limiter = self._get_rate_limiter(
+            user_access_token=user_access_token,
+            requests_per_second=requests_per_second,
+        )
+        self._session = requests.Session()
+        self._session.mount(
+            "https://",
+            requests.adapters.HTTPAdapter(
+                pool_connections=self.CONNECTION_POOL_SIZE,
+                pool_maxsize=self.CONNECTION_POOL_SIZE,
+            ),
+        )
+
+    @classmethod
+    def _get_rate_limiter(
+        cls, user_access_token: str, requests_per_second: typing.Optional[float]
+    ) -> concurrency.RateLimiter:
+        """
+        Requests made with the same access token share one quota, so every client
+        created for the token in this process shares the same rate limiter. A
+        client given another `requests_per_second` changes the rate of the shared
+        limiter, while a client without one keeps the current rate.
+        """
+        with cls._rate_limiters_lock:
+            rate_limiter = cls._rate_limiters.get(user_access_token)
+            if not rate_limiter:
+                rate_limiter = concurrency.RateLimiter(
+                    rate=requests_per_second or cls.REQUESTS_PER_SECOND
+                )
+                cls._rate_limiters[user_access_token] = rate_limiter
+            elif requests_per_second and requests_per_second != rate_limiter.rate:
+                rate_limiter.set_rate(rate=requests_per_second)
+
+            return rate_limiter
 
     def get_ad_accounts(self, app_id: str, secret: str) -> typing.List[typing.Dict]:
         return self._get_content(
@@ -32,36 +83,81 @@ class TikTokApiClient(object):
         )["data"]["list"]
 
     def get_advertiser_campaigns(
-        self, advertiser_id: str, fields: typing.List[str]
+        self,
+        advertiser_id: str,
+        fields: typing.List[str],
+        filtering: typing.Optional[typing.Dict] = None,
     ) -> typing.List[typing.Dict]:
         return self._get_paginated_content(
             endpoint="campaign/get/",
-            params={
-                "advertiser_id": advertiser_id,
-                "fields": json.dumps(fields),
-            },
+            params=self._get_resource_params(
+                advertiser_id=advertiser_id, fields=fields, filtering=filtering
+            ),
+        )
+
+    def iter_advertiser_campaigns(
+        self,
+        advertiser_id: str,
+        fields: typing.List[str],
+        filtering: typing.Optional[typing.Dict] = None,
+    ) -> typing.Iterator[typing.List[typing.Dict]]:
+        return self._iter_paginated_content(
+            endpoint="campaign/get/",
+            params=self._get_resource_params(
+                advertiser_id=advertiser_id, fields=fields, filtering=filtering
+            ),
         )
 
     def get_advertiser_adgroups(
-        self, advertiser_id: str, fields: typing.List[str]
+        self,
+        advertiser_id: str,
+        fields: typing.List[str],
+        filtering: typing.Optional[typing.Dict] = None,
     ) -> typing.List[typing.Dict]:
         return self._get_paginated_content(
             endpoint="adgroup/get/",
-            params={
-                "advertiser_id": advertiser_id,
-                "fields": json.dumps(fields),
-            },
+            params=self._get_resource_params(
+                advertiser_id=advertiser_id, fields=fields, filtering=filtering
+            ),
+        )
+
+    def iter_advertiser_adgroups(
+        self,
+        advertiser_id: str,
+        fields: typing.List[str],
+        filtering: typing.Optional[typing.Dict] = None,
+    ) -> typing.Iterator[typing.List[typing.Dict]]:
+        return self._iter_paginated_content(
+            endpoint="adgroup/get/",
+            params=self._get_resource_params(
+                advertiser_id=advertiser_id, fields=fields, filtering=filtering
+            ),
         )
 
     def get_advertiser_ads(
-        self, advertiser_id: str, fields: typing.List[str]
+        self,
+        advertiser_id: str,
+        fields: typing.List[str],
+        filtering: typing.Optional[typing.Dict] = None,
     ) -> typing.List[typing.Dict]:
         return self._get_paginated_content(
             endpoint="ad/get/",
-            params={
-                "advertiser_id": advertiser_id,
-                "fields": json.dumps(fields),
-            },
+            params=self._get_resource_params(
+                advertiser_id=advertiser_id, fields=fields, filtering=filtering
+            ),
+        )
+
+    def iter_advertiser_ads(
+        self,
+        advertiser_id: str,
+        fields: typing.List[str],
+        filtering: typing.Optional[typing.Dict] = None,
+    ) -> typing.Iterator[typing.List[typing.Dict]]:
+        return self._iter_paginated_content(
+            endpoint="ad/get/",
+            params=self._get_resource_params(
+                advertiser_id=advertiser_id, fields=fields, filtering=filtering
+            ),
         )
 
     def create_ads(self, ad_params: typing.Dict) -> typing.Dict:
@@ -91,6 +187,28 @@ class TikTokApiClient(object):
             )
         )["data"]
 
+    def update_campaigns_status(
+        self, campaigns_status_params: typing.Dict
+    ) -> typing.Dict:
+        return self._get_content(
+            response=self._request(
+                endpoint="campaign/status/update",
+                method=enums.HttpMethod.POST,
+                params=campaigns_status_params,
+            )
+        )["data"]
+
+    def update_adgroups_status(
+        self, adgroups_status_params: typing.Dict
+    ) -> typing.Dict:
+        return self._get_content(
+            response=self._request(
+                endpoint="adgroup/status/update",
+                method=enums.HttpMethod.POST,
+                params=adgroups_status_params,
+            )
+        )["data"]
+
     def create_campaign(self, campaign_params: typing.Dict) -> typing.Dict:
         return self._get_content(
             response=self._request(
@@ -118,6 +236,17 @@ class TikTokApiClient(object):
             )
         )["data"]
 
+    def update_adgroups_budget(
+        self, adgroups_budget_params: typing.Dict
+    ) -> typing.Dict:
+        return self._get_content(
+            response=self._request(
+                endpoint="adgroup/budget/update",
+                method=enums.HttpMethod.POST,
+                params=adgroups_budget_params,
+            )
+        )["data"]
+
     def update_adgroup(self, adgroup_params: typing.Dict) -> typing.Dict:
         return self._get_content(
             response=self._request(
@@ -127,12 +256,17 @@ class TikTokApiClient(object):
             )
         )["data"]
 
-    def upload_image(self, image_params: typing.Dict) -> typing.Dict:
+    def upload_image(
+        self,
+        image_params: typing.Dict,
+        image_file: typing.Optional[typing.BinaryIO] = None,
+    ) -> typing.Dict:
         return self._get_content(
             response=self._request(
                 endpoint="file/image/ad/upload",
                 method=enums.HttpMethod.POST,
                 params=image_params,
+                files={"image_file": image_file} if image_file else None,
             )
         )["data"]
 
@@ -154,12 +288,56 @@ class TikTokApiClient(object):
             )
         )["data"]["list"]
 
-    def upload_video(self, video_params: typing.Dict) -> typing.Dict:
+    def iter_images(
+        self, advertiser_id: str
+    ) -> typing.Iterator[typing.List[typing.Dict]]:
+        return self._iter_paginated_content(
+            endpoint="file/image/ad/search",
+            params={"advertiser_id": advertiser_id},
+            page_size=self.LIBRARY_LIMIT,
+        )
+
+    def upload_video(
+        self,
+        video_params: typing.Dict,
+        video_file: typing.Optional[typing.BinaryIO] = None,
+    ) -> typing.Dict:
         return self._get_content(
             response=self._request(
                 endpoint="file/video/ad/upload",
                 method=enums.HttpMethod.POST,
                 params=video_params,
+                files={"video_file": video_file} if video_file else None,
+            )
+        )["data"]
+
+    def start_file_upload(self, upload_params: typing.Dict) -> typing.Dict:
+        return self._get_content(
+            response=self._request(
+                endpoint="file/start/upload",
+                method=enums.HttpMethod.POST,
+                params=upload_params,
+            )
+        )["data"]
+
+    def transfer_file_chunk(
+        self, upload_params: typing.Dict, chunk_file: typing.BinaryIO
+    ) -> typing.Dict:
+        return self._get_content(
+            response=self._request(
+                endpoint="file/transfer/upload",
+                method=enums.HttpMethod.POST,
+                params=upload_params,
+                files={"file": chunk_file},
+            )
+        )["data"]
+
+    def finish_file_upload(self, upload_params: typing.Dict) -> typing.Dict:
+        return self._get_content(
+            response=self._request(
+                endpoint="file/finish/upload",
+                method=enums.HttpMethod.POST,
+                params=upload_params,
             )
         )["data"]
 
@@ -181,6 +359,15 @@ class TikTokApiClient(object):
             )
         )["data"]["list"]
 
+    def iter_videos(
+        self, advertiser_id: str
+    ) -> typing.Iterator[typing.List[typing.Dict]]:
+        return self._iter_paginated_content(
+            endpoint="file/video/ad/search",
+            params={"advertiser_id": advertiser_id},
+            page_size=self.LIBRARY_LIMIT,
+        )
+
     def get_insights_report(
         self,
         advertiser_id: str,
@@ -194,27 +381,102 @@ class TikTokApiClient(object):
     ) -> typing.List[typing.Dict]:
         return self._get_paginated_content(
             endpoint="report/integrated/get",
-            params={
-                "advertiser_id": advertiser_id,
-                "service_type": service_type,
-                "report_type": report_type,
-                "data_level": data_level,
-                "dimensions": json.dumps(dimensions),
-                "metrics": json.dumps(metrics),
-                "start_date": utils.format_tiktok_date(from_datetime),
-                "end_date": utils.format_tiktok_date(to_datetime),
-            },
+            params=self._get_insights_report_params(
+                advertiser_id=advertiser_id,
+                service_type=service_type,
+                report_type=report_type,
+                data_level=data_level,
+                dimensions=dimensions,
+                metrics=metrics,
+                from_datetime=from_datetime,
+                to_datetime=to_datetime,
+            ),
+        )
+
+    def iter_insights_report(
+        self,
+        advertiser_id: str,
+        service_type: str,
+        report_type: str,
+        data_level: str,
+        dimensions: typing.List[str],
+        metrics: typing.List[str],
+        from_datetime: datetime.datetime,
+        to_datetime: datetime.datetime,
+    ) -> typing.Iterator[typing.List[typing.Dict]]:
+        return self._iter_paginated_content(
+            endpoint="report/integrated/get",
+            params=self._get_insights_report_params(
+                advertiser_id=advertiser_id,
+                service_type=service_type,
+                report_type=report_type,
+                data_level=data_level,
+                dimensions=dimensions,
+                metrics=metrics,
+                from_datetime=from_datetime,
+                to_datetime=to_datetime,
+            ),
         )
 
+    @staticmethod
+    def _get_insights_report_params(
+        advertiser_id: str,
+        service_type: str,
+        report_type: str,
+        data_level: str,
+        dimensions: typing.List[str],
+        metrics: typing.List[str],
+        from_datetime: datetime.datetime,
+        to_datetime: datetime.datetime,
+    ) -> typing.Dict:
+        return {
+            "advertiser_id": advertiser_id,
+            "service_type": service_type,
+            "report_type": report_type,
+            "data_level": data_level,
+            "dimensions": json.dumps(dimensions),
+            "metrics": json.dumps(metrics),
+            "start_date": utils.format_tiktok_date(from_datetime),
+            "end_date": utils.format_tiktok_date(to_datetime),
+        }
+
+    @staticmethod
+    def _get_resource_params(
+        advertiser_id: str,
+        fields: typing.List[str],
+        filtering: typing.Optional[typing.Dict] = None,
+    ) -> typing.Dict:
+        params = {
+            "advertiser_id": advertiser_id,
+            "fields": json.dumps(fields),
+        }
+        if filtering:
+            params["filtering"] = json.dumps(filtering)
+
+        return params
+
     def _get_paginated_content(
         self,
         endpoint: str,
         params: typing.Optional[typing.Dict] = None,
         page_size: typing.Optional[int] = None,
     ) -> typing.List[typing.Dict]:
+        all_data = []
+        for page_data in self._iter_paginated_content(
+            endpoint=endpoint, params=params, page_size=page_size
+        ):
+            all_data.extend(page_data)
+
+        return all_data
+
+    def _iter_paginated_content(
+        self,
+        endpoint: str,
+        params: typing.Optional[typing.Dict] = None,
+        page_size: typing.Optional[int] = None,
+    ) -> typing.Iterator[typing.List[typing.Dict]]:
         params = params if params else {}
         params["page_size"] = self.LIMIT if not page_size else page_size
-        all_data = []
 
         while True:
             data = self._get_content(
@@ -224,7 +486,7 @@ class TikTokApiClient(object):
                     params=params,
                 )
             )["data"]
-            all_data.extend(data.get("list", []))
+            yield data.get("list", [])
 
             page_number = data["page_info"]["page"]
             if page_number >= data["page_info"]["total_page"]:
@@ -233,27 +495,74 @@ class TikTokApiClient(object):
             page_number += 1
             params["page"] = page_number
 
-        return all_data
-
     def _request(
         self,
         endpoint: str,
         method: enums.HttpMethod,
         params: typing.Optional[typing.Dict] = None,
         payload: typing.Optional[typing.Dict] = None,
+        files: typing.Optional[typing.Dict[str, typing.BinaryIO]] = None,
+    ) -> requests.Response:
+        retry = 0
+        while True:
+            self._rate_limiter.acquire()
+            for file in (files or {}).values():
+                file.seek(0)
+            try:
+                return self._send_request(
+                    endpoint=endpoint,
+                    method=method,
+                    params=params,
+                    payload=payload,
+                    files=files,
+                )
+            except (
+                tiktok_api_exceptions.BadResponseCodeError,
+                tiktok_api_exceptions.BadPayloadCodeError,
+            ) as e:
+                if retry >= self.MAX_RATE_LIMIT_RETRIES or not self._is_rate_limited(
+                    exception=e
+                ):
+                    raise
+
+            time.sleep(self.RATE_LIMIT_BACKOFF_SECONDS * 2**retry)
+            retry += 1
+
+    def _is_rate_limited(
+        self, exception: tiktok_api_exceptions.TikTokAPIClientError
+    ) -> bool:
+        if isinstance(exception, tiktok_api_exceptions.BadPayloadCodeError):
+            return exception.payload_code in self.RATE_LIMIT_PAYLOAD_CODES
+
+        return exception.code in self.RATE_LIMIT_STATUS_CODES
+
+    def _send_request(
+        self,
+        endpoint: str,
+        method: enums.HttpMethod,
+        params: typing.Optional[typing.Dict] = None,
+        payload: typing.Optional[typing.Dict] = None,
+        files: typing.Optional[typing.Dict[str, typing.BinaryIO]] = None,
     ) -> requests.Response:
         full_endpoint = f"{self.BASE_URL}/{endpoint}"
+        headers = {
+            "Access-Token": self._user_access_token,
+            "Accept": "application/json",
+        }
+        if files:
+            # File uploads are sent as multipart forms, with the parameters as
+            # form fields.
+            payload, params = params, None
+        else:
+            headers["Content-Type"] = "application/json"
         try:
-            response = requests.request(
+            response = self._session.request(
                 url=full_endpoint,
                 method=method.value,
                 params=params,
-                headers={
-                    "Access-Token": self._user_access_token,
-                    "Accept": "application/json",
-                    "Content-Type": "application/json",
-                },
+                headers=headers,
                 data=payload,
+                files=files,
             )
             if response.status_code not in self.VALID_STATUS_CODES:
                 raise tiktok_api_exceptions.BadResponseCodeError(
@@ -0,0 +1,49 @@
+import dataclasses
+import typing
+
+from tiktok_manager import enums
+
+
+@dataclasses.dataclass
+class Change:
+    """
+    One change needed to reach the desired structure. `path` holds the names of
+    the campaign, adgroup and ad leading to the entity, and `entity_id` is only
+    known for entities that already exist.
+    """
+
+    action: enums.ChangeAction
+    resource_type: enums.ResourceType
+    path: typing.Tuple[str, ...]
+    entity_id: typing.Optional[str] = None
+    details: typing.Dict = dataclasses.field(default_factory=dict)
+    changed_fields: typing.List[str] = dataclasses.field(default_factory=list)
+
+
+@dataclasses.dataclass
+class Plan:
+    advertiser_id: str
+    changes: typing.List[Change] = dataclasses.field(default_factory=list)
+    entity_ids: typing.Dict[typing.Tuple[str, ...], str] = dataclasses.field(
+        default_factory=dict
+    )
+
+    @property
+    def is_empty(self) -> bool:
+        return not self.changes
+
+    def get_changes(
+        self,
+        resource_type: typing.Optional[enums.ResourceType],
+        actions: typing.List[enums.ChangeAction],
+    ) -> typing.List[typing.Tuple[int, Change]]:
+        """
+        Returns the matching changes with their position in the plan, for every
+        resource type when `resource_type` is None.
+        """
+        return [
+            (index, change)
+            for index, change in enumerate(self.changes)
+            if resource_type in (None, change.resource_type)
+            and change.action in actions
+        ]
@@ -0,0 +1,94 @@
+import dataclasses
+import datetime
+import typing
+
+from tiktok_manager import enums
+
+
+@dataclasses.dataclass
+class AdvertiserResult:
+    advertiser_id: str
+    status: enums.ResultStatus
+    records_count: int = 0
+    error_class: typing.Optional[str] = None
+    error_message: typing.Optional[str] = None
+    started_at: typing.Optional[datetime.datetime] = None
+    duration_seconds: float = 0.0
+
+
+@dataclasses.dataclass
+class ImportResult:
+    resource_type: enums.ResourceType
+    dataset: typing.Optional[enums.Dataset] = None
+    uploaded_paths: typing.List[str] = dataclasses.field(default_factory=list)
+    advertisers: typing.List[AdvertiserResult] = dataclasses.field(default_factory=list)
+
+    @property
+    def records_count(self) -> int:
+        return sum(advertiser.records_count for advertiser in self.advertisers)
+
+    @property
+    def failed_advertiser_ids(self) -> typing.List[str]:
+        return [
+            advertiser.advertiser_id
+            for advertiser in self.advertisers
+            if advertiser.status == enums.ResultStatus.FAILED
+        ]
+
+    @property
+    def is_successful(self) -> bool:
+        return not self.failed_advertiser_ids
+
+
+@dataclasses.dataclass
+class SessionResult:
+    imports: typing.List[ImportResult] = dataclasses.field(default_factory=list)
+    error_class: typing.Optional[str] = None
+    error_message: typing.Optional[str] = None
+
+    @property
+    def uploaded_paths(self) -> typing.List[str]:
+        return [path for result in self.imports for path in result.uploaded_paths]
+
+    @property
+    def records_count(self) -> int:
+        return sum(result.records_count for result in self.imports)
+
+    @property
+    def is_successful(self) -> bool:
+        return self.error_class is None and all(
+            result.is_successful for result in self.imports
+        )
+
+
+@dataclasses.dataclass
+class AssetResult:
+    advertiser_id: str
+    status: enums.ResultStatus
+    asset_id: typing.Optional[str] = None
+    created: bool = False
+    error_class: typing.Optional[str] = None
+    error_message: typing.Optional[str] = None
+
+
+@dataclasses.dataclass
+class ActionResult:
+    advertiser_id: str
+    status: enums.ResultStatus
+    entity_id: typing.Optional[str] = None
+    created: bool = False
+    updated: bool = False
+    error_class: typing.Optional[str] = None
+    error_message: typing.Optional[str] = None
+
+
+@dataclasses.dataclass
+class AdjustmentResult:
+    advertiser_id: str
+    adgroup_id: str
+    status: enums.ResultStatus
+    old_value: typing.Optional[float] = None
+    new_value: typing.Optional[float] = None
+    updated: bool = False
+    error_class: typing.Optional[str] = None
+    error_message: typing.Optional[str] = None
@@ -0,0 +1,162 @@
+"""
+Import scheduler.
+
+    python -m tiktok_manager.scheduler run --tenants tenants.json --workers 8
+    python -m tiktok_manager.scheduler enqueue --tenant acme --dataset performance \
+        --resource-type ad --date-from 2023-07-01 --date-to 2023-07-31 --spread 86400
+    python -m tiktok_manager.scheduler list --status failed
+"""
+import argparse
+import datetime
+import json
+import logging
+import signal
+import sys
+import typing
+import zlib
+
+from tiktok_manager import enums, exceptions
+from tiktok_manager.scheduler import constants as scheduler_constants
+from tiktok_manager.scheduler import daemon as scheduler_daemon
+from tiktok_manager.scheduler import enums as scheduler_enums
+from tiktok_manager.scheduler import jobs as scheduler_jobs
+
+
+def run(arguments: argparse.Namespace) -> None:
+    scheduler = scheduler_daemon.Scheduler(
+        job_queue=scheduler_jobs.JobQueue(database_path=arguments.database),
+        tenants=scheduler_daemon.load_tenants(path=arguments.tenants),
+        workers=arguments.workers,
+        default_tenant_concurrency=arguments.tenant_concurrency,
+        poll_interval=arguments.poll_interval,
+    )
+    signal.signal(signal.SIGTERM, lambda *_: scheduler.stop())
+    signal.signal(signal.SIGINT, lambda *_: scheduler.stop())
+    scheduler.run()
+
+
+def enqueue(arguments: argparse.Namespace) -> None:
+    now = datetime.datetime.utcnow()
+    # A stable per-tenant offset spreads recurring jobs of many tenants over the
+    # `spread` window instead of starting them all at once.
+    delay = arguments.delay
+    if arguments.spread:
+        delay += zlib.crc32(arguments.tenant.encode()) % arguments.spread
+
+    job_id = scheduler_jobs.JobQueue(database_path=arguments.database).enqueue(
+        tenant_id=arguments.tenant,
+        dataset=enums.Dataset(arguments.dataset),
+        resource_type=enums.ResourceType(arguments.resource_type),
+        date_from=_get_date(value=arguments.date_from),
+        date_to=_get_date(value=arguments.date_to),
+        priority=arguments.priority,
+        run_at=now + datetime.timedelta(seconds=delay),
+        deadline=now + datetime.timedelta(seconds=arguments.deadline)
+        if arguments.deadline
+        else None,
+        max_attempts=arguments.max_attempts,
+        options=json.loads(arguments.options),
+    )
+    print(job_id)
+
+
+def list_jobs(arguments: argparse.Namespace) -> None:
+    for job in scheduler_jobs.JobQueue(database_path=arguments.database).list_jobs(
+        status=scheduler_enums.JobStatus(arguments.status)
+        if arguments.status
+        else None,
+        limit=arguments.limit,
+    ):
+        print(
+            "{}\t{}\t{}\t{}\t{}\t{}/{}\t{}".format(
+                job.id,
+                job.tenant_id,
+                job.dataset.value,
+                job.resource_type.value,
+                job.status.value,
+                job.attempts,
+                job.max_attempts,
+                job.error or "",
+            )
+        )
+
+
+def _get_date(value: typing.Optional[str]) -> typing.Optional[datetime.datetime]:
+    return datetime.datetime.fromisoformat(value) if value else None
+
+
+def _get_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m tiktok_manager.scheduler")
+    parser.add_argument("--database", default=scheduler_constants.DEFAULT_DATABASE_PATH)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="Run the scheduler")
+    run_parser.add_argument("--tenants", required=True, help="Tenants JSON file")
+    run_parser.add_argument(
+        "--workers", type=int, default=scheduler_constants.DEFAULT_WORKERS
+    )
+    run_parser.add_argument(
+        "--tenant-concurrency",
+        type=int,
+        default=scheduler_constants.DEFAULT_TENANT_CONCURRENCY,
+    )
+    run_parser.add_argument(
+        "--poll-interval",
+        type=float,
+        default=scheduler_constants.POLL_INTERVAL_SECONDS,
+    )
+    run_parser.set_defaults(func=run)
+
+    enqueue_parser = subparsers.add_parser("enqueue", help="Add a job to the queue")
+    enqueue_parser.add_argument("--tenant", required=True)
+    enqueue_parser.add_argument(
+        "--dataset",
+        required=True,
+        choices=[dataset.value for dataset in enums.Dataset],
+    )
+    enqueue_parser.add_argument(
+        "--resource-type",
+        required=True,
+        choices=[resource_type.value for resource_type in enums.ResourceType],
+    )
+    enqueue_parser.add_argument("--date-from")
+    enqueue_parser.add_argument("--date-to")
+    enqueue_parser.add_argument(
+        "--priority", type=int, default=scheduler_constants.DEFAULT_PRIORITY
+    )
+    enqueue_parser.add_argument("--delay", type=int, default=0, help="Seconds")
+    enqueue_parser.add_argument("--spread", type=int, default=0, help="Seconds")
+    enqueue_parser.add_argument(
+        "--deadline", type=int, help="Seconds from now to start the job by"
+    )
+    enqueue_parser.add_argument(
+        "--max-attempts", type=int, default=scheduler_constants.DEFAULT_MAX_ATTEMPTS
+    )
+    enqueue_parser.add_argument(
+        "--options", default="{}", help="JSON of extra importer arguments"
+    )
+    enqueue_parser.set_defaults(func=enqueue)
+
+    list_parser = subparsers.add_parser("list", help="List jobs")
+    list_parser.add_argument(
+        "--status", choices=[status.value for status in scheduler_enums.JobStatus]
+    )
+    list_parser.add_argument("--limit", type=int, default=100)
+    list_parser.set_defaults(func=list_jobs)
+
+    return parser
+
+
+def main() -> None:
+    logging.basicConfig(
+        level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s %(message)s"
+    )
+    arguments = _get_parser().parse_args()
+    try:
+        arguments.func(arguments)
+    except exceptions.SchedulerException as e:
+        sys.exit(str(e))
+
+
+if __name__ == "__main__":
+    main()
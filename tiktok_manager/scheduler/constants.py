@@ -0,0 +1,15 @@
+DEFAULT_DATABASE_PATH = "tiktok_manager_jobs.db"
+DEFAULT_WORKERS = 4
+DEFAULT_TENANT_CONCURRENCY = 1
+DEFAULT_MAX_ATTEMPTS = 3
+DEFAULT_PRIORITY = 0
+POLL_INTERVAL_SECONDS = 5
+RETRY_BACKOFF_SECONDS = 60
+MAX_RETRY_BACKOFF_SECONDS = 60 * 60
+DATABASE_TIMEOUT_SECONDS = 30
+HEARTBEAT_INTERVAL_SECONDS = 30
+HEARTBEAT_TIMEOUT_SECONDS = 5 * 60
+STATE_UPDATE_RETRIES = 5
+STATE_UPDATE_RETRY_BACKOFF_SECONDS = 1
+DEFAULT_FAIR_SHARE_WORKERS = 16
+DEFAULT_FAIR_SHARE_TENANTS = 8  # Tenant sessions held in memory at the same time
@@ -0,0 +1,309 @@
+import concurrent.futures
+import dataclasses
+import json
+import logging
+import sqlite3
+import threading
+import time
+import typing
+
+from tiktok_manager import enums, exceptions, results, utils
+from tiktok_manager.integrations.clients.s3 import enums as s3_client_enums
+from tiktok_manager.scheduler import constants as scheduler_constants
+from tiktok_manager.scheduler import enums as scheduler_enums
+from tiktok_manager.scheduler import jobs as scheduler_jobs
+from tiktok_manager.services import importer
+
+logger = logging.getLogger(__name__)
+
+IMPORT_FUNCTIONS = {
+    (enums.Dataset.DETAILS, enums.ResourceType.CAMPAIGN): importer.get_campaigns,
+    (enums.Dataset.DETAILS, enums.ResourceType.AD_GROUP): importer.get_adgroups,
+    (enums.Dataset.DETAILS, enums.ResourceType.AD): importer.get_ads,
+    (
+        enums.Dataset.PERFORMANCE,
+        enums.ResourceType.CAMPAIGN,
+    ): importer.get_campaign_insights,
+    (
+        enums.Dataset.PERFORMANCE,
+        enums.ResourceType.AD_GROUP,
+    ): importer.get_adgroup_insights,
+    (enums.Dataset.PERFORMANCE, enums.ResourceType.AD): importer.get_ad_insights,
+}
+# Used for jobs with the "isolate_failures" option.
+ISOLATED_IMPORT_FUNCTIONS = {
+    enums.Dataset.DETAILS: importer.import_details,
+    enums.Dataset.PERFORMANCE: importer.import_insights,
+}
+
+
+@dataclasses.dataclass
+class Tenant:
+    tenant_id: str
+    user_access_token: str
+    app_id: str
+    secret: str
+    s3_path: str
+    max_concurrent_jobs: typing.Optional[int] = None
+
+
+def load_tenants(path: str) -> typing.Dict[str, Tenant]:
+    """
+    Reads tenants from a JSON file of the form
+    `{"<tenant_id>": {"user_access_token": ..., "app_id": ..., "secret": ...,
+    "s3_path": ..., "max_concurrent_jobs": ...}}`.
+    """
+    try:
+        with open(path) as f:
+            tenants_data = json.load(f)
+
+        return {
+            tenant_id: Tenant(tenant_id=tenant_id, **tenant_data)
+            for tenant_id, tenant_data in tenants_data.items()
+        }
+    except (OSError, TypeError, ValueError) as e:
+        raise exceptions.SchedulerException(
+            "Unable to load tenants (path={}). Error: {}".format(
+                path, utils.get_exception_message(exception=e)
+            )
+        )
+
+
+class Scheduler(object):
+    """
+    Runs queued import jobs on a pool of `workers` threads until stopped.
+
+    A job is claimed whenever a worker is free. Tenants run at most
+    `max_concurrent_jobs` jobs at a time (`default_tenant_concurrency` when not
+    set), so one large tenant cannot occupy the whole pool. Failed jobs are
+    retried with backoff by the job queue.
+
+    The jobs it runs get a heartbeat every `heartbeat_interval` seconds, and
+    jobs without a heartbeat for `heartbeat_timeout` seconds, left by a stopped
+    scheduler, are requeued. Several schedulers can share one job queue.
+    """
+
+    def __init__(
+        self,
+        job_queue: scheduler_jobs.JobQueue,
+        tenants: typing.Dict[str, Tenant],
+        workers: int = scheduler_constants.DEFAULT_WORKERS,
+        default_tenant_concurrency: int = scheduler_constants.DEFAULT_TENANT_CONCURRENCY,
+        poll_interval: float = scheduler_constants.POLL_INTERVAL_SECONDS,
+        heartbeat_interval: float = scheduler_constants.HEARTBEAT_INTERVAL_SECONDS,
+        heartbeat_timeout: float = scheduler_constants.HEARTBEAT_TIMEOUT_SECONDS,
+    ) -> None:
+        self._job_queue = job_queue
+        self._tenants = tenants
+        self._workers = workers
+        self._default_tenant_concurrency = default_tenant_concurrency
+        self._poll_interval = poll_interval
+        self._heartbeat_interval = heartbeat_interval
+        self._heartbeat_timeout = heartbeat_timeout
+        self._stopped = threading.Event()
+        self._wakeup = threading.Event()
+        self._running_job_ids = set()
+        self._running_job_ids_lock = threading.Lock()
+        self._heartbeat_stopped = threading.Event()
+
+    def run(self) -> None:
+        self._requeue_expired_jobs()
+        self._heartbeat_stopped.clear()
+        heartbeat_thread = threading.Thread(target=self._send_heartbeats, daemon=True)
+        heartbeat_thread.start()
+        try:
+            self._run_jobs()
+        finally:
+            self._heartbeat_stopped.set()
+            heartbeat_thread.join()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self._wakeup.set()
+
+    def _run_jobs(self) -> None:
+        tenant_concurrency = {
+            tenant.tenant_id: tenant.max_concurrent_jobs
+            for tenant in self._tenants.values()
+            if tenant.max_concurrent_jobs
+        }
+        running_jobs = set()
+        with concurrent.futures.ThreadPoolExecutor(
+            max_workers=self._workers
+        ) as executor:
+            while not self._stopped.is_set():
+                running_jobs = {job for job in running_jobs if not job.done()}
+                if len(running_jobs) < self._workers:
+                    job = self._job_queue.claim(
+                        tenant_concurrency=tenant_concurrency,
+                        default_tenant_concurrency=self._default_tenant_concurrency,
+                    )
+                    if job:
+                        with self._running_job_ids_lock:
+                            self._running_job_ids.add(job.id)
+                        running_jobs.add(executor.submit(self._run_job, job))
+                        continue
+
+                self._wakeup.wait(timeout=self._poll_interval)
+                self._wakeup.clear()
+
+            logger.warning(
+                "Stopping scheduler, waiting for {} running jobs".format(
+                    len(running_jobs)
+                )
+            )
+
+    def _send_heartbeats(self) -> None:
+        """
+        Keeps the running jobs of this scheduler alive, including while it waits
+        for them to finish on stop, and requeues the jobs of stopped schedulers.
+        """
+        while not self._heartbeat_stopped.wait(timeout=self._heartbeat_interval):
+            with self._running_job_ids_lock:
+                running_job_ids = list(self._running_job_ids)
+            try:
+                self._job_queue.heartbeat(job_ids=running_job_ids)
+                self._requeue_expired_jobs()
+            except sqlite3.Error as e:
+                logger.warning(
+                    "Unable to send job heartbeats (job_ids={}). Error: {}".format(
+                        running_job_ids, utils.get_exception_message(exception=e)
+                    )
+                )
+
+    def _requeue_expired_jobs(self) -> None:
+        requeued_jobs = self._job_queue.requeue_running(
+            heartbeat_timeout=self._heartbeat_timeout
+        )
+        if requeued_jobs:
+            logger.warning("Requeued {} interrupted jobs".format(requeued_jobs))
+
+    def _run_job(self, job: scheduler_jobs.Job) -> None:
+        logger.warning(
+            "Running job (job_id={}, tenant_id={}, dataset={}, resource_type={}, attempt={})".format(
+                job.id,
+                job.tenant_id,
+                job.dataset.value,
+                job.resource_type.value,
+                job.attempts,
+            )
+        )
+        try:
+            tenant = self._tenants.get(job.tenant_id)
+            if not tenant:
+                self._update_job(
+                    job=job,
+                    update=self._job_queue.fail,
+                    job_id=job.id,
+                    error="Tenant (tenant_id={}) is not configured".format(
+                        job.tenant_id
+                    ),
+                    retry=False,
+                )
+                return
+
+            try:
+                output = self._import(job=job, tenant=tenant)
+            except Exception as e:
+                status = self._update_job(
+                    job=job,
+                    update=self._job_queue.fail,
+                    job_id=job.id,
+                    error=utils.get_exception_message(exception=e),
+                )
+                logger.warning(
+                    "Job (job_id={}) failed and is {}. Error: {}".format(
+                        job.id,
+                        status.value if status else "unchanged",
+                        utils.get_exception_message(exception=e),
+                    )
+                )
+                return
+
+            self._update_job(
+                job=job,
+                update=self._job_queue.complete,
+                job_id=job.id,
+                result=self._get_job_result(output=output),
+            )
+        finally:
+            with self._running_job_ids_lock:
+                self._running_job_ids.discard(job.id)
+            self._wakeup.set()
+
+    @staticmethod
+    def _update_job(
+        job: scheduler_jobs.Job, update: typing.Callable, **kwargs: typing.Any
+    ) -> typing.Any:
+        """
+        Records the outcome of a job, retrying while the database is busy. When
+        it cannot be recorded, the job stops getting heartbeats and is requeued
+        once its heartbeat expires.
+        """
+        retry = 0
+        while True:
+            try:
+                return update(**kwargs)
+            except sqlite3.Error as e:
+                logger.warning(
+                    "Unable to update job (job_id={}, attempt={}). Error: {}".format(
+                        job.id, retry + 1, utils.get_exception_message(exception=e)
+                    )
+                )
+                if retry >= scheduler_constants.STATE_UPDATE_RETRIES:
+                    return None
+
+            time.sleep(
+                scheduler_constants.STATE_UPDATE_RETRY_BACKOFF_SECONDS * 2**retry
+            )
+            retry += 1
+
+    def _import(
+        self, job: scheduler_jobs.Job, tenant: Tenant
+    ) -> typing.Union[typing.Tuple, results.ImportResult]:
+        import_kwargs = self._get_import_kwargs(job=job, tenant=tenant)
+        if import_kwargs.pop("isolate_failures", False):
+            return ISOLATED_IMPORT_FUNCTIONS[job.dataset](
+                resource_type=job.resource_type, **import_kwargs
+            )
+
+        return IMPORT_FUNCTIONS[(job.dataset, job.resource_type)](**import_kwargs)
+
+    @staticmethod
+    def _get_import_kwargs(
+        job: scheduler_jobs.Job, tenant: Tenant
+    ) -> typing.Dict[str, typing.Any]:
+        import_kwargs = {
+            "user_access_token": tenant.user_access_token,
+            "app_id": tenant.app_id,
+            "secret": tenant.secret,
+            "s3_path": tenant.s3_path,
+            **job.options,
+        }
+        if job.dataset == enums.Dataset.PERFORMANCE:
+            import_kwargs["date_from"] = job.date_from
+            import_kwargs["date_to"] = job.date_to
+        if "output_format" in import_kwargs:
+            import_kwargs["output_format"] = s3_client_enums.OutputFormat(
+                import_kwargs["output_format"]
+            )
+
+        return import_kwargs
+
+    @staticmethod
+    def _get_job_result(
+        output: typing.Union[typing.Tuple, results.ImportResult]
+    ) -> typing.Dict:
+        if isinstance(output, results.ImportResult):
+            return {
+                "uploaded_paths": output.uploaded_paths,
+                "records_count": output.records_count,
+                "failed_advertiser_ids": output.failed_advertiser_ids,
+            }
+
+        uploaded_paths = output[0]
+        return {
+            "uploaded_paths": uploaded_paths
+            if isinstance(uploaded_paths, list)
+            else [uploaded_paths]
+        }
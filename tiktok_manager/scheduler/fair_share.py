@@ -0,0 +1,149 @@
+import concurrent.futures
+import dataclasses
+import datetime
+import logging
+import typing
+
+from tiktok_manager import concurrency, enums, exceptions, results, utils
+from tiktok_manager.integrations.clients.s3 import enums as s3_client_enums
+from tiktok_manager.scheduler import constants as scheduler_constants
+from tiktok_manager.scheduler import daemon as scheduler_daemon
+from tiktok_manager.services import importer
+
+logger = logging.getLogger(__name__)
+
+
+@dataclasses.dataclass
+class FairShareTenant(scheduler_daemon.Tenant):
+    weight: float = 1.0
+    max_concurrent_requests: typing.Optional[int] = None
+
+
+def import_tenants(
+    tenants: typing.List[FairShareTenant],
+    resource_types: typing.Iterable[enums.ResourceType] = (),
+    insights_resource_types: typing.Iterable[enums.ResourceType] = (),
+    date_from: typing.Optional[datetime.datetime] = None,
+    date_to: typing.Optional[datetime.datetime] = None,
+    metrics: typing.Optional[typing.List[str]] = None,
+    partition_key: typing.Optional[str] = None,
+    max_workers: int = scheduler_constants.DEFAULT_FAIR_SHARE_WORKERS,
+    max_concurrent_tenants: int = scheduler_constants.DEFAULT_FAIR_SHARE_TENANTS,
+    output_format: s3_client_enums.OutputFormat = s3_client_enums.OutputFormat.JSON,
+    isolate_failures: bool = False,
+) -> typing.Dict[str, results.SessionResult]:
+    """
+    Runs the same imports for many tenants on one pool of `max_workers` threads.
+
+    Every advertiser x resource fetch, split into 7-day windows for insights, is
+    a work unit queued under its tenant, and the pool round-robins between
+    tenants by `FairShareTenant.weight`, never running more than
+    `FairShareTenant.max_concurrent_requests` units of one tenant at a time. A
+    tenant with thousands of advertisers or a long date range therefore cannot
+    delay the few units of a small tenant, while the pool stays busy as long as
+    any tenant has work left. Each tenant is uploaded as soon as its own units are done.
+
+    At most `max_concurrent_tenants` tenants are imported at the same time, each
+    holding one `ImportSession` and its fetched records in memory; the others
+    wait for a free slot.
+
+    With `isolate_failures`, a failing tenant is reported in its result instead
+    of aborting the other tenants. Otherwise the first tenant error is raised
+    and the imports of the other tenants are cancelled.
+    """
+    tenants = list(tenants)
+    fair_share_executor = concurrency.FairShareExecutor(max_workers=max_workers)
+    for tenant in tenants:
+        fair_share_executor.set_share(
+            key=tenant.tenant_id,
+            weight=tenant.weight,
+            max_concurrency=tenant.max_concurrent_requests,
+        )
+
+    try:
+        with concurrent.futures.ThreadPoolExecutor(
+            max_workers=max(1, min(len(tenants), max_concurrent_tenants))
+        ) as tenant_executor:
+            pending_imports = {
+                tenant.tenant_id: tenant_executor.submit(
+                    _import_tenant,
+                    tenant=tenant,
+                    executor=fair_share_executor.get_queue(key=tenant.tenant_id),
+                    resource_types=resource_types,
+                    insights_resource_types=insights_resource_types,
+                    date_from=date_from,
+                    date_to=date_to,
+                    metrics=metrics,
+                    partition_key=partition_key,
+                    output_format=output_format,
+                    isolate_failures=isolate_failures,
+                )
+                for tenant in tenants
+            }
+            done, _ = concurrent.futures.wait(
+                pending_imports.values(),
+                return_when=concurrent.futures.FIRST_EXCEPTION,
+            )
+            # The other tenants fail with CancelledError once the pools are shut
+            # down, so the error that stopped the run is taken from `done` first.
+            tenant_errors = [
+                pending_import.exception()
+                for pending_import in done
+                if not pending_import.cancelled() and pending_import.exception()
+            ]
+            if tenant_errors:
+                tenant_executor.shutdown(wait=False, cancel_futures=True)
+                fair_share_executor.shutdown(wait=False, cancel_futures=True)
+                raise tenant_errors[0]
+
+            return {
+                tenant_id: pending_import.result()
+                for tenant_id, pending_import in pending_imports.items()
+            }
+    finally:
+        fair_share_executor.shutdown(wait=True, cancel_futures=True)
+
+
+def _import_tenant(
+    tenant: FairShareTenant,
+    executor: concurrency.FairShareQueue,
+    resource_types: typing.Iterable[enums.ResourceType],
+    insights_resource_types: typing.Iterable[enums.ResourceType],
+    date_from: typing.Optional[datetime.datetime],
+    date_to: typing.Optional[datetime.datetime],
+    metrics: typing.Optional[typing.List[str]],
+    partition_key: typing.Optional[str],
+    output_format: s3_client_enums.OutputFormat,
+    isolate_failures: bool,
+) -> results.SessionResult:
+    try:
+        with importer.ImportSession(
+            user_access_token=tenant.user_access_token,
+            app_id=tenant.app_id,
+            secret=tenant.secret,
+            s3_path=tenant.s3_path,
+            output_format=output_format,
+            isolate_failures=isolate_failures,
+            executor=executor,
+        ) as session:
+            return session.run(
+                resource_types=resource_types,
+                insights_resource_types=insights_resource_types,
+                date_from=date_from,
+                date_to=date_to,
+                metrics=metrics,
+                partition_key=partition_key,
+            )
+    except exceptions.ImporterException as e:
+        if not isolate_failures:
+            raise
+
+        logger.warning(
+            "Import of tenant (tenant_id={}) failed. Error: {}".format(
+                tenant.tenant_id, utils.get_exception_message(exception=e)
+            )
+        )
+        return results.SessionResult(
+            error_class=e.__class__.__name__,
+            error_message=utils.get_exception_message(exception=e),
+        )
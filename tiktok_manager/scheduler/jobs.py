@@ -0,0 +1,350 @@
+import contextlib
+import dataclasses
+import datetime
+import json
+import sqlite3
+import time
+import typing
+
+from tiktok_manager import enums
+from tiktok_manager.scheduler import constants as scheduler_constants
+from tiktok_manager.scheduler import enums as scheduler_enums
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    tenant_id TEXT NOT NULL,
+    dataset TEXT NOT NULL,
+    resource_type TEXT NOT NULL,
+    date_from TEXT,
+    date_to TEXT,
+    priority INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    run_at REAL NOT NULL,
+    deadline REAL,
+    options TEXT NOT NULL,
+    error TEXT,
+    result TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    heartbeat_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_status_priority
+    ON jobs (status, priority DESC, run_at, id);
+"""
+
+
+@dataclasses.dataclass
+class Job:
+    id: int
+    tenant_id: str
+    dataset: enums.Dataset
+    resource_type: enums.ResourceType
+    date_from: typing.Optional[datetime.datetime]
+    date_to: typing.Optional[datetime.datetime]
+    priority: int
+    status: scheduler_enums.JobStatus
+    attempts: int
+    max_attempts: int
+    run_at: datetime.datetime
+    deadline: typing.Optional[datetime.datetime]
+    options: typing.Dict
+    error: typing.Optional[str]
+    result: typing.Optional[typing.Dict]
+    created_at: datetime.datetime
+    started_at: typing.Optional[datetime.datetime]
+    finished_at: typing.Optional[datetime.datetime]
+    heartbeat_at: typing.Optional[datetime.datetime]
+
+
+class JobQueue(object):
+    """
+    Durable queue of import jobs stored in a local SQLite database.
+
+    Every method opens its own connection, so the queue can be used from several
+    threads and processes at once. Claiming a job runs in an immediate
+    transaction, so a job is never handed to two workers. Running jobs are kept
+    alive with `heartbeat`, so that only the jobs of a stopped scheduler are
+    requeued.
+    """
+
+    def __init__(
+        self, database_path: str = scheduler_constants.DEFAULT_DATABASE_PATH
+    ) -> None:
+        self._database_path = database_path
+        with self._connect() as connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.executescript(_SCHEMA)
+
+    def enqueue(
+        self,
+        tenant_id: str,
+        dataset: enums.Dataset,
+        resource_type: enums.ResourceType,
+        date_from: typing.Optional[datetime.datetime] = None,
+        date_to: typing.Optional[datetime.datetime] = None,
+        priority: int = scheduler_constants.DEFAULT_PRIORITY,
+        run_at: typing.Optional[datetime.datetime] = None,
+        deadline: typing.Optional[datetime.datetime] = None,
+        max_attempts: int = scheduler_constants.DEFAULT_MAX_ATTEMPTS,
+        options: typing.Optional[typing.Dict] = None,
+    ) -> int:
+        now = time.time()
+        with self._connect() as connection:
+            cursor = connection.execute(
+                """
+                INSERT INTO jobs (
+                    tenant_id, dataset, resource_type, date_from, date_to, priority,
+                    status, max_attempts, run_at, deadline, options, created_at
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    tenant_id,
+                    dataset.value,
+                    resource_type.value,
+                    date_from.isoformat() if date_from else None,
+                    date_to.isoformat() if date_to else None,
+                    priority,
+                    scheduler_enums.JobStatus.PENDING.value,
+                    max_attempts,
+                    self._to_timestamp(value=run_at) if run_at else now,
+                    self._to_timestamp(value=deadline) if deadline else None,
+                    json.dumps(options or {}),
+                    now,
+                ),
+            )
+            return cursor.lastrowid
+
+    def claim(
+        self,
+        tenant_concurrency: typing.Dict[str, int],
+        default_tenant_concurrency: int = scheduler_constants.DEFAULT_TENANT_CONCURRENCY,
+    ) -> typing.Optional[Job]:
+        """
+        Marks the next runnable job as running and returns it. Jobs are taken by
+        priority and then by due time, skipping tenants that already run as many
+        jobs as their concurrency cap allows. Pending jobs whose deadline has
+        passed are expired.
+        """
+        now = time.time()
+        with self._connect() as connection:
+            connection.execute("BEGIN IMMEDIATE")
+            connection.execute(
+                "UPDATE jobs SET status = ?, finished_at = ? "
+                "WHERE status = ? AND deadline IS NOT NULL AND deadline < ?",
+                (
+                    scheduler_enums.JobStatus.EXPIRED.value,
+                    now,
+                    scheduler_enums.JobStatus.PENDING.value,
+                    now,
+                ),
+            )
+            # Capped tenants are filtered in SQL, so that the jobs of a capped
+            # tenant never hide the jobs of other tenants.
+            candidate = connection.execute(
+                """
+                WITH running_jobs AS (
+                    SELECT tenant_id, COUNT(*) AS jobs_count FROM jobs
+                    WHERE status = ? GROUP BY tenant_id
+                )
+                SELECT jobs.id FROM jobs
+                LEFT JOIN running_jobs ON running_jobs.tenant_id = jobs.tenant_id
+                LEFT JOIN json_each(?) AS tenant_concurrency
+                    ON tenant_concurrency.key = jobs.tenant_id
+                WHERE jobs.status = ? AND jobs.run_at <= ?
+                    AND COALESCE(running_jobs.jobs_count, 0)
+                        < COALESCE(tenant_concurrency.value, ?)
+                ORDER BY jobs.priority DESC, jobs.run_at, jobs.id
+                LIMIT 1
+                """,
+                (
+                    scheduler_enums.JobStatus.RUNNING.value,
+                    json.dumps(tenant_concurrency),
+                    scheduler_enums.JobStatus.PENDING.value,
+                    now,
+                    default_tenant_concurrency,
+                ),
+            ).fetchone()
+            if not candidate:
+                return None
+
+            connection.execute(
+                "UPDATE jobs SET status = ?, attempts = attempts + 1, "
+                "started_at = ?, heartbeat_at = ? WHERE id = ?",
+                (scheduler_enums.JobStatus.RUNNING.value, now, now, candidate["id"]),
+            )
+            return self._get_job(connection=connection, job_id=candidate["id"])
+
+    def complete(self, job_id: int, result: typing.Optional[typing.Dict]) -> None:
+        with self._connect() as connection:
+            connection.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = NULL, "
+                "finished_at = ? WHERE id = ?",
+                (
+                    scheduler_enums.JobStatus.SUCCEEDED.value,
+                    json.dumps(result),
+                    time.time(),
+                    job_id,
+                ),
+            )
+
+    def fail(
+        self, job_id: int, error: str, retry: bool = True
+    ) -> scheduler_enums.JobStatus:
+        """
+        Records a failed attempt. The job is rescheduled with exponential backoff
+        while it has attempts left, otherwise it is marked as failed.
+        """
+        now = time.time()
+        with self._connect() as connection:
+            connection.execute("BEGIN IMMEDIATE")
+            job = self._get_job(connection=connection, job_id=job_id)
+            if retry and job.attempts < job.max_attempts:
+                status = scheduler_enums.JobStatus.PENDING
+                run_at = now + min(
+                    scheduler_constants.RETRY_BACKOFF_SECONDS * 2 ** (job.attempts - 1),
+                    scheduler_constants.MAX_RETRY_BACKOFF_SECONDS,
+                )
+                finished_at = None
+            else:
+                status = scheduler_enums.JobStatus.FAILED
+                run_at = self._to_timestamp(value=job.run_at)
+                finished_at = now
+
+            connection.execute(
+                "UPDATE jobs SET status = ?, error = ?, run_at = ?, finished_at = ? "
+                "WHERE id = ?",
+                (status.value, error, run_at, finished_at, job_id),
+            )
+
+        return status
+
+    def heartbeat(self, job_ids: typing.Iterable[int]) -> None:
+        """
+        Records that the given running jobs are still being worked on.
+        """
+        job_ids = list(job_ids)
+        if not job_ids:
+            return
+
+        with self._connect() as connection:
+            connection.execute(
+                "UPDATE jobs SET heartbeat_at = ? WHERE status = ? AND id IN ({})".format(
+                    ", ".join("?" * len(job_ids))
+                ),
+                (time.time(), scheduler_enums.JobStatus.RUNNING.value, *job_ids),
+            )
+
+    def requeue_running(
+        self,
+        heartbeat_timeout: float = scheduler_constants.HEARTBEAT_TIMEOUT_SECONDS,
+    ) -> int:
+        """
+        Puts jobs left running by a stopped scheduler back into the queue: running
+        jobs without a heartbeat for `heartbeat_timeout` seconds. Jobs of
+        schedulers that are still running are left alone.
+        """
+        with self._connect() as connection:
+            return connection.execute(
+                "UPDATE jobs SET status = ?, started_at = NULL, heartbeat_at = NULL "
+                "WHERE status = ? AND COALESCE(heartbeat_at, started_at, 0) < ?",
+                (
+                    scheduler_enums.JobStatus.PENDING.value,
+                    scheduler_enums.JobStatus.RUNNING.value,
+                    time.time() - heartbeat_timeout,
+                ),
+            ).rowcount
+
+    def get_job(self, job_id: int) -> typing.Optional[Job]:
+        with self._connect() as connection:
+            return self._get_job(connection=connection, job_id=job_id)
+
+    def list_jobs(
+        self,
+        status: typing.Optional[scheduler_enums.JobStatus] = None,
+        limit: int = 100,
+    ) -> typing.List[Job]:
+        with self._connect() as connection:
+            if status:
+                rows = connection.execute(
+                    "SELECT * FROM jobs WHERE status = ? ORDER BY id DESC LIMIT ?",
+                    (status.value, limit),
+                ).fetchall()
+            else:
+                rows = connection.execute(
+                    "SELECT * FROM jobs ORDER BY id DESC LIMIT ?", (limit,)
+                ).fetchall()
+
+        return [self._get_job_from_row(row=row) for row in rows]
+
+    @contextlib.contextmanager
+    def _connect(self) -> typing.Iterator[sqlite3.Connection]:
+        connection = sqlite3.connect(
+            self._database_path,
+            timeout=scheduler_constants.DATABASE_TIMEOUT_SECONDS,
+            isolation_level=None,
+        )
+        connection.row_factory = sqlite3.Row
+        try:
+            yield connection
+            if connection.in_transaction:
+                connection.execute("COMMIT")
+        except BaseException:
+            if connection.in_transaction:
+                connection.execute("ROLLBACK")
+            raise
+        finally:
+            connection.close()
+
+    def _get_job(
+        self, connection: sqlite3.Connection, job_id: int
+    ) -> typing.Optional[Job]:
+        row = connection.execute(
+            "SELECT * FROM jobs WHERE id = ?", (job_id,)
+        ).fetchone()
+        return self._get_job_from_row(row=row) if row else None
+
+    def _get_job_from_row(self, row: sqlite3.Row) -> Job:
+        return Job(
+            id=row["id"],
+            tenant_id=row["tenant_id"],
+            dataset=enums.Dataset(row["dataset"]),
+            resource_type=enums.ResourceType(row["resource_type"]),
+            date_from=self._from_isoformat(value=row["date_from"]),
+            date_to=self._from_isoformat(value=row["date_to"]),
+            priority=row["priority"],
+            status=scheduler_enums.JobStatus(row["status"]),
+            attempts=row["attempts"],
+            max_attempts=row["max_attempts"],
+            run_at=self._from_timestamp(value=row["run_at"]),
+            deadline=self._from_timestamp(value=row["deadline"]),
+            options=json.loads(row["options"]),
+            error=row["error"],
+            result=json.loads(row["result"]) if row["result"] else None,
+            created_at=self._from_timestamp(value=row["created_at"]),
+            started_at=self._from_timestamp(value=row["started_at"]),
+            finished_at=self._from_timestamp(value=row["finished_at"]),
+            heartbeat_at=self._from_timestamp(value=row["heartbeat_at"]),
+        )
+
+    @staticmethod
+    def _to_timestamp(value: datetime.datetime) -> float:
+        return value.replace(tzinfo=datetime.timezone.utc).timestamp()
+
+    @staticmethod
+    def _from_timestamp(
+        value: typing.Optional[float],
+    ) -> typing.Optional[datetime.datetime]:
+        if value is None:
+            return None
+
+        return datetime.datetime.fromtimestamp(value, tz=datetime.timezone.utc)
+
+    @staticmethod
+    def _from_isoformat(
+        value: typing.Optional[str],
+    ) -> typing.Optional[datetime.datetime]:
+        return datetime.datetime.fromisoformat(value) if value else None
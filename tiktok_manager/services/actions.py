@@ -1,7 +1,11 @@
+import atexit
+import concurrent.futures
 import logging
+import threading
+import time
 import typing
 
-from tiktok_manager import exceptions, utils
+from tiktok_manager import concurrency, enums, exceptions, results, utils
 from tiktok_manager.integrations.clients.tiktok import client as tiktok_client
 from tiktok_manager.integrations.clients.tiktok import (
     exceptions as tiktok_client_exceptions,
@@ -9,6 +13,9 @@ from tiktok_manager.integrations.clients.tiktok import (
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_MAX_WORKERS = 8
+DEFAULT_COALESCE_WINDOW_SECONDS = 2.0
+
 
 def add_campaign(
     user_access_token: str,
@@ -29,6 +36,26 @@ def add_campaign(
     return campaign_id, True
 
 
+def add_campaigns(
+    user_access_token: str,
+    campaigns: typing.List[typing.Tuple[str, typing.Dict]],
+    max_workers: int = DEFAULT_MAX_WORKERS,
+) -> typing.List[results.ActionResult]:
+    """
+    Creates `(advertiser_id, campaign_details)` specs. See `_run_actions`.
+    """
+    return _run_actions(
+        client=tiktok_client.TiktokClient(user_access_token=user_access_token),
+        resource_type=enums.ResourceType.CAMPAIGN,
+        action=enums.ChangeAction.CREATE,
+        specs=[
+            (advertiser_id, None, campaign_details)
+            for advertiser_id, campaign_details in campaigns
+        ],
+        max_workers=max_workers,
+    )
+
+
 def update_campaign(
     user_access_token: str,
     advertiser_id: str,
@@ -53,6 +80,24 @@ def update_campaign(
     return campaign_updated
 
 
+def update_campaigns(
+    user_access_token: str,
+    campaigns: typing.List[typing.Tuple[str, str, typing.Dict]],
+    max_workers: int = DEFAULT_MAX_WORKERS,
+) -> typing.List[results.ActionResult]:
+    """
+    Updates `(advertiser_id, campaign_id, campaign_details)` specs. See
+    `_run_actions`.
+    """
+    return _run_actions(
+        client=tiktok_client.TiktokClient(user_access_token=user_access_token),
+        resource_type=enums.ResourceType.CAMPAIGN,
+        action=enums.ChangeAction.UPDATE,
+        specs=campaigns,
+        max_workers=max_workers,
+    )
+
+
 def add_adgroup(
     user_access_token: str,
     advertiser_id: str,
@@ -70,6 +115,26 @@ def add_adgroup(
     return adgroup_id, True
 
 
+def add_adgroups(
+    user_access_token: str,
+    adgroups: typing.List[typing.Tuple[str, typing.Dict]],
+    max_workers: int = DEFAULT_MAX_WORKERS,
+) -> typing.List[results.ActionResult]:
+    """
+    Creates `(advertiser_id, adgroup_details)` specs. See `_run_actions`.
+    """
+    return _run_actions(
+        client=tiktok_client.TiktokClient(user_access_token=user_access_token),
+        resource_type=enums.ResourceType.AD_GROUP,
+        action=enums.ChangeAction.CREATE,
+        specs=[
+            (advertiser_id, None, adgroup_details)
+            for advertiser_id, adgroup_details in adgroups
+        ],
+        max_workers=max_workers,
+    )
+
+
 def update_adgroup(
     user_access_token: str,
     advertiser_id: str,
@@ -94,6 +159,24 @@ def update_adgroup(
     return adgroup_updated
 
 
+def update_adgroups(
+    user_access_token: str,
+    adgroups: typing.List[typing.Tuple[str, str, typing.Dict]],
+    max_workers: int = DEFAULT_MAX_WORKERS,
+) -> typing.List[results.ActionResult]:
+    """
+    Updates `(advertiser_id, adgroup_id, adgroup_details)` specs. See
+    `_run_actions`.
+    """
+    return _run_actions(
+        client=tiktok_client.TiktokClient(user_access_token=user_access_token),
+        resource_type=enums.ResourceType.AD_GROUP,
+        action=enums.ChangeAction.UPDATE,
+        specs=adgroups,
+        max_workers=max_workers,
+    )
+
+
 def add_ads(
     user_access_token: str,
     advertiser_id: str,
@@ -151,3 +234,418 @@ def update_ads_status(
     logger.warning("Updated ad statuses (success={})".format(updated_ads_status))
 
     return updated_ads_status
+
+
+class UpdateQueue(object):
+    """
+    Coalesces campaign and adgroup updates before sending them.
+
+    `update_campaign` and `update_adgroup` return at once with a future. The
+    updates of one entity received within `window_seconds` of its first pending
+    update are merged, later values overriding earlier ones, and sent as a single
+    request; every future of the merged updates resolves to the same
+    `ActionResult`. `flush` sends all pending updates without waiting for their
+    window and blocks until they are done. Updates of one entity are never sent
+    concurrently, so they are applied in the order they were queued. Invalid
+    updates are not queued and their future resolves to a failed result at once.
+
+    Closing the queue, e.g. by leaving its `with` block, flushes it. Updates
+    still pending when the interpreter exits without the queue being closed are
+    sent by an exit handler.
+    """
+
+    def __init__(
+        self,
+        user_access_token: str,
+        window_seconds: float = DEFAULT_COALESCE_WINDOW_SECONDS,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+    ) -> None:
+        self._client = tiktok_client.TiktokClient(user_access_token=user_access_token)
+        self._client.warm_up()
+        self._window_seconds = window_seconds
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers)
+        self._condition = threading.Condition()
+        self._pending_updates = {}
+        self._sending_futures = {}
+        self._closed = False
+        self._dispatcher = threading.Thread(target=self._dispatch, daemon=True)
+        self._dispatcher.start()
+        atexit.register(self._close_at_exit)
+
+    def __enter__(self) -> "UpdateQueue":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    def update_campaign(
+        self, advertiser_id: str, campaign_id: str, campaign_details: typing.Dict
+    ) -> concurrent.futures.Future:
+        return self._add_update(
+            resource_type=enums.ResourceType.CAMPAIGN,
+            advertiser_id=advertiser_id,
+            entity_id=campaign_id,
+            details=campaign_details,
+        )
+
+    def update_adgroup(
+        self, advertiser_id: str, adgroup_id: str, adgroup_details: typing.Dict
+    ) -> concurrent.futures.Future:
+        return self._add_update(
+            resource_type=enums.ResourceType.AD_GROUP,
+            advertiser_id=advertiser_id,
+            entity_id=adgroup_id,
+            details=adgroup_details,
+        )
+
+    def flush(self, timeout: typing.Optional[float] = None) -> bool:
+        """
+        Sends the pending updates now and waits for them and for the updates
+        already being sent. Returns False when they are not all done after
+        `timeout` seconds.
+        """
+        with self._condition:
+            futures = [
+                future
+                for pending_update in self._pending_updates.values()
+                for future in pending_update.futures
+            ] + [
+                future
+                for sending_futures in self._sending_futures.values()
+                for future in sending_futures
+            ]
+            for pending_update in self._pending_updates.values():
+                pending_update.due_at = 0
+            self._condition.notify_all()
+
+        _, not_done = concurrent.futures.wait(futures, timeout=timeout)
+
+        return not not_done
+
+    def close(self) -> None:
+        with self._condition:
+            self._closed = True
+            for pending_update in self._pending_updates.values():
+                pending_update.due_at = 0
+            self._condition.notify_all()
+
+        self._dispatcher.join()
+        self._executor.shutdown(wait=True)
+        atexit.unregister(self._close_at_exit)
+
+    def _close_at_exit(self) -> None:
+        """
+        Sends the updates still pending when the interpreter exits. The workers
+        are already stopped by then, so they are sent from the exiting thread.
+        """
+        with self._condition:
+            self._closed = True
+            pending_updates = list(self._pending_updates.items())
+            self._pending_updates.clear()
+            for key, pending_update in pending_updates:
+                self._sending_futures[key] = pending_update.futures
+            self._condition.notify_all()
+
+        for key, pending_update in pending_updates:
+            self._send(key=key, pending_update=pending_update)
+
+    def _add_update(
+        self,
+        resource_type: enums.ResourceType,
+        advertiser_id: str,
+        entity_id: str,
+        details: typing.Dict,
+    ) -> concurrent.futures.Future:
+        future = concurrent.futures.Future()
+        validation_errors = _get_validation_errors(
+            client=self._client,
+            resource_type=resource_type,
+            action=enums.ChangeAction.UPDATE,
+            advertiser_id=advertiser_id,
+            entity_id=entity_id,
+            details=details,
+        )
+        if validation_errors:
+            future.set_result(
+                _get_invalid_result(
+                    resource_type=resource_type,
+                    advertiser_id=advertiser_id,
+                    entity_id=entity_id,
+                    validation_errors=validation_errors,
+                )
+            )
+            return future
+
+        key = (resource_type, advertiser_id, entity_id)
+        with self._condition:
+            if self._closed:
+                raise exceptions.ActionException(
+                    "Update queue is closed (resource_type={}, advertiser_id={}, entity_id={})".format(
+                        resource_type.value, advertiser_id, entity_id
+                    )
+                )
+
+            pending_update = self._pending_updates.get(key)
+            if not pending_update:
+                pending_update = self._pending_updates[key] = _PendingUpdate(
+                    due_at=time.monotonic() + self._window_seconds
+                )
+            pending_update.details.update(details)
+            pending_update.futures.append(future)
+            self._condition.notify_all()
+
+        return future
+
+    def _dispatch(self) -> None:
+        with self._condition:
+            while True:
+                now = time.monotonic()
+                waiting_due_ats = []
+                for key, pending_update in list(self._pending_updates.items()):
+                    if key in self._sending_futures:
+                        continue
+
+                    if pending_update.due_at > now:
+                        waiting_due_ats.append(pending_update.due_at)
+                        continue
+
+                    try:
+                        self._executor.submit(
+                            self._send, key=key, pending_update=pending_update
+                        )
+                    except RuntimeError:
+                        # The executor refuses work once the interpreter exits,
+                        # and the pending updates are then sent by
+                        # `_close_at_exit`.
+                        return
+
+                    del self._pending_updates[key]
+                    self._sending_futures[key] = pending_update.futures
+
+                if (
+                    self._closed
+                    and not self._pending_updates
+                    and not self._sending_futures
+                ):
+                    return
+
+                self._condition.wait(
+                    timeout=max(0, min(waiting_due_ats) - now)
+                    if waiting_due_ats
+                    else None
+                )
+
+    def _send(
+        self,
+        key: typing.Tuple[enums.ResourceType, str, str],
+        pending_update: "_PendingUpdate",
+    ) -> None:
+        resource_type, advertiser_id, entity_id = key
+        try:
+            action_result = _run_action(
+                client=self._client,
+                resource_type=resource_type,
+                action=enums.ChangeAction.UPDATE,
+                advertiser_id=advertiser_id,
+                entity_id=entity_id,
+                details=pending_update.details,
+            )
+        except Exception as e:
+            for future in pending_update.futures:
+                future.set_exception(e)
+        else:
+            logger.warning(
+                "Sent coalesced {} update (id={}, updates={}, status={})".format(
+                    resource_type.value,
+                    entity_id,
+                    len(pending_update.futures),
+                    action_result.status.value,
+                )
+            )
+            for future in pending_update.futures:
+                future.set_result(action_result)
+        finally:
+            with self._condition:
+                del self._sending_futures[key]
+                self._condition.notify_all()
+
+
+class _PendingUpdate(object):
+    def __init__(self, due_at: float) -> None:
+        self.due_at = due_at
+        self.details = {}
+        self.futures = []
+
+
+def _run_actions(
+    client: tiktok_client.TiktokClient,
+    resource_type: enums.ResourceType,
+    action: enums.ChangeAction,
+    specs: typing.List[typing.Tuple[str, typing.Optional[str], typing.Dict]],
+    max_workers: int,
+) -> typing.List[results.ActionResult]:
+    """
+    Creates or updates the entities of `(advertiser_id, entity_id, details)`
+    specs, depending on `action`, possibly for many advertisers. Every spec is
+    validated before anything is sent, and invalid specs fail without calling
+    the API. The others are sent with up to `max_workers` requests at a time over
+    one client, sharing its connection pool and the access token rate limit.
+    Returns one result per spec in the order of `specs`; a failed spec does not
+    stop the others.
+    """
+    action_results = [None] * len(specs)
+    valid_indexes = []
+    for index, (advertiser_id, entity_id, details) in enumerate(specs):
+        validation_errors = _get_validation_errors(
+            client=client,
+            resource_type=resource_type,
+            action=action,
+            advertiser_id=advertiser_id,
+            entity_id=entity_id,
+            details=details,
+        )
+        if validation_errors:
+            action_results[index] = _get_invalid_result(
+                resource_type=resource_type,
+                advertiser_id=advertiser_id,
+                entity_id=entity_id,
+                validation_errors=validation_errors,
+            )
+        else:
+            valid_indexes.append(index)
+
+    client.warm_up()
+    for index, action_result in zip(
+        valid_indexes,
+        concurrency.map_concurrently(
+            func=lambda index: _run_action(
+                client=client,
+                resource_type=resource_type,
+                action=action,
+                advertiser_id=specs[index][0],
+                entity_id=specs[index][1],
+                details=dict(specs[index][2]),
+            ),
+            items=valid_indexes,
+            max_workers=max_workers,
+        ),
+    ):
+        action_results[index] = action_result
+
+    logger.warning(
+        "Ran {} actions (count={}, failed={})".format(
+            resource_type.value,
+            len(action_results),
+            sum(
+                action_result.status == enums.ResultStatus.FAILED
+                for action_result in action_results
+            ),
+        )
+    )
+
+    return action_results
+
+
+def _get_invalid_result(
+    resource_type: enums.ResourceType,
+    advertiser_id: str,
+    entity_id: typing.Optional[str],
+    validation_errors: typing.Dict,
+) -> results.ActionResult:
+    return results.ActionResult(
+        advertiser_id=advertiser_id,
+        status=enums.ResultStatus.FAILED,
+        entity_id=entity_id,
+        error_class=tiktok_client_exceptions.ResponseDataNotValidError.__name__,
+        error_message="Invalid {} details (advertiser_id={}, errors={})".format(
+            resource_type.value, advertiser_id, validation_errors
+        ),
+    )
+
+
+def _get_validation_errors(
+    client: tiktok_client.TiktokClient,
+    resource_type: enums.ResourceType,
+    action: enums.ChangeAction,
+    advertiser_id: str,
+    entity_id: typing.Optional[str],
+    details: typing.Dict,
+) -> typing.Dict:
+    """
+    Returns the errors by field of a create or update spec, empty when it is
+    valid. Updates without an entity id are invalid.
+    """
+    if action == enums.ChangeAction.CREATE:
+        return client.get_validation_errors(
+            resource_type=resource_type,
+            details={**details, "advertiser_id": advertiser_id},
+        )
+
+    entity_id_key = "{}_id".format(resource_type.value)
+    if not entity_id:
+        return {entity_id_key: ["Missing id of the entity to update."]}
+
+    return client.get_validation_errors(
+        resource_type=resource_type,
+        details={**details, "advertiser_id": advertiser_id, entity_id_key: entity_id},
+        update=True,
+    )
+
+
+def _run_action(
+    client: tiktok_client.TiktokClient,
+    resource_type: enums.ResourceType,
+    action: enums.ChangeAction,
+    advertiser_id: str,
+    entity_id: typing.Optional[str],
+    details: typing.Dict,
+) -> results.ActionResult:
+    created = action == enums.ChangeAction.CREATE
+    updated = False
+    if not created and not entity_id:
+        return results.ActionResult(
+            advertiser_id=advertiser_id,
+            status=enums.ResultStatus.FAILED,
+            error_class=exceptions.ActionException.__name__,
+            error_message="Missing {} id to update (advertiser_id={})".format(
+                resource_type.value, advertiser_id
+            ),
+        )
+
+    try:
+        if resource_type == enums.ResourceType.CAMPAIGN and created:
+            entity_id = client.create_campaign(
+                advertiser_id=advertiser_id, campaign_details=details
+            )
+        elif resource_type == enums.ResourceType.CAMPAIGN:
+            updated = client.update_campaign(
+                advertiser_id=advertiser_id,
+                campaign_id=entity_id,
+                campaign_details=details,
+            )
+        elif created:
+            entity_id = client.create_adgroup(
+                advertiser_id=advertiser_id, adgroup_details=details
+            )
+        else:
+            updated = client.update_adgroup(
+                advertiser_id=advertiser_id,
+                adgroup_id=entity_id,
+                adgroup_details=details,
+            )
+    except tiktok_client_exceptions.TiktokClientError as e:
+        return results.ActionResult(
+            advertiser_id=advertiser_id,
+            status=enums.ResultStatus.FAILED,
+            entity_id=entity_id,
+            error_class=e.__class__.__name__,
+            error_message=utils.get_exception_message(exception=e),
+        )
+
+    return results.ActionResult(
+        advertiser_id=advertiser_id,
+        status=enums.ResultStatus.SUCCEEDED,
+        entity_id=entity_id,
+        created=created,
+        updated=updated,
+    )
@@ -1,32 +1,86 @@
+import contextlib
 import logging
+import threading
 import typing
 
-from tiktok_manager import exceptions, utils
+from tiktok_manager import concurrency, enums, exceptions, results, utils
+from tiktok_manager.integrations.clients.asset_cache import client as asset_cache_client
+from tiktok_manager.integrations.clients.asset_cache import (
+    exceptions as asset_cache_exceptions,
+)
+from tiktok_manager.integrations.clients.asset_registry import (
+    client as asset_registry_client,
+)
+from tiktok_manager.integrations.clients.asset_registry import (
+    enums as asset_registry_enums,
+)
+from tiktok_manager.integrations.clients.asset_registry import (
+    exceptions as asset_registry_exceptions,
+)
 from tiktok_manager.integrations.clients.tiktok import client as tiktok_client
+from tiktok_manager.integrations.clients.tiktok import enums as tiktok_client_enums
 from tiktok_manager.integrations.clients.tiktok import (
     exceptions as tiktok_client_exceptions,
 )
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_MAX_WORKERS = 8
+# Field holding the asset of every upload type, formatted with the asset type.
+UPLOAD_TYPE_FIELDS = {
+    tiktok_client_enums.UploadType.UPLOAD_BY_FILE.value: "{}_file",
+    tiktok_client_enums.UploadType.UPLOAD_BY_URL.value: "{}_url",
+    tiktok_client_enums.UploadType.UPLOAD_BY_FILE_ID.value: "file_id",
+    tiktok_client_enums.UploadType.UPLOAD_BY_VIDEO_ID.value: "video_id",
+}
+
 
 def add_image(
     user_access_token: str,
     advertiser_id: str,
     image_details: typing.Dict,
+    asset_cache: typing.Optional[asset_cache_client.AssetCache] = None,
+    asset_registry: typing.Optional[asset_registry_client.AssetRegistry] = None,
 ) -> typing.Tuple[str, bool]:
-    try:
-        image_id = tiktok_client.TiktokClient(
-            user_access_token=user_access_token
-        ).create_image(advertiser_id=advertiser_id, image_details=image_details)
-    except tiktok_client_exceptions.TiktokClientError as e:
-        raise exceptions.AdAssetsException(utils.get_exception_message(exception=e))
-
-    logger.warning("Created image (id={})".format(image_id))
+    """
+    With an `asset_cache`, an image uploaded by URL is downloaded through the
+    cache and uploaded as a file, so pushing the same image to many advertisers
+    downloads it once. With an `asset_registry`, an image whose signature is
+    already in the advertiser's library is not uploaded again, and its existing
+    id is returned instead.
+    """
+    image_id, _ = _add_asset(
+        client=tiktok_client.TiktokClient(user_access_token=user_access_token),
+        advertiser_id=advertiser_id,
+        upload_details=image_details,
+        asset_type=asset_registry_enums.AssetType.IMAGE,
+        asset_cache=asset_cache,
+        asset_registry=asset_registry,
+    )
 
     return image_id, True
 
 
+def add_images(
+    user_access_token: str,
+    images: typing.List[typing.Tuple[str, typing.Dict]],
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    asset_cache: typing.Optional[asset_cache_client.AssetCache] = None,
+    asset_registry: typing.Optional[asset_registry_client.AssetRegistry] = None,
+) -> typing.List[results.AssetResult]:
+    """
+    Adds `(advertiser_id, image_details)` pairs. See `_add_assets`.
+    """
+    return _add_assets(
+        client=tiktok_client.TiktokClient(user_access_token=user_access_token),
+        assets=images,
+        asset_type=asset_registry_enums.AssetType.IMAGE,
+        max_workers=max_workers,
+        asset_cache=asset_cache,
+        asset_registry=asset_registry,
+    )
+
+
 def update_image_name(
     user_access_token: str,
     advertiser_id: str,
@@ -42,7 +96,9 @@ def update_image_name(
             image_name=image_name,
         )
     except tiktok_client_exceptions.TiktokClientError as e:
-        raise exceptions.AdAssetsException(utils.get_exception_message(exception=e))
+        raise exceptions.AdAssetsException(
+            utils.get_exception_message(exception=e)
+        ) from e
 
     logger.warning(
         "Updated image name (id={}, success={})".format(image_id, image_updated)
@@ -55,16 +111,24 @@ def get_images_info(
     user_access_token: str,
     advertiser_id: str,
     image_ids: typing.List[str],
+    use_cache: bool = False,
 ) -> typing.List[typing.Dict]:
+    """
+    Images are always fetched from TikTok unless `use_cache` is set. Cached info
+    can be up to an hour old.
+    """
     try:
         images_info = tiktok_client.TiktokClient(
             user_access_token=user_access_token
         ).get_images_info(
             advertiser_id=advertiser_id,
             image_ids=image_ids,
+            use_cache=use_cache,
         )
     except tiktok_client_exceptions.TiktokClientError as e:
-        raise exceptions.AdAssetsException(utils.get_exception_message(exception=e))
+        raise exceptions.AdAssetsException(
+            utils.get_exception_message(exception=e)
+        ) from e
 
     logger.warning(
         "Got info for images (id={}, image_ids={}, images_info={})".format(
@@ -79,17 +143,89 @@ def add_video(
     user_access_token: str,
     advertiser_id: str,
     video_details: typing.Dict,
+    asset_cache: typing.Optional[asset_cache_client.AssetCache] = None,
+    asset_registry: typing.Optional[asset_registry_client.AssetRegistry] = None,
 ) -> typing.Tuple[str, bool]:
+    """
+    With an `asset_cache`, a video uploaded by URL is downloaded through the
+    cache and uploaded as a file, so pushing the same video to many advertisers
+    downloads it once. With an `asset_registry`, a video whose signature is
+    already in the advertiser's library is not uploaded again, and its existing
+    id is returned instead.
+    """
+    video_id, _ = _add_asset(
+        client=tiktok_client.TiktokClient(user_access_token=user_access_token),
+        advertiser_id=advertiser_id,
+        upload_details=video_details,
+        asset_type=asset_registry_enums.AssetType.VIDEO,
+        asset_cache=asset_cache,
+        asset_registry=asset_registry,
+    )
+
+    return video_id, True
+
+
+def add_videos(
+    user_access_token: str,
+    videos: typing.List[typing.Tuple[str, typing.Dict]],
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    asset_cache: typing.Optional[asset_cache_client.AssetCache] = None,
+    asset_registry: typing.Optional[asset_registry_client.AssetRegistry] = None,
+) -> typing.List[results.AssetResult]:
+    """
+    Adds `(advertiser_id, video_details)` pairs. See `_add_assets`.
+    """
+    return _add_assets(
+        client=tiktok_client.TiktokClient(user_access_token=user_access_token),
+        assets=videos,
+        asset_type=asset_registry_enums.AssetType.VIDEO,
+        max_workers=max_workers,
+        asset_cache=asset_cache,
+        asset_registry=asset_registry,
+    )
+
+
+def add_video_file(
+    user_access_token: str,
+    advertiser_id: str,
+    file_path: str,
+    video_details: typing.Optional[typing.Dict] = None,
+    upload_id: typing.Optional[str] = None,
+    start_offset: int = 0,
+) -> typing.Tuple[str, str]:
+    """
+    Uploads a local video file, streaming large files in chunks, and returns the
+    video id and the MD5 signature of the file. A failed chunked upload reports
+    its `upload_id` and `start_offset`, which can be passed back to resume it.
+    """
     try:
-        video_id = tiktok_client.TiktokClient(
+        video_id, signature = tiktok_client.TiktokClient(
             user_access_token=user_access_token
-        ).create_video(advertiser_id=advertiser_id, video_details=video_details)
+        ).create_video_from_file(
+            advertiser_id=advertiser_id,
+            file_path=file_path,
+            video_details=video_details,
+            upload_id=upload_id,
+            start_offset=start_offset,
+        )
+    except tiktok_client_exceptions.ChunkedUploadInterruptedError as e:
+        raise exceptions.AdAssetsException(
+            "{} Resume with upload_id={}, start_offset={}.".format(
+                utils.get_exception_message(exception=e), e.upload_id, e.start_offset
+            )
+        ) from e
     except tiktok_client_exceptions.TiktokClientError as e:
-        raise exceptions.AdAssetsException(utils.get_exception_message(exception=e))
+        raise exceptions.AdAssetsException(
+            utils.get_exception_message(exception=e)
+        ) from e
 
-    logger.warning("Created video (id={})".format(video_id))
+    logger.warning(
+        "Created video (id={}, file_path={}, signature={})".format(
+            video_id, file_path, signature
+        )
+    )
 
-    return video_id, True
+    return video_id, signature
 
 
 def update_video_name(
@@ -107,7 +243,9 @@ def update_video_name(
             video_name=video_name,
         )
     except tiktok_client_exceptions.TiktokClientError as e:
-        raise exceptions.AdAssetsException(utils.get_exception_message(exception=e))
+        raise exceptions.AdAssetsException(
+            utils.get_exception_message(exception=e)
+        ) from e
 
     logger.warning(
         "Updated video name (id={}, success={})".format(video_id, video_updated)
@@ -120,16 +258,24 @@ def get_videos_info(
     user_access_token: str,
     advertiser_id: str,
     video_ids: typing.List[str],
+    use_cache: bool = False,
 ) -> typing.List[typing.Dict]:
+    """
+    Videos are always fetched from TikTok unless `use_cache` is set. Cached info
+    is kept until the preview URL expires and can be up to an hour old.
+    """
     try:
         videos_info = tiktok_client.TiktokClient(
             user_access_token=user_access_token
         ).get_videos_info(
             advertiser_id=advertiser_id,
             video_ids=video_ids,
+            use_cache=use_cache,
         )
     except tiktok_client_exceptions.TiktokClientError as e:
-        raise exceptions.AdAssetsException(utils.get_exception_message(exception=e))
+        raise exceptions.AdAssetsException(
+            utils.get_exception_message(exception=e)
+        ) from e
 
     logger.warning(
         "Got info for videos (id={}, video_ids={}, videos_info={})".format(
@@ -138,3 +284,334 @@ def get_videos_info(
     )
 
     return videos_info
+
+
+def _add_assets(
+    client: tiktok_client.TiktokClient,
+    assets: typing.List[typing.Tuple[str, typing.Dict]],
+    asset_type: asset_registry_enums.AssetType,
+    max_workers: int,
+    asset_cache: typing.Optional[asset_cache_client.AssetCache],
+    asset_registry: typing.Optional[asset_registry_client.AssetRegistry],
+) -> typing.List[results.AssetResult]:
+    """
+    Adds `(advertiser_id, upload_details)` pairs, possibly for many advertisers,
+    with up to `max_workers` uploads at a time. The uploads share one client, so
+    they reuse its connection pool and stay within the access token rate limit.
+    Returns one result per asset in the order of `assets`; a failed asset does
+    not stop the others.
+    """
+    client.warm_up()
+    if asset_registry:
+        # Libraries are seeded once per advertiser, not by every worker at once.
+        concurrency.map_concurrently(
+            func=lambda advertiser_id: _seed_asset_registry(
+                client=client,
+                advertiser_id=advertiser_id,
+                asset_type=asset_type,
+                asset_registry=asset_registry,
+                isolate_failures=True,
+            ),
+            items=list(dict.fromkeys(advertiser_id for advertiser_id, _ in assets)),
+            max_workers=max_workers,
+        )
+
+    # Copies of one asset for the same advertiser are added one at a time, so
+    # only the first one is uploaded and the others find it in the registry.
+    signature_key = "{}_signature".format(asset_type.value)
+    asset_locks = {
+        (advertiser_id, upload_details.get(signature_key)): threading.Lock()
+        for advertiser_id, upload_details in assets
+    }
+
+    def add_asset(asset: typing.Tuple[str, typing.Dict]) -> results.AssetResult:
+        advertiser_id, upload_details = asset
+        signature = upload_details.get(signature_key)
+        asset_lock = (
+            asset_locks[(advertiser_id, signature)]
+            if asset_registry and signature
+            else contextlib.nullcontext()
+        )
+        try:
+            with asset_lock:
+                asset_id, created = _add_asset(
+                    client=client,
+                    advertiser_id=advertiser_id,
+                    upload_details=upload_details,
+                    asset_type=asset_type,
+                    asset_cache=asset_cache,
+                    asset_registry=asset_registry,
+                )
+        except exceptions.AdAssetsException as e:
+            error = e.__cause__ or e
+            return results.AssetResult(
+                advertiser_id=advertiser_id,
+                status=enums.ResultStatus.FAILED,
+                error_class=error.__class__.__name__,
+                error_message=utils.get_exception_message(exception=e),
+            )
+
+        return results.AssetResult(
+            advertiser_id=advertiser_id,
+            status=enums.ResultStatus.SUCCEEDED,
+            asset_id=asset_id,
+            created=created,
+        )
+
+    asset_results = concurrency.map_concurrently(
+        func=add_asset, items=assets, max_workers=max_workers
+    )
+    logger.warning(
+        "Added {}s (count={}, created={}, failed={})".format(
+            asset_type.value,
+            len(asset_results),
+            sum(asset_result.created for asset_result in asset_results),
+            sum(
+                asset_result.status == enums.ResultStatus.FAILED
+                for asset_result in asset_results
+            ),
+        )
+    )
+
+    return asset_results
+
+
+def _add_asset(
+    client: tiktok_client.TiktokClient,
+    advertiser_id: str,
+    upload_details: typing.Dict,
+    asset_type: asset_registry_enums.AssetType,
+    asset_cache: typing.Optional[asset_cache_client.AssetCache],
+    asset_registry: typing.Optional[asset_registry_client.AssetRegistry],
+) -> typing.Tuple[str, bool]:
+    _validate_upload_details(
+        advertiser_id=advertiser_id,
+        upload_details=upload_details,
+        asset_type=asset_type,
+    )
+    signature_key = "{}_signature".format(asset_type.value)
+    try:
+        asset_id = _get_registered_asset_id(
+            client=client,
+            advertiser_id=advertiser_id,
+            asset_type=asset_type,
+            signature=upload_details.get(signature_key),
+            asset_registry=asset_registry,
+        )
+    except (
+        tiktok_client_exceptions.TiktokClientError,
+        asset_registry_exceptions.AssetRegistryError,
+    ) as e:
+        raise exceptions.AdAssetsException(
+            utils.get_exception_message(exception=e)
+        ) from e
+
+    if asset_id:
+        logger.warning("Reused {} (id={})".format(asset_type.value, asset_id))
+        return asset_id, False
+
+    cached_upload_details = _get_cached_upload_details(
+        upload_details=upload_details,
+        file_type=asset_type.value,
+        asset_cache=asset_cache,
+    )
+    signature = cached_upload_details.get(signature_key)
+    try:
+        # The signature of an asset uploaded by URL is only known once the asset
+        # cache has fetched it.
+        if signature != upload_details.get(signature_key):
+            asset_id = _get_registered_asset_id(
+                client=client,
+                advertiser_id=advertiser_id,
+                asset_type=asset_type,
+                signature=signature,
+                asset_registry=asset_registry,
+            )
+        if asset_id:
+            logger.warning("Reused {} (id={})".format(asset_type.value, asset_id))
+            return asset_id, False
+
+        if asset_type == asset_registry_enums.AssetType.IMAGE:
+            asset_id = client.create_image(
+                advertiser_id=advertiser_id, image_details=cached_upload_details
+            )
+        else:
+            asset_id = client.create_video(
+                advertiser_id=advertiser_id, video_details=cached_upload_details
+            )
+    except (
+        tiktok_client_exceptions.TiktokClientError,
+        asset_registry_exceptions.AssetRegistryError,
+    ) as e:
+        raise exceptions.AdAssetsException(
+            utils.get_exception_message(exception=e)
+        ) from e
+    finally:
+        if cached_upload_details is not upload_details:
+            cached_upload_details["{}_file".format(asset_type.value)].close()
+
+    logger.warning("Created {} (id={})".format(asset_type.value, asset_id))
+
+    if asset_registry and signature:
+        try:
+            asset_registry.add_asset(
+                advertiser_id=advertiser_id,
+                asset_type=asset_type,
+                signature=signature,
+                asset_id=asset_id,
+            )
+        except asset_registry_exceptions.AssetRegistryError as e:
+            logger.warning(
+                "Unable to register {} (id={}). Error: {}".format(
+                    asset_type.value,
+                    asset_id,
+                    utils.get_exception_message(exception=e),
+                )
+            )
+
+    return asset_id, True
+
+
+def _validate_upload_details(
+    advertiser_id: str,
+    upload_details: typing.Dict,
+    asset_type: asset_registry_enums.AssetType,
+) -> None:
+    """
+    Checks that the upload type is known and that the field holding the asset
+    for that upload type is set, before anything is fetched or uploaded.
+    """
+    upload_type = upload_details.get("upload_type")
+    field = UPLOAD_TYPE_FIELDS.get(upload_type, "").format(asset_type.value)
+    if not field or (
+        upload_type == tiktok_client_enums.UploadType.UPLOAD_BY_VIDEO_ID.value
+        and asset_type != asset_registry_enums.AssetType.VIDEO
+    ):
+        raise exceptions.AdAssetsException(
+            "Upload type of {} is not valid (advertiser_id={}, upload_type={})".format(
+                asset_type.value, advertiser_id, upload_type
+            )
+        )
+
+    if not upload_details.get(field):
+        raise exceptions.AdAssetsException(
+            "Missing {} of {} to upload (advertiser_id={}, upload_type={})".format(
+                field, asset_type.value, advertiser_id, upload_type
+            )
+        )
+
+
+def _get_registered_asset_id(
+    client: tiktok_client.TiktokClient,
+    advertiser_id: str,
+    asset_type: asset_registry_enums.AssetType,
+    signature: typing.Optional[str],
+    asset_registry: typing.Optional[asset_registry_client.AssetRegistry],
+) -> typing.Optional[str]:
+    """
+    Looks the signature up in the registry, seeding it from the advertiser's
+    library first when it was not seeded recently.
+    """
+    if not asset_registry or not signature:
+        return None
+
+    _seed_asset_registry(
+        client=client,
+        advertiser_id=advertiser_id,
+        asset_type=asset_type,
+        asset_registry=asset_registry,
+    )
+    return asset_registry.get_asset_id(
+        advertiser_id=advertiser_id, asset_type=asset_type, signature=signature
+    )
+
+
+def _seed_asset_registry(
+    client: tiktok_client.TiktokClient,
+    advertiser_id: str,
+    asset_type: asset_registry_enums.AssetType,
+    asset_registry: asset_registry_client.AssetRegistry,
+    isolate_failures: bool = False,
+) -> None:
+    """
+    Seeds the registry from the advertiser's library when it was not seeded
+    recently. With `isolate_failures`, a failure is logged instead of raised.
+    """
+    try:
+        if asset_registry.is_seeded(advertiser_id=advertiser_id, asset_type=asset_type):
+            return
+
+        iter_assets = {
+            asset_registry_enums.AssetType.IMAGE: client.iter_images,
+            asset_registry_enums.AssetType.VIDEO: client.iter_videos,
+        }[asset_type]
+        asset_id_key = "{}_id".format(asset_type.value)
+        assets_count = asset_registry.seed(
+            advertiser_id=advertiser_id,
+            asset_type=asset_type,
+            assets=(
+                (asset["signature"], asset[asset_id_key])
+                for assets_page in iter_assets(advertiser_id=advertiser_id)
+                for asset in assets_page
+            ),
+        )
+        logger.warning(
+            "Seeded {} registry (advertiser_id={}, assets_count={})".format(
+                asset_type.value, advertiser_id, assets_count
+            )
+        )
+    except (
+        tiktok_client_exceptions.TiktokClientError,
+        asset_registry_exceptions.AssetRegistryError,
+    ) as e:
+        if not isolate_failures:
+            raise
+
+        logger.warning(
+            "Unable to seed {} registry (advertiser_id={}). Error: {}".format(
+                asset_type.value,
+                advertiser_id,
+                utils.get_exception_message(exception=e),
+            )
+        )
+
+
+def _get_cached_upload_details(
+    upload_details: typing.Dict,
+    file_type: str,
+    asset_cache: typing.Optional[asset_cache_client.AssetCache],
+) -> typing.Dict:
+    """
+    Replaces the URL of an upload by URL with the file fetched through the asset
+    cache and its signature.
+    """
+    if (
+        not asset_cache
+        or upload_details.get("upload_type")
+        != tiktok_client_enums.UploadType.UPLOAD_BY_URL.value
+    ):
+        return upload_details
+
+    url = upload_details["{}_url".format(file_type)]
+    try:
+        signature, cached_file = asset_cache.fetch(
+            url=url, content_hash=upload_details.get("{}_signature".format(file_type))
+        )
+    except asset_cache_exceptions.AssetCacheError as e:
+        raise exceptions.AdAssetsException(
+            utils.get_exception_message(exception=e)
+        ) from e
+
+    logger.warning("Fetched {} (url={}) through the asset cache".format(file_type, url))
+
+    cached_upload_details = {
+        key: value
+        for key, value in upload_details.items()
+        if key != "{}_url".format(file_type)
+    }
+    cached_upload_details[
+        "upload_type"
+    ] = tiktok_client_enums.UploadType.UPLOAD_BY_FILE.value
+    cached_upload_details["{}_file".format(file_type)] = cached_file
+    cached_upload_details["{}_signature".format(file_type)] = signature
+    return cached_upload_details
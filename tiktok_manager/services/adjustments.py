@@ -0,0 +1,244 @@
+import collections
+import decimal
+import logging
+import typing
+
+from tiktok_manager import concurrency, enums, exceptions, results, utils
+from tiktok_manager.integrations.clients.tiktok import client as tiktok_client
+from tiktok_manager.integrations.clients.tiktok import (
+    constants as tiktok_client_constants,
+)
+from tiktok_manager.integrations.clients.tiktok import (
+    exceptions as tiktok_client_exceptions,
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_WORKERS = 8
+DEFAULT_PRECISION = 2  # Decimal places of the account currency.
+
+
+def compute_adjusted_values(
+    values: typing.Sequence[typing.Optional[float]],
+    multiplier: float = 1.0,
+    increment: float = 0.0,
+    minimum: typing.Optional[float] = None,
+    maximum: typing.Optional[float] = None,
+    precision: int = DEFAULT_PRECISION,
+) -> typing.List[typing.Optional[float]]:
+    """
+    Computes `value * multiplier + increment` for a whole column of values,
+    clamped between `minimum` and `maximum` and then rounded half up to
+    `precision` decimal places. Missing values stay None.
+    """
+    quantum = decimal.Decimal(1).scaleb(-precision)
+    lower = float("-inf") if minimum is None else float(minimum)
+    upper = float("inf") if maximum is None else float(maximum)
+    return [
+        None
+        if value is None
+        else float(
+            decimal.Decimal(
+                repr(min(upper, max(lower, value * multiplier + increment)))
+            ).quantize(quantum, rounding=decimal.ROUND_HALF_UP)
+        )
+        for value in values
+    ]
+
+
+def adjust_adgroups(
+    user_access_token: str,
+    adgroups: typing.List[typing.Dict],
+    field: enums.AdjustedField,
+    multiplier: float = 1.0,
+    increment: float = 0.0,
+    minimum: typing.Optional[float] = None,
+    maximum: typing.Optional[float] = None,
+    precision: int = DEFAULT_PRECISION,
+    where: typing.Optional[typing.Callable[[typing.Dict], bool]] = None,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    precision_by_advertiser: typing.Optional[typing.Dict[str, int]] = None,
+) -> typing.List[results.AdjustmentResult]:
+    """
+    Adjusts the budget or a bid of many adgroups, possibly of many advertisers.
+
+    `adgroups` are adgroup details as returned by the importer (with "id",
+    "account_id" and the current value of `field`), to which any metric used by
+    `where` can be added. The new values of the adgroups selected by `where` are
+    computed with `compute_adjusted_values`, rounded to the precision of the
+    advertiser's currency in `precision_by_advertiser`, or to `precision` for
+    advertisers missing from it. Budgets are sent in batches per
+    advertiser and bids one adgroup per request, as bids have no batched
+    endpoint, with up to `max_workers` requests at a time over one client.
+    Returns one result per adgroup in the order of `adgroups`; adgroups that are
+    not selected or whose value does not change are not sent and succeed without
+    being updated. An adgroup without an id, with a non-numeric value or for
+    which `where` raises fails on its own.
+    """
+    adjustment_results = []
+    selected_indexes = []
+    for index, adgroup in enumerate(adgroups):
+        adjustment_result = results.AdjustmentResult(
+            advertiser_id=adgroup.get("account_id"),
+            adgroup_id=adgroup.get("id"),
+            status=enums.ResultStatus.SUCCEEDED,
+            old_value=adgroup.get(field.value),
+            new_value=adgroup.get(field.value),
+        )
+        adjustment_results.append(adjustment_result)
+        try:
+            if _is_selected(adgroup=adgroup, field=field, where=where):
+                selected_indexes.append(index)
+        except Exception as e:
+            adjustment_result.status = enums.ResultStatus.FAILED
+            adjustment_result.error_class = e.__class__.__name__
+            adjustment_result.error_message = utils.get_exception_message(exception=e)
+
+    selected_indexes_by_advertiser = collections.defaultdict(list)
+    for index in selected_indexes:
+        selected_indexes_by_advertiser[adjustment_results[index].advertiser_id].append(
+            index
+        )
+
+    changed_indexes = collections.defaultdict(list)
+    for advertiser_id, indexes in selected_indexes_by_advertiser.items():
+        new_values = compute_adjusted_values(
+            values=[float(adjustment_results[index].old_value) for index in indexes],
+            multiplier=multiplier,
+            increment=increment,
+            minimum=minimum,
+            maximum=maximum,
+            precision=(precision_by_advertiser or {}).get(advertiser_id, precision),
+        )
+        for index, new_value in zip(indexes, new_values):
+            adjustment_result = adjustment_results[index]
+            if new_value != adjustment_result.old_value:
+                adjustment_result.new_value = new_value
+                changed_indexes[advertiser_id].append(index)
+
+    batch_size = (
+        tiktok_client_constants.ADGROUP_BUDGET_UPDATE_BATCH_SIZE
+        if field == enums.AdjustedField.BUDGET
+        else 1
+    )
+    batches = [
+        indexes[offset : offset + batch_size]
+        for indexes in changed_indexes.values()
+        for offset in range(0, len(indexes), batch_size)
+    ]
+    client = tiktok_client.TiktokClient(user_access_token=user_access_token)
+    client.warm_up()
+    concurrency.map_concurrently(
+        func=lambda indexes: _send_adjustments(
+            client=client,
+            field=field,
+            adjustment_results=[adjustment_results[index] for index in indexes],
+        ),
+        items=batches,
+        max_workers=max_workers,
+    )
+
+    logger.warning(
+        "Adjusted adgroups {} (count={}, updated={}, failed={})".format(
+            field.value,
+            len(adjustment_results),
+            sum(adjustment_result.updated for adjustment_result in adjustment_results),
+            sum(
+                adjustment_result.status == enums.ResultStatus.FAILED
+                for adjustment_result in adjustment_results
+            ),
+        )
+    )
+
+    return adjustment_results
+
+
+def _is_selected(
+    adgroup: typing.Dict,
+    field: enums.AdjustedField,
+    where: typing.Optional[typing.Callable[[typing.Dict], bool]],
+) -> bool:
+    """
+    Returns whether the rule applies to the adgroup, raising when the adgroup
+    cannot be adjusted.
+    """
+    if not adgroup.get("account_id") or not adgroup.get("id"):
+        raise exceptions.ActionException(
+            "Adgroup is missing its account_id or id (advertiser_id={}, adgroup_id={})".format(
+                adgroup.get("account_id"), adgroup.get("id")
+            )
+        )
+
+    if where is not None and not where(adgroup):
+        return False
+
+    value = adgroup.get(field.value)
+    if value is None:
+        raise exceptions.ActionException(
+            "Adgroup has no current {} (advertiser_id={}, adgroup_id={})".format(
+                field.value, adgroup["account_id"], adgroup["id"]
+            )
+        )
+
+    try:
+        float(value)
+    except (TypeError, ValueError):
+        raise exceptions.ActionException(
+            "Adgroup {} is not a number (advertiser_id={}, adgroup_id={}, value={})".format(
+                field.value, adgroup["account_id"], adgroup["id"], value
+            )
+        )
+
+    return True
+
+
+def _send_adjustments(
+    client: tiktok_client.TiktokClient,
+    field: enums.AdjustedField,
+    adjustment_results: typing.List[results.AdjustmentResult],
+) -> None:
+    """
+    Sends the new values of a batch of adgroups of one advertiser and records
+    the outcome of every adgroup on its result.
+    """
+    advertiser_id = adjustment_results[0].advertiser_id
+    try:
+        if field == enums.AdjustedField.BUDGET:
+            failed_adgroup_ids = client.update_adgroups_budget(
+                advertiser_id=advertiser_id,
+                adgroups_budget_details={
+                    "budget": [
+                        {
+                            "adgroup_id": adjustment_result.adgroup_id,
+                            "budget": adjustment_result.new_value,
+                        }
+                        for adjustment_result in adjustment_results
+                    ]
+                },
+            )
+        else:
+            # A bid update has no per-adgroup outcome: the adgroup is updated
+            # unless the request fails.
+            client.update_adgroup_bid(
+                advertiser_id=advertiser_id,
+                adgroup_id=adjustment_results[0].adgroup_id,
+                adgroup_bid_details={field.value: adjustment_results[0].new_value},
+            )
+            failed_adgroup_ids = []
+    except tiktok_client_exceptions.TiktokClientError as e:
+        for adjustment_result in adjustment_results:
+            adjustment_result.status = enums.ResultStatus.FAILED
+            adjustment_result.error_class = e.__class__.__name__
+            adjustment_result.error_message = utils.get_exception_message(exception=e)
+        return
+
+    failed_adgroup_ids = set(failed_adgroup_ids)
+    for adjustment_result in adjustment_results:
+        if str(adjustment_result.adgroup_id) not in failed_adgroup_ids:
+            adjustment_result.updated = True
+        else:
+            adjustment_result.status = enums.ResultStatus.FAILED
+            adjustment_result.error_class = exceptions.ActionException.__name__
+            adjustment_result.error_message = "Adgroup {} was not updated by the API (advertiser_id={}, adgroup_id={})".format(
+                field.value, advertiser_id, adjustment_result.adgroup_id
+            )
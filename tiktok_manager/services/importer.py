@@ -1,9 +1,17 @@
+import collections
+import concurrent.futures
 import datetime
+import json
 import logging
+import os
+import threading
+import time
 import typing
+import uuid
 
-from tiktok_manager import enums, exceptions, utils
+from tiktok_manager import concurrency, enums, exceptions, results, utils
 from tiktok_manager.integrations.clients.s3 import client as s3_client
+from tiktok_manager.integrations.clients.s3 import enums as s3_client_enums
 from tiktok_manager.integrations.clients.s3 import exceptions as s3_client_exceptions
 from tiktok_manager.integrations.clients.tiktok import client as tiktok_client
 from tiktok_manager.integrations.clients.tiktok import (
@@ -12,6 +20,16 @@ from tiktok_manager.integrations.clients.tiktok import (
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_SNAPSHOT_INTERVAL = datetime.timedelta(days=7)
+DEFAULT_MAX_WORKERS = 4
+STREAMING_QUEUE_SIZE = 4  # API pages buffered per advertiser when streaming
+DEFAULT_LEASE_SECONDS = 300
+RUN_UNIT_WINDOW = datetime.timedelta(days=7)  # Insights days staged per run unit
+
+# A window of insights days, and a `(unit_id, advertiser_id, window)` run unit.
+RunWindow = typing.Tuple[datetime.datetime, datetime.datetime]
+RunUnit = typing.Tuple[str, str, typing.Optional[RunWindow]]
+
 
 def get_account_ids(
     user_access_token: str, app_id: str, secret: str
@@ -21,271 +39,2023 @@ def get_account_ids(
             user_access_token=user_access_token
         ).get_account_ids(app_id=app_id, secret=secret)
     except tiktok_client_exceptions.TiktokClientError as e:
-        raise exceptions.ImporterException(utils.get_exception_message(exception=e))
+        raise exceptions.ImporterException(
+            utils.get_exception_message(exception=e)
+        ) from e
 
 
 def get_campaigns(
-    user_access_token: str, app_id: str, secret: str, s3_path: str
+    user_access_token: str,
+    app_id: str,
+    secret: str,
+    s3_path: str,
+    change_data_capture: bool = False,
+    snapshot_interval: datetime.timedelta = DEFAULT_SNAPSHOT_INTERVAL,
+    fields: typing.Optional[typing.List[str]] = None,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    streaming: bool = False,
+    output_format: s3_client_enums.OutputFormat = s3_client_enums.OutputFormat.JSON,
+    run_id: typing.Optional[str] = None,
 ) -> typing.Tuple[str, bool]:
-    campaigns_details = []
+    import_result = _import_resource_details(
+        user_access_token=user_access_token,
+        app_id=app_id,
+        secret=secret,
+        s3_path=s3_path,
+        resource_type=enums.ResourceType.CAMPAIGN,
+        change_data_capture=change_data_capture,
+        snapshot_interval=snapshot_interval,
+        fields=fields,
+        max_workers=max_workers,
+        streaming=streaming,
+        output_format=output_format,
+        run_id=run_id,
+    )
+    return import_result.uploaded_paths[0], True
 
-    tiktok_integration_client = tiktok_client.TiktokClient(
-        user_access_token=user_access_token
+
+def get_adgroups(
+    user_access_token: str,
+    app_id: str,
+    secret: str,
+    s3_path: str,
+    change_data_capture: bool = False,
+    snapshot_interval: datetime.timedelta = DEFAULT_SNAPSHOT_INTERVAL,
+    fields: typing.Optional[typing.List[str]] = None,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    streaming: bool = False,
+    output_format: s3_client_enums.OutputFormat = s3_client_enums.OutputFormat.JSON,
+    run_id: typing.Optional[str] = None,
+) -> typing.Tuple[str, bool]:
+    import_result = _import_resource_details(
+        user_access_token=user_access_token,
+        app_id=app_id,
+        secret=secret,
+        s3_path=s3_path,
+        resource_type=enums.ResourceType.AD_GROUP,
+        change_data_capture=change_data_capture,
+        snapshot_interval=snapshot_interval,
+        fields=fields,
+        max_workers=max_workers,
+        streaming=streaming,
+        output_format=output_format,
+        run_id=run_id,
+    )
+    return import_result.uploaded_paths[0], True
+
+
+def get_ads(
+    user_access_token: str,
+    app_id: str,
+    secret: str,
+    s3_path: str,
+    change_data_capture: bool = False,
+    snapshot_interval: datetime.timedelta = DEFAULT_SNAPSHOT_INTERVAL,
+    fields: typing.Optional[typing.List[str]] = None,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    streaming: bool = False,
+    output_format: s3_client_enums.OutputFormat = s3_client_enums.OutputFormat.JSON,
+    run_id: typing.Optional[str] = None,
+) -> typing.Tuple[str, bool]:
+    import_result = _import_resource_details(
+        user_access_token=user_access_token,
+        app_id=app_id,
+        secret=secret,
+        s3_path=s3_path,
+        resource_type=enums.ResourceType.AD,
+        change_data_capture=change_data_capture,
+        snapshot_interval=snapshot_interval,
+        fields=fields,
+        max_workers=max_workers,
+        streaming=streaming,
+        output_format=output_format,
+        run_id=run_id,
+    )
+    return import_result.uploaded_paths[0], True
+
+
+def get_campaign_insights(
+    user_access_token: str,
+    app_id: str,
+    secret: str,
+    s3_path: str,
+    date_from: datetime.datetime,
+    date_to: datetime.datetime,
+    metrics: typing.Optional[typing.List[str]] = None,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    streaming: bool = False,
+    partition_key: typing.Optional[str] = None,
+    output_format: s3_client_enums.OutputFormat = s3_client_enums.OutputFormat.JSON,
+    run_id: typing.Optional[str] = None,
+) -> typing.Tuple[typing.List[str], bool]:
+    import_result = _import_resource_insights(
+        user_access_token=user_access_token,
+        app_id=app_id,
+        secret=secret,
+        s3_path=s3_path,
+        resource_type=enums.ResourceType.CAMPAIGN,
+        date_from=date_from,
+        date_to=date_to,
+        metrics=metrics,
+        max_workers=max_workers,
+        streaming=streaming,
+        partition_key=partition_key,
+        output_format=output_format,
+        run_id=run_id,
+    )
+    return import_result.uploaded_paths, True
+
+
+def get_adgroup_insights(
+    user_access_token: str,
+    app_id: str,
+    secret: str,
+    s3_path: str,
+    date_from: datetime.datetime,
+    date_to: datetime.datetime,
+    metrics: typing.Optional[typing.List[str]] = None,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    streaming: bool = False,
+    partition_key: typing.Optional[str] = None,
+    output_format: s3_client_enums.OutputFormat = s3_client_enums.OutputFormat.JSON,
+    run_id: typing.Optional[str] = None,
+) -> typing.Tuple[typing.List[str], bool]:
+    import_result = _import_resource_insights(
+        user_access_token=user_access_token,
+        app_id=app_id,
+        secret=secret,
+        s3_path=s3_path,
+        resource_type=enums.ResourceType.AD_GROUP,
+        date_from=date_from,
+        date_to=date_to,
+        metrics=metrics,
+        max_workers=max_workers,
+        streaming=streaming,
+        partition_key=partition_key,
+        output_format=output_format,
+        run_id=run_id,
+    )
+    return import_result.uploaded_paths, True
+
+
+def get_ad_insights(
+    user_access_token: str,
+    app_id: str,
+    secret: str,
+    s3_path: str,
+    date_from: datetime.datetime,
+    date_to: datetime.datetime,
+    metrics: typing.Optional[typing.List[str]] = None,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    streaming: bool = False,
+    partition_key: typing.Optional[str] = None,
+    output_format: s3_client_enums.OutputFormat = s3_client_enums.OutputFormat.JSON,
+    run_id: typing.Optional[str] = None,
+) -> typing.Tuple[typing.List[str], bool]:
+    import_result = _import_resource_insights(
+        user_access_token=user_access_token,
+        app_id=app_id,
+        secret=secret,
+        s3_path=s3_path,
+        resource_type=enums.ResourceType.AD,
+        date_from=date_from,
+        date_to=date_to,
+        metrics=metrics,
+        max_workers=max_workers,
+        streaming=streaming,
+        partition_key=partition_key,
+        output_format=output_format,
+        run_id=run_id,
+    )
+    return import_result.uploaded_paths, True
+
+
+def import_details(
+    user_access_token: str,
+    app_id: str,
+    secret: str,
+    s3_path: str,
+    resource_type: enums.ResourceType,
+    change_data_capture: bool = False,
+    snapshot_interval: datetime.timedelta = DEFAULT_SNAPSHOT_INTERVAL,
+    fields: typing.Optional[typing.List[str]] = None,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    streaming: bool = False,
+    output_format: s3_client_enums.OutputFormat = s3_client_enums.OutputFormat.JSON,
+    run_id: typing.Optional[str] = None,
+) -> results.ImportResult:
+    """
+    Imports the details of one resource like `get_campaigns`, `get_adgroups` and
+    `get_ads`, but an advertiser that fails is left out of the output instead of
+    aborting the import, and its outcome is reported in the returned result.
+    """
+    return _import_resource_details(
+        user_access_token=user_access_token,
+        app_id=app_id,
+        secret=secret,
+        s3_path=s3_path,
+        resource_type=resource_type,
+        change_data_capture=change_data_capture,
+        snapshot_interval=snapshot_interval,
+        fields=fields,
+        max_workers=max_workers,
+        streaming=streaming,
+        output_format=output_format,
+        run_id=run_id,
+        isolate_failures=True,
+    )
+
+
+def import_insights(
+    user_access_token: str,
+    app_id: str,
+    secret: str,
+    s3_path: str,
+    resource_type: enums.ResourceType,
+    date_from: datetime.datetime,
+    date_to: datetime.datetime,
+    metrics: typing.Optional[typing.List[str]] = None,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    streaming: bool = False,
+    partition_key: typing.Optional[str] = None,
+    output_format: s3_client_enums.OutputFormat = s3_client_enums.OutputFormat.JSON,
+    run_id: typing.Optional[str] = None,
+) -> results.ImportResult:
+    """
+    Imports the insights of one resource like `get_campaign_insights`,
+    `get_adgroup_insights` and `get_ad_insights`, but an advertiser that fails is
+    left out of the output instead of aborting the import, and its outcome is
+    reported in the returned result.
+    """
+    return _import_resource_insights(
+        user_access_token=user_access_token,
+        app_id=app_id,
+        secret=secret,
+        s3_path=s3_path,
+        resource_type=resource_type,
+        date_from=date_from,
+        date_to=date_to,
+        metrics=metrics,
+        max_workers=max_workers,
+        streaming=streaming,
+        partition_key=partition_key,
+        output_format=output_format,
+        run_id=run_id,
+        isolate_failures=True,
     )
+
+
+def import_sharded(
+    user_access_token: str,
+    app_id: str,
+    secret: str,
+    s3_path: str,
+    dataset: enums.Dataset,
+    resource_type: enums.ResourceType,
+    run_id: str,
+    shards_count: int,
+    processes: typing.Optional[int] = None,
+    date_from: typing.Optional[datetime.datetime] = None,
+    date_to: typing.Optional[datetime.datetime] = None,
+    fields: typing.Optional[typing.List[str]] = None,
+    metrics: typing.Optional[typing.List[str]] = None,
+    partition_key: typing.Optional[str] = None,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    output_format: s3_client_enums.OutputFormat = s3_client_enums.OutputFormat.JSON,
+    lease_dir: typing.Optional[str] = None,
+    lease_seconds: float = DEFAULT_LEASE_SECONDS,
+) -> results.ImportResult:
+    """
+    Imports one resource with its advertisers split into `shards_count` shards,
+    staged by `processes` worker processes (one per CPU by default), and merges
+    the shards into the usual details or insights layout.
+
+    Several machines can run the same call with the same `run_id`: every worker
+    takes the shards that are neither completed nor leased by another worker, so
+    the shards are spread over all machines. Leases are files in `lease_dir` when
+    it is shared by all workers, S3 objects next to the run otherwise. Machines
+    finishing while shards of other machines are still running return an
+    `ImportResult` without uploaded paths.
+    """
+    processes = min(processes or os.cpu_count() or 1, shards_count)
+    with concurrent.futures.ProcessPoolExecutor(max_workers=processes) as executor:
+        futures = [
+            executor.submit(
+                _import_free_shards,
+                first_shard_index=shards_count * process // processes,
+                user_access_token=user_access_token,
+                app_id=app_id,
+                secret=secret,
+                s3_path=s3_path,
+                dataset=dataset,
+                resource_type=resource_type,
+                run_id=run_id,
+                shards_count=shards_count,
+                date_from=date_from,
+                date_to=date_to,
+                fields=fields,
+                metrics=metrics,
+                max_workers=max_workers,
+                output_format=output_format,
+                lease_dir=lease_dir,
+                lease_seconds=lease_seconds,
+            )
+            for process in range(processes)
+        ]
+        advertiser_results = {
+            advertiser_result.advertiser_id: advertiser_result
+            for future in futures
+            for shard_result in future.result()
+            for advertiser_result in shard_result.advertisers
+        }
+
+    uploaded_paths = merge_shards(
+        s3_path=s3_path,
+        dataset=dataset,
+        resource_type=resource_type,
+        run_id=run_id,
+        shards_count=shards_count,
+        partition_key=partition_key,
+        max_workers=max_workers,
+        output_format=output_format,
+        lease_dir=lease_dir,
+        lease_seconds=lease_seconds,
+    )
+
+    return results.ImportResult(
+        resource_type=resource_type,
+        dataset=dataset,
+        uploaded_paths=uploaded_paths or [],
+        advertisers=list(advertiser_results.values()),
+    )
+
+
+def import_shard(
+    user_access_token: str,
+    app_id: str,
+    secret: str,
+    s3_path: str,
+    dataset: enums.Dataset,
+    resource_type: enums.ResourceType,
+    run_id: str,
+    shard_index: int,
+    shards_count: int,
+    date_from: typing.Optional[datetime.datetime] = None,
+    date_to: typing.Optional[datetime.datetime] = None,
+    fields: typing.Optional[typing.List[str]] = None,
+    metrics: typing.Optional[typing.List[str]] = None,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    output_format: s3_client_enums.OutputFormat = s3_client_enums.OutputFormat.JSON,
+    lease_dir: typing.Optional[str] = None,
+    lease_seconds: float = DEFAULT_LEASE_SECONDS,
+) -> typing.Optional[results.ImportResult]:
+    """
+    Stages the advertisers of shard `shard_index` of the run `run_id`.
+
+    Advertisers are assigned to shards by rendezvous hashing of their ids, so an
+    advertiser stays in the same shard across runs and changing `shards_count`
+    only moves the advertisers of the added or removed shards. The shard is
+    leased while it is staged, renewed every `lease_seconds / 3` by a background
+    heartbeat, and resumes from its checkpoint when it was interrupted. Returns
+    None when another worker holds or takes over the lease.
+    """
+    run_parameters = _get_run_parameters(
+        dataset=dataset,
+        date_from=date_from,
+        date_to=date_to,
+        fields=fields,
+        metrics=metrics,
+        output_format=output_format,
+    )
+    run_parameters["shards_count"] = shards_count
     try:
-        advertiser_ids = tiktok_integration_client.get_account_ids(
-            app_id=app_id, secret=secret
+        uploader = s3_client.TiktokS3Uploader(
+            s3_path=s3_path, max_workers=max_workers, output_format=output_format
         )
-    except tiktok_client_exceptions.TiktokClientError as e:
-        raise exceptions.ImporterException(utils.get_exception_message(exception=e))
+        run_checkpoint = uploader.get_run_checkpoint(
+            resource_type=resource_type,
+            dataset=dataset,
+            run_id=run_id,
+            shard=shard_index,
+        )
+        if run_checkpoint and run_checkpoint.get("completed"):
+            return _get_shard_result(
+                run_checkpoint=run_checkpoint,
+                resource_type=resource_type,
+                dataset=dataset,
+            )
 
-    logger.warning("Fetched {} advertiser ids".format(len(advertiser_ids)))
+        lease = _get_run_lease(
+            uploader=uploader,
+            lease_dir=lease_dir,
+            run_id=run_id,
+            resource_type=resource_type,
+            dataset=dataset,
+            lease_name="shard={}".format(shard_index),
+            lease_seconds=lease_seconds,
+        )
+        if not lease.acquire():
+            logger.warning(
+                "Skipping shard leased by another worker (run_id={}, shard={})".format(
+                    run_id, shard_index
+                )
+            )
+            return None
 
-    for advertiser_id in advertiser_ids:
         try:
-            campaign_details = tiktok_integration_client.get_account_campaigns_details(
-                advertiser_id=advertiser_id
+            tiktok_integration_client = tiktok_client.TiktokClient(
+                user_access_token=user_access_token
+            )
+            advertiser_ids = _get_advertiser_ids(
+                tiktok_integration_client=tiktok_integration_client,
+                app_id=app_id,
+                secret=secret,
+            )
+            iter_pages = _get_iter_pages(
+                tiktok_integration_client=tiktok_integration_client,
+                dataset=dataset,
+                resource_type=resource_type,
+                date_from=date_from,
+                date_to=date_to,
+                fields=fields,
+                metrics=metrics,
             )
-        except tiktok_client_exceptions.TiktokClientError as e:
-            raise exceptions.ImporterException(utils.get_exception_message(exception=e))
+            advertiser_results = {}
+            lease_lost_message = "Lease of shard (run_id={}, shard={}) was taken over by another worker".format(
+                run_id, shard_index
+            )
+            with concurrency.LeaseHeartbeat(
+                lease=lease, interval_seconds=lease_seconds / 3
+            ) as heartbeat:
 
-        campaigns_details.extend(campaign_details)
+                def check_lease(unit_id: str) -> None:
+                    if heartbeat.is_lost:
+                        raise exceptions.LeaseLostException(lease_lost_message)
 
-    logger.warning("Fetched {} campaigns".format(len(campaigns_details)))
+                run_checkpoint = _stage_run_units(
+                    uploader=uploader,
+                    run_id=run_id,
+                    run_parameters=run_parameters,
+                    resource_type=resource_type,
+                    dataset=dataset,
+                    units=_get_run_units(
+                        advertiser_ids=[
+                            advertiser_id
+                            for advertiser_id in advertiser_ids
+                            if utils.get_shard_index(
+                                key=advertiser_id, shards_count=shards_count
+                            )
+                            == shard_index
+                        ],
+                        date_from=(
+                            date_from if dataset == enums.Dataset.PERFORMANCE else None
+                        ),
+                        date_to=date_to
+                        if dataset == enums.Dataset.PERFORMANCE
+                        else None,
+                    ),
+                    iter_pages=iter_pages,
+                    max_workers=max_workers,
+                    advertiser_results=advertiser_results,
+                    shard=shard_index,
+                    on_unit_staged=check_lease,
+                )
+                if heartbeat.is_lost or not lease.renew():
+                    raise exceptions.LeaseLostException(lease_lost_message)
 
-    try:
-        uploaded_path = s3_client.TiktokS3Uploader(
-            s3_path=s3_path
-        ).upload_resource_details(
-            resource_details=campaigns_details,
-            resource_type=enums.ResourceType.CAMPAIGN,
-            date_created=datetime.datetime.utcnow(),
-        )
+                run_checkpoint["advertiser_ids"] = advertiser_ids
+                run_checkpoint["completed"] = True
+                uploader.upload_run_checkpoint(
+                    run_checkpoint=run_checkpoint,
+                    resource_type=resource_type,
+                    dataset=dataset,
+                    run_id=run_id,
+                    shard=shard_index,
+                )
+        except exceptions.LeaseLostException as e:
+            logger.warning(
+                "Stopped staging shard taken over by another worker. Error: {}".format(
+                    utils.get_exception_message(exception=e)
+                )
+            )
+            return None
+        finally:
+            lease.release()
     except s3_client_exceptions.TiktokS3UploaderError as e:
-        raise exceptions.ImporterException(utils.get_exception_message(exception=e))
+        raise exceptions.ImporterException(
+            utils.get_exception_message(exception=e)
+        ) from e
 
-    return uploaded_path, True
+    return _get_shard_result(
+        run_checkpoint=run_checkpoint,
+        resource_type=resource_type,
+        dataset=dataset,
+        advertiser_results=advertiser_results,
+    )
 
 
-def get_adgroups(
-    user_access_token: str, app_id: str, secret: str, s3_path: str
-) -> typing.Tuple[str, bool]:
-    adgroups_details = []
+def merge_shards(
+    s3_path: str,
+    dataset: enums.Dataset,
+    resource_type: enums.ResourceType,
+    run_id: str,
+    shards_count: int,
+    partition_key: typing.Optional[str] = None,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    output_format: s3_client_enums.OutputFormat = s3_client_enums.OutputFormat.JSON,
+    lease_dir: typing.Optional[str] = None,
+    lease_seconds: float = DEFAULT_LEASE_SECONDS,
+) -> typing.Optional[typing.List[str]]:
+    """
+    Uploads the staged records of all shards of the run `run_id`, in the order of
+    the advertiser ids, into the usual details or insights layout and returns the
+    uploaded paths. The merge runs once per run; merging an already merged run
+    returns the paths of the first merge.
 
-    tiktok_integration_client = tiktok_client.TiktokClient(
-        user_access_token=user_access_token
-    )
+    Returns None when some shards are not completed yet or another worker is
+    merging them.
+    """
     try:
-        advertiser_ids = tiktok_integration_client.get_account_ids(
-            app_id=app_id, secret=secret
+        uploader = s3_client.TiktokS3Uploader(
+            s3_path=s3_path, max_workers=max_workers, output_format=output_format
         )
-    except tiktok_client_exceptions.TiktokClientError as e:
-        raise exceptions.ImporterException(utils.get_exception_message(exception=e))
+        merged_checkpoint = uploader.get_run_checkpoint(
+            resource_type=resource_type, dataset=dataset, run_id=run_id
+        )
+        if merged_checkpoint:
+            return merged_checkpoint["uploaded_paths"]
 
-    logger.warning("Fetched {} advertiser ids".format(len(advertiser_ids)))
+        run_checkpoints = [
+            uploader.get_run_checkpoint(
+                resource_type=resource_type,
+                dataset=dataset,
+                run_id=run_id,
+                shard=shard_index,
+            )
+            for shard_index in range(shards_count)
+        ]
+        pending_shards = [
+            shard_index
+            for shard_index, run_checkpoint in enumerate(run_checkpoints)
+            if not run_checkpoint or not run_checkpoint.get("completed")
+        ]
+        if pending_shards:
+            logger.warning(
+                "Not merging run with pending shards (run_id={}, shards={})".format(
+                    run_id, pending_shards
+                )
+            )
+            return None
+
+        for run_checkpoint in run_checkpoints:
+            if run_checkpoint["parameters"]["shards_count"] != shards_count:
+                raise exceptions.ImporterException(
+                    "Run (run_id={}) was started with different parameters (parameters={})".format(
+                        run_id, run_checkpoint["parameters"]
+                    )
+                )
+
+        # Every shard fetches the advertiser list itself; records are merged in
+        # the order of that list, so the shards must agree on it.
+        advertiser_ids = set(run_checkpoints[0]["advertiser_ids"])
+        for shard_index, run_checkpoint in enumerate(run_checkpoints):
+            if set(run_checkpoint["advertiser_ids"]) != advertiser_ids:
+                raise exceptions.ImporterException(
+                    "Shards of run (run_id={}) were staged with different advertisers (shard={}, missing={}, unexpected={})".format(
+                        run_id,
+                        shard_index,
+                        sorted(advertiser_ids - set(run_checkpoint["advertiser_ids"])),
+                        sorted(set(run_checkpoint["advertiser_ids"]) - advertiser_ids),
+                    )
+                )
+
+        lease = _get_run_lease(
+            uploader=uploader,
+            lease_dir=lease_dir,
+            run_id=run_id,
+            resource_type=resource_type,
+            dataset=dataset,
+            lease_name="merge",
+            lease_seconds=lease_seconds,
+        )
+        if not lease.acquire():
+            logger.warning("Run is merged by another worker (run_id={})".format(run_id))
+            return None
 
-    for advertiser_id in advertiser_ids:
         try:
-            adgroup_details = tiktok_integration_client.get_account_adgroups_details(
-                advertiser_id=advertiser_id
+            lease_lost_message = "Lease of run (run_id={}) merge was taken over by another worker".format(
+                run_id
             )
-        except tiktok_client_exceptions.TiktokClientError as e:
-            raise exceptions.ImporterException(utils.get_exception_message(exception=e))
+            with concurrency.LeaseHeartbeat(
+                lease=lease, interval_seconds=lease_seconds / 3
+            ) as heartbeat:
+                staged_unit_ids = collections.defaultdict(list)
+                for run_checkpoint in run_checkpoints:
+                    for unit_id, unit in run_checkpoint["units"].items():
+                        staged_unit_ids[unit["advertiser_id"]].append(unit_id)
 
-        adgroups_details.extend(adgroup_details)
+                def iter_merged_records() -> typing.Iterator[typing.Dict]:
+                    for advertiser_id in run_checkpoints[0]["advertiser_ids"]:
+                        # Window unit ids end with the window start date, so
+                        # sorting them keeps the records in date order.
+                        for unit_id in sorted(staged_unit_ids.get(advertiser_id, [])):
+                            if heartbeat.is_lost:
+                                raise exceptions.LeaseLostException(lease_lost_message)
 
-    logger.warning("Fetched {} adgroups".format(len(adgroups_details)))
+                            yield from _iter_run_records(
+                                uploader=uploader,
+                                run_id=run_id,
+                                resource_type=resource_type,
+                                dataset=dataset,
+                                unit_ids=[unit_id],
+                            )
 
-    try:
-        uploaded_path = s3_client.TiktokS3Uploader(
-            s3_path=s3_path
-        ).upload_resource_details(
-            resource_details=adgroups_details,
-            resource_type=enums.ResourceType.AD_GROUP,
-            date_created=datetime.datetime.utcnow(),
-        )
+                if dataset == enums.Dataset.DETAILS:
+                    uploaded_paths = [
+                        uploader.stream_resource_details(
+                            resource_details=iter_merged_records(),
+                            resource_type=resource_type,
+                            date_created=datetime.datetime.utcnow(),
+                            columns=tiktok_client.TiktokClient.get_resource_details_columns(
+                                resource_type=resource_type,
+                                fields=run_checkpoints[0]["parameters"]["fields"],
+                            ),
+                        )
+                    ]
+                else:
+                    uploaded_paths = _upload_resource_insights(
+                        uploader=uploader,
+                        resource_insights=iter_merged_records(),
+                        resource_type=resource_type,
+                        partition_key=partition_key,
+                    )
+                if heartbeat.is_lost or not lease.renew():
+                    raise exceptions.LeaseLostException(lease_lost_message)
+
+                uploader.upload_run_checkpoint(
+                    run_checkpoint={
+                        "run_id": run_id,
+                        "parameters": run_checkpoints[0]["parameters"],
+                        "uploaded_paths": uploaded_paths,
+                    },
+                    resource_type=resource_type,
+                    dataset=dataset,
+                    run_id=run_id,
+                )
+        except exceptions.LeaseLostException as e:
+            logger.warning(
+                "Stopped merging run taken over by another worker. Error: {}".format(
+                    utils.get_exception_message(exception=e)
+                )
+            )
+            return None
+        finally:
+            lease.release()
+            uploader.close()
     except s3_client_exceptions.TiktokS3UploaderError as e:
-        raise exceptions.ImporterException(utils.get_exception_message(exception=e))
+        raise exceptions.ImporterException(
+            utils.get_exception_message(exception=e)
+        ) from e
 
-    return uploaded_path, True
+    return uploaded_paths
 
 
-def get_ads(
-    user_access_token: str, app_id: str, secret: str, s3_path: str
-) -> typing.Tuple[str, bool]:
-    ads_details = []
+class ImportSession(object):
+    """
+    Runs several imports for one access token in a single pass.
 
-    tiktok_integration_client = tiktok_client.TiktokClient(
-        user_access_token=user_access_token
-    )
-    try:
-        advertiser_ids = tiktok_integration_client.get_account_ids(
-            app_id=app_id, secret=secret
-        )
-    except tiktok_client_exceptions.TiktokClientError as e:
-        raise exceptions.ImporterException(utils.get_exception_message(exception=e))
+    The TikTok client, the advertiser list, the S3 uploader and one pool of
+    `max_workers` threads are shared by every import of the session. `run`
+    submits the fetches of all requested resource types to the pool up front, one
+    per advertiser, and for insights one per advertiser and `RUN_UNIT_WINDOW` of
+    days, so the pool keeps fetching the next resource types while earlier ones
+    are being uploaded. The fetched records of an import are kept in memory until it is
+    uploaded.
 
-    logger.warning("Fetched {} advertiser ids".format(len(advertiser_ids)))
+    An `executor` (anything with `submit(func, **kwargs)`, e.g. a queue of a
+    `concurrency.FairShareExecutor`) can be passed to share workers between
+    sessions; it is not shut down when the session is closed.
+    """
 
-    for advertiser_id in advertiser_ids:
+    def __init__(
+        self,
+        user_access_token: str,
+        app_id: str,
+        secret: str,
+        s3_path: str,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        output_format: s3_client_enums.OutputFormat = s3_client_enums.OutputFormat.JSON,
+        isolate_failures: bool = False,
+        executor: typing.Optional[typing.Any] = None,
+    ) -> None:
+        self._tiktok_integration_client = tiktok_client.TiktokClient(
+            user_access_token=user_access_token
+        )
+        self._app_id = app_id
+        self._secret = secret
+        self._isolate_failures = isolate_failures
         try:
-            ad_details = tiktok_integration_client.get_account_adgroups_details(
-                advertiser_id=advertiser_id
+            self._uploader = s3_client.TiktokS3Uploader(
+                s3_path=s3_path, max_workers=max_workers, output_format=output_format
             )
-        except tiktok_client_exceptions.TiktokClientError as e:
-            raise exceptions.ImporterException(utils.get_exception_message(exception=e))
+        except s3_client_exceptions.TiktokS3UploaderError as e:
+            raise exceptions.ImporterException(
+                utils.get_exception_message(exception=e)
+            ) from e
+        self._owns_executor = executor is None
+        self._executor = executor or concurrent.futures.ThreadPoolExecutor(
+            max_workers=max_workers
+        )
+        self._advertiser_ids = None
 
-        ads_details.extend(ad_details)
+    def __enter__(self) -> "ImportSession":
+        return self
 
-    logger.warning("Fetched {} ads".format(len(ads_details)))
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
 
-    try:
-        uploaded_path = s3_client.TiktokS3Uploader(
-            s3_path=s3_path
-        ).upload_resource_details(
-            resource_details=ads_details,
-            resource_type=enums.ResourceType.AD,
-            date_created=datetime.datetime.utcnow(),
+    def close(self) -> None:
+        if self._owns_executor:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+        self._uploader.close()
+
+    @property
+    def advertiser_ids(self) -> typing.List[str]:
+        if self._advertiser_ids is None:
+            self._advertiser_ids = _get_advertiser_ids(
+                tiktok_integration_client=self._tiktok_integration_client,
+                app_id=self._app_id,
+                secret=self._secret,
+            )
+
+        return self._advertiser_ids
+
+    def run(
+        self,
+        resource_types: typing.Iterable[enums.ResourceType] = (),
+        insights_resource_types: typing.Iterable[enums.ResourceType] = (),
+        date_from: typing.Optional[datetime.datetime] = None,
+        date_to: typing.Optional[datetime.datetime] = None,
+        fields: typing.Optional[
+            typing.Dict[enums.ResourceType, typing.List[str]]
+        ] = None,
+        metrics: typing.Optional[typing.List[str]] = None,
+        partition_key: typing.Optional[str] = None,
+    ) -> results.SessionResult:
+        """
+        Imports the details of `resource_types` and the insights of
+        `insights_resource_types` between `date_from` and `date_to`, in that order.
+        `fields` optionally projects the details per resource type.
+        """
+        imports = [
+            (enums.Dataset.DETAILS, resource_type) for resource_type in resource_types
+        ] + [
+            (enums.Dataset.PERFORMANCE, resource_type)
+            for resource_type in insights_resource_types
+        ]
+        if insights_resource_types and (date_from is None or date_to is None):
+            raise exceptions.ImporterException(
+                "Insights imports require date_from and date_to (date_from={}, date_to={})".format(
+                    date_from, date_to
+                )
+            )
+
+        pending_imports = []
+        for dataset, resource_type in imports:
+            units = (
+                _get_run_units(
+                    advertiser_ids=self.advertiser_ids,
+                    date_from=date_from,
+                    date_to=date_to,
+                )
+                if dataset == enums.Dataset.PERFORMANCE
+                else _get_run_units(advertiser_ids=self.advertiser_ids)
+            )
+            iter_pages = self._get_iter_pages(
+                dataset=dataset,
+                resource_type=resource_type,
+                date_from=date_from,
+                date_to=date_to,
+                fields=(fields or {}).get(resource_type),
+                metrics=metrics,
+            )
+            unit_results = {}
+            pending_imports.append(
+                (
+                    dataset,
+                    resource_type,
+                    units,
+                    unit_results,
+                    [
+                        self._executor.submit(
+                            _get_unit_pages,
+                            unit=unit,
+                            iter_pages=iter_pages,
+                            unit_results=unit_results,
+                            isolate_failures=self._isolate_failures,
+                        )
+                        for unit in units
+                    ],
+                )
+            )
+
+        import_results = []
+        try:
+            for (
+                dataset,
+                resource_type,
+                units,
+                unit_results,
+                futures,
+            ) in pending_imports:
+                import_results.append(
+                    self._finish_import(
+                        dataset=dataset,
+                        resource_type=resource_type,
+                        units=units,
+                        unit_results=unit_results,
+                        futures=futures,
+                        fields=(fields or {}).get(resource_type),
+                        partition_key=partition_key,
+                    )
+                )
+        finally:
+            for _, _, _, _, futures in pending_imports:
+                for future in futures:
+                    future.cancel()
+
+        return results.SessionResult(imports=import_results)
+
+    def _get_iter_pages(
+        self,
+        dataset: enums.Dataset,
+        resource_type: enums.ResourceType,
+        date_from: typing.Optional[datetime.datetime],
+        date_to: typing.Optional[datetime.datetime],
+        fields: typing.Optional[typing.List[str]],
+        metrics: typing.Optional[typing.List[str]],
+    ) -> typing.Callable[[str], typing.Iterable[typing.List[typing.Dict]]]:
+        return _get_iter_pages(
+            tiktok_integration_client=self._tiktok_integration_client,
+            dataset=dataset,
+            resource_type=resource_type,
+            date_from=date_from,
+            date_to=date_to,
+            fields=fields,
+            metrics=metrics,
         )
-    except s3_client_exceptions.TiktokS3UploaderError as e:
-        raise exceptions.ImporterException(utils.get_exception_message(exception=e))
 
-    return uploaded_path, True
+    def _finish_import(
+        self,
+        dataset: enums.Dataset,
+        resource_type: enums.ResourceType,
+        units: typing.List[RunUnit],
+        unit_results: typing.Dict[str, results.AdvertiserResult],
+        futures: typing.List[concurrent.futures.Future],
+        fields: typing.Optional[typing.List[str]],
+        partition_key: typing.Optional[str],
+    ) -> results.ImportResult:
+        units_pages = [future.result() for future in futures]
+        advertiser_results = _get_advertiser_results(
+            unit_results=[
+                unit_results[unit_id]
+                for unit_id, _, _ in units
+                if unit_id in unit_results
+            ]
+        )
+        records = list(
+            _iter_records(
+                pages=(
+                    page
+                    for (_, advertiser_id, _), unit_pages in zip(units, units_pages)
+                    if advertiser_results[advertiser_id].status
+                    == enums.ResultStatus.SUCCEEDED
+                    for page in unit_pages
+                ),
+                resource_type=resource_type,
+            )
+        )
+        try:
+            if dataset == enums.Dataset.DETAILS:
+                uploaded_paths = [
+                    self._uploader.upload_resource_details(
+                        resource_details=records,
+                        resource_type=resource_type,
+                        date_created=datetime.datetime.utcnow(),
+                        columns=self._tiktok_integration_client.get_resource_details_columns(
+                            resource_type=resource_type, fields=fields
+                        ),
+                    )
+                ]
+            else:
+                uploaded_paths = _upload_resource_insights(
+                    uploader=self._uploader,
+                    resource_insights=records,
+                    resource_type=resource_type,
+                    partition_key=partition_key,
+                )
+        except s3_client_exceptions.TiktokS3UploaderError as e:
+            raise exceptions.ImporterException(
+                utils.get_exception_message(exception=e)
+            ) from e
 
+        return _get_import_result(
+            resource_type=resource_type,
+            dataset=dataset,
+            uploaded_paths=uploaded_paths,
+            advertiser_ids=self.advertiser_ids,
+            advertiser_results=advertiser_results,
+        )
 
-def get_campaign_insights(
+
+def _import_resource_details(
     user_access_token: str,
     app_id: str,
     secret: str,
     s3_path: str,
-    date_from: datetime.datetime,
-    date_to: datetime.datetime,
-) -> typing.Tuple[typing.List[str], bool]:
-    campaigns_insights = []
+    resource_type: enums.ResourceType,
+    change_data_capture: bool,
+    snapshot_interval: datetime.timedelta,
+    fields: typing.Optional[typing.List[str]] = None,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    streaming: bool = False,
+    output_format: s3_client_enums.OutputFormat = s3_client_enums.OutputFormat.JSON,
+    run_id: typing.Optional[str] = None,
+    isolate_failures: bool = False,
+) -> results.ImportResult:
+    """
+    With `isolate_failures`, an advertiser that fails is left out of the output
+    instead of aborting the import. The result lists the advertisers whose
+    outcome was recorded, which are all of them with `isolate_failures`.
+    """
     tiktok_integration_client = tiktok_client.TiktokClient(
         user_access_token=user_access_token
     )
-    try:
-        advertiser_ids = tiktok_integration_client.get_account_ids(
-            app_id=app_id, secret=secret
+    advertiser_ids = _get_advertiser_ids(
+        tiktok_integration_client=tiktok_integration_client,
+        app_id=app_id,
+        secret=secret,
+    )
+
+    if change_data_capture and run_id:
+        raise exceptions.ImporterException(
+            "Resumable runs (run_id={}) are not supported with change data capture".format(
+                run_id
+            )
         )
-    except tiktok_client_exceptions.TiktokClientError as e:
-        raise exceptions.ImporterException(utils.get_exception_message(exception=e))
 
-    for advertiser_id in advertiser_ids:
-        try:
-            campaign_insights = tiktok_integration_client.get_insights(
+    advertiser_results = {}
+
+    def iter_advertiser_details(
+        advertiser_id: str,
+    ) -> typing.Optional[typing.Iterable[typing.List[typing.Dict]]]:
+        if isolate_failures:
+            return _get_advertiser_pages(
                 advertiser_id=advertiser_id,
-                resource_type=enums.ResourceType.CAMPAIGN,
-                from_datetime=date_from,
-                to_datetime=date_to,
+                iter_pages=lambda advertiser_id: _iter_resource_details(
+                    tiktok_integration_client=tiktok_integration_client,
+                    resource_type=resource_type,
+                    advertiser_id=advertiser_id,
+                    fields=fields,
+                ),
+                advertiser_results=advertiser_results,
+                isolate_failures=True,
             )
-        except tiktok_client_exceptions.TiktokClientError as e:
-            raise exceptions.ImporterException(utils.get_exception_message(exception=e))
 
-        campaigns_insights.extend(campaign_insights)
+        return _iter_resource_details(
+            tiktok_integration_client=tiktok_integration_client,
+            resource_type=resource_type,
+            advertiser_id=advertiser_id,
+            fields=fields,
+        )
 
     try:
-        uploaded_paths = s3_client.TiktokS3Uploader(
-            s3_path=s3_path
-        ).upload_resource_performance(
-            resource_performance=campaigns_insights,
-            resource_type=enums.ResourceType.CAMPAIGN,
-            date_created=datetime.datetime.utcnow(),
+        uploader = s3_client.TiktokS3Uploader(
+            s3_path=s3_path, output_format=output_format
         )
+        if change_data_capture:
+            uploaded_path = _import_resource_changes(
+                tiktok_integration_client=tiktok_integration_client,
+                uploader=uploader,
+                advertiser_ids=advertiser_ids,
+                resource_type=resource_type,
+                snapshot_interval=snapshot_interval,
+                fields=fields,
+                max_workers=max_workers,
+                advertiser_results=advertiser_results if isolate_failures else None,
+            )
+        else:
+            if run_id:
+                resource_details = _iter_checkpointed_records(
+                    uploader=uploader,
+                    run_id=run_id,
+                    run_parameters={
+                        "fields": fields,
+                        "output_format": output_format.value,
+                    },
+                    resource_type=resource_type,
+                    dataset=enums.Dataset.DETAILS,
+                    units=_get_run_units(advertiser_ids=advertiser_ids),
+                    iter_pages=lambda advertiser_id, window: _iter_resource_details(
+                        tiktok_integration_client=tiktok_integration_client,
+                        resource_type=resource_type,
+                        advertiser_id=advertiser_id,
+                        fields=fields,
+                    ),
+                    max_workers=max_workers,
+                    advertiser_results=advertiser_results,
+                    isolate_failures=isolate_failures,
+                )
+            else:
+                resource_details = _iter_records(
+                    pages=concurrency.iter_concurrently(
+                        func=lambda advertiser_id: iter_advertiser_details(
+                            advertiser_id=advertiser_id
+                        )
+                        or [],
+                        items=advertiser_ids,
+                        max_workers=max_workers,
+                        max_queue_size=STREAMING_QUEUE_SIZE,
+                    ),
+                    resource_type=resource_type,
+                )
+            columns = tiktok_integration_client.get_resource_details_columns(
+                resource_type=resource_type, fields=fields
+            )
+            if streaming:
+                uploaded_path = uploader.stream_resource_details(
+                    resource_details=resource_details,
+                    resource_type=resource_type,
+                    date_created=datetime.datetime.utcnow(),
+                    columns=columns,
+                )
+            else:
+                uploaded_path = uploader.upload_resource_details(
+                    resource_details=list(resource_details),
+                    resource_type=resource_type,
+                    date_created=datetime.datetime.utcnow(),
+                    columns=columns,
+                )
     except s3_client_exceptions.TiktokS3UploaderError as e:
-        raise exceptions.ImporterException(utils.get_exception_message(exception=e))
+        raise exceptions.ImporterException(
+            utils.get_exception_message(exception=e)
+        ) from e
 
-    return uploaded_paths, True
+    return _get_import_result(
+        resource_type=resource_type,
+        dataset=enums.Dataset.DETAILS,
+        uploaded_paths=[uploaded_path],
+        advertiser_ids=advertiser_ids,
+        advertiser_results=advertiser_results,
+    )
 
 
-def get_adgroup_insights(
+def _import_resource_insights(
     user_access_token: str,
     app_id: str,
     secret: str,
     s3_path: str,
+    resource_type: enums.ResourceType,
     date_from: datetime.datetime,
     date_to: datetime.datetime,
-) -> typing.Tuple[typing.List[str], bool]:
-    adgroups_insights = []
+    metrics: typing.Optional[typing.List[str]] = None,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    streaming: bool = False,
+    partition_key: typing.Optional[str] = None,
+    output_format: s3_client_enums.OutputFormat = s3_client_enums.OutputFormat.JSON,
+    run_id: typing.Optional[str] = None,
+    isolate_failures: bool = False,
+) -> results.ImportResult:
+    """
+    Insights are written as one file per row, or as one file per `partition_key`
+    value (e.g. "start_date" for the report day) with a manifest.
+
+    With a `run_id`, every advertiser and window is staged in S3 as it is fetched
+    and rerunning with the same `run_id` after a failure skips staged units.
+
+    With `isolate_failures`, an advertiser that fails is left out of the output
+    instead of aborting the import. The result lists the advertisers whose
+    outcome was recorded, which are all of them with `isolate_failures`.
+    """
     tiktok_integration_client = tiktok_client.TiktokClient(
         user_access_token=user_access_token
     )
+    advertiser_ids = _get_advertiser_ids(
+        tiktok_integration_client=tiktok_integration_client,
+        app_id=app_id,
+        secret=secret,
+    )
+
+    advertiser_results = {}
+
+    def iter_advertiser_insights(
+        advertiser_id: str,
+    ) -> typing.Optional[typing.Iterable[typing.List[typing.Dict]]]:
+        if isolate_failures:
+            return _get_advertiser_pages(
+                advertiser_id=advertiser_id,
+                iter_pages=lambda advertiser_id: _iter_resource_insights(
+                    tiktok_integration_client=tiktok_integration_client,
+                    resource_type=resource_type,
+                    advertiser_id=advertiser_id,
+                    date_from=date_from,
+                    date_to=date_to,
+                    metrics=metrics,
+                ),
+                advertiser_results=advertiser_results,
+                isolate_failures=True,
+            )
+
+        return _iter_resource_insights(
+            tiktok_integration_client=tiktok_integration_client,
+            resource_type=resource_type,
+            advertiser_id=advertiser_id,
+            date_from=date_from,
+            date_to=date_to,
+            metrics=metrics,
+        )
+
     try:
-        advertiser_ids = tiktok_integration_client.get_account_ids(
-            app_id=app_id, secret=secret
+        with s3_client.TiktokS3Uploader(
+            s3_path=s3_path, max_workers=max_workers, output_format=output_format
+        ) as uploader:
+            if run_id:
+                resource_insights = _iter_checkpointed_records(
+                    uploader=uploader,
+                    run_id=run_id,
+                    run_parameters={
+                        "date_from": date_from.isoformat(),
+                        "date_to": date_to.isoformat(),
+                        "metrics": metrics,
+                        "output_format": output_format.value,
+                    },
+                    resource_type=resource_type,
+                    dataset=enums.Dataset.PERFORMANCE,
+                    units=_get_run_units(
+                        advertiser_ids=advertiser_ids,
+                        date_from=date_from,
+                        date_to=date_to,
+                    ),
+                    iter_pages=lambda advertiser_id, window: _iter_resource_insights(
+                        tiktok_integration_client=tiktok_integration_client,
+                        resource_type=resource_type,
+                        advertiser_id=advertiser_id,
+                        date_from=window[0],
+                        date_to=window[1],
+                        metrics=metrics,
+                    ),
+                    max_workers=max_workers,
+                    advertiser_results=advertiser_results,
+                    isolate_failures=isolate_failures,
+                )
+            else:
+                resource_insights = _iter_records(
+                    pages=concurrency.iter_concurrently(
+                        func=lambda advertiser_id: iter_advertiser_insights(
+                            advertiser_id=advertiser_id
+                        )
+                        or [],
+                        items=advertiser_ids,
+                        max_workers=max_workers,
+                        max_queue_size=STREAMING_QUEUE_SIZE,
+                    ),
+                    resource_type=resource_type,
+                )
+            if not streaming:
+                resource_insights = list(resource_insights)
+
+            uploaded_paths = _upload_resource_insights(
+                uploader=uploader,
+                resource_insights=resource_insights,
+                resource_type=resource_type,
+                partition_key=partition_key,
+            )
+    except s3_client_exceptions.TiktokS3UploaderError as e:
+        raise exceptions.ImporterException(
+            utils.get_exception_message(exception=e)
+        ) from e
+
+    return _get_import_result(
+        resource_type=resource_type,
+        dataset=enums.Dataset.PERFORMANCE,
+        uploaded_paths=uploaded_paths,
+        advertiser_ids=advertiser_ids,
+        advertiser_results=advertiser_results,
+    )
+
+
+def _upload_resource_insights(
+    uploader: s3_client.TiktokS3Uploader,
+    resource_insights: typing.Iterable[typing.Dict],
+    resource_type: enums.ResourceType,
+    partition_key: typing.Optional[str],
+) -> typing.List[str]:
+    if partition_key:
+        return uploader.upload_partitioned_resource_performance(
+            resource_performance=resource_insights,
+            resource_type=resource_type,
+            date_created=datetime.datetime.utcnow(),
+            partition_key=partition_key,
         )
-    except tiktok_client_exceptions.TiktokClientError as e:
-        raise exceptions.ImporterException(utils.get_exception_message(exception=e))
 
-    for advertiser_id in advertiser_ids:
+    return uploader.upload_resource_performance(
+        resource_performance=resource_insights,
+        resource_type=resource_type,
+        date_created=datetime.datetime.utcnow(),
+    )
+
+
+def _import_resource_changes(
+    tiktok_integration_client: tiktok_client.TiktokClient,
+    uploader: s3_client.TiktokS3Uploader,
+    advertiser_ids: typing.List[str],
+    resource_type: enums.ResourceType,
+    snapshot_interval: datetime.timedelta,
+    fields: typing.Optional[typing.List[str]] = None,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    advertiser_results: typing.Optional[
+        typing.Dict[str, results.AdvertiserResult]
+    ] = None,
+) -> str:
+    """
+    Uploads only the entities inserted, updated or deleted since the previous run.
+
+    The previous run is described by a state file which keeps a content hash and
+    the latest modification time per advertiser. Entities are filtered on the
+    server side by modification time when the endpoint supports it, otherwise the
+    full list is fetched and compared by hash. Deletions can only be detected on
+    full fetches, which is why a full snapshot is still taken every
+    `snapshot_interval`.
+
+    When `advertiser_results` is given, failing advertisers are recorded there and
+    keep their previous state, so no changes are reported for them.
+    """
+    date_created = datetime.datetime.utcnow()
+    previous_state = uploader.get_resource_state(resource_type=resource_type) or {}
+    is_full_snapshot = _is_full_snapshot_due(
+        resource_state=previous_state,
+        snapshot_interval=snapshot_interval,
+        date_created=date_created,
+    )
+    supports_modification_filter = (
+        tiktok_integration_client.supports_modification_filter(
+            resource_type=resource_type
+        )
+    )
+
+    resource_state = {
+        "snapshot_created": date_created.isoformat()
+        if is_full_snapshot
+        else previous_state["snapshot_created"],
+        "advertisers": previous_state.get("advertisers", {}),
+    }
+    modified_since_by_advertiser = {
+        advertiser_id: None for advertiser_id in advertiser_ids
+    }
+    if not is_full_snapshot and supports_modification_filter:
+        for advertiser_id in advertiser_ids:
+            advertiser_state = resource_state["advertisers"].get(advertiser_id, {})
+            modified_since_by_advertiser[advertiser_id] = advertiser_state.get(
+                "watermark"
+            )
+
+    def get_advertiser_details(
+        advertiser_id: str,
+    ) -> typing.Optional[typing.List[typing.Dict]]:
+        if advertiser_results is None:
+            return _get_resource_details(
+                tiktok_integration_client=tiktok_integration_client,
+                resource_type=resource_type,
+                advertiser_id=advertiser_id,
+                modified_since=modified_since_by_advertiser[advertiser_id],
+                fields=fields,
+            )
+
+        pages = _get_advertiser_pages(
+            advertiser_id=advertiser_id,
+            iter_pages=lambda advertiser_id: [
+                _get_resource_details(
+                    tiktok_integration_client=tiktok_integration_client,
+                    resource_type=resource_type,
+                    advertiser_id=advertiser_id,
+                    modified_since=modified_since_by_advertiser[advertiser_id],
+                    fields=fields,
+                )
+            ],
+            advertiser_results=advertiser_results,
+            isolate_failures=True,
+        )
+        return pages[0] if pages is not None else None
+
+    resource_changes = {"inserted": [], "updated": [], "deleted": []}
+    resource_details = []
+    for advertiser_id, advertiser_resource_details in zip(
+        advertiser_ids,
+        concurrency.map_concurrently(
+            func=get_advertiser_details, items=advertiser_ids, max_workers=max_workers
+        ),
+    ):
+        if advertiser_resource_details is None:
+            continue
+
+        resource_state["advertisers"][advertiser_id] = _collect_resource_changes(
+            advertiser_id=advertiser_id,
+            resource_details=advertiser_resource_details,
+            advertiser_state=resource_state["advertisers"].get(advertiser_id, {}),
+            resource_changes=resource_changes,
+            is_full_fetch=modified_since_by_advertiser[advertiser_id] is None,
+        )
+        if is_full_snapshot:
+            resource_details.extend(advertiser_resource_details)
+
+    logger.warning(
+        "Captured {} changes (inserted={}, updated={}, deleted={}, full_snapshot={})".format(
+            resource_type.value,
+            len(resource_changes["inserted"]),
+            len(resource_changes["updated"]),
+            len(resource_changes["deleted"]),
+            is_full_snapshot,
+        )
+    )
+
+    if is_full_snapshot:
+        uploader.upload_resource_details(
+            resource_details=resource_details,
+            resource_type=resource_type,
+            date_created=date_created,
+            columns=tiktok_integration_client.get_resource_details_columns(
+                resource_type=resource_type, fields=fields
+            ),
+        )
+
+    uploaded_path = uploader.upload_resource_changes(
+        resource_changes=resource_changes,
+        resource_type=resource_type,
+        date_created=date_created,
+    )
+    uploader.upload_resource_state(
+        resource_state=resource_state, resource_type=resource_type
+    )
+
+    return uploaded_path
+
+
+def _iter_checkpointed_records(
+    uploader: s3_client.TiktokS3Uploader,
+    run_id: str,
+    run_parameters: typing.Dict,
+    resource_type: enums.ResourceType,
+    dataset: enums.Dataset,
+    units: typing.List[RunUnit],
+    iter_pages: typing.Callable[
+        [str, typing.Optional[RunWindow]], typing.Iterable[typing.List[typing.Dict]]
+    ],
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    advertiser_results: typing.Optional[
+        typing.Dict[str, results.AdvertiserResult]
+    ] = None,
+    isolate_failures: bool = False,
+) -> typing.Iterator[typing.Dict]:
+    """
+    Stages every unit of the run `run_id` and then reads the staged records back
+    in unit order, leaving out the advertisers that failed.
+    """
+    advertiser_results = {} if advertiser_results is None else advertiser_results
+    run_checkpoint = _stage_run_units(
+        uploader=uploader,
+        run_id=run_id,
+        run_parameters=run_parameters,
+        resource_type=resource_type,
+        dataset=dataset,
+        units=units,
+        iter_pages=iter_pages,
+        max_workers=max_workers,
+        advertiser_results=advertiser_results,
+        isolate_failures=isolate_failures,
+    )
+    yield from _iter_run_records(
+        uploader=uploader,
+        run_id=run_id,
+        resource_type=resource_type,
+        dataset=dataset,
+        unit_ids=[
+            unit_id
+            for unit_id, advertiser_id, _ in units
+            if unit_id in run_checkpoint["units"]
+            and advertiser_results[advertiser_id].status == enums.ResultStatus.SUCCEEDED
+        ],
+    )
+
+
+def _get_run_units(
+    advertiser_ids: typing.List[str],
+    date_from: typing.Optional[datetime.datetime] = None,
+    date_to: typing.Optional[datetime.datetime] = None,
+) -> typing.List[RunUnit]:
+    """
+    Splits a run into `(unit_id, advertiser_id, window)` units: one per
+    advertiser for details, and one per advertiser and `RUN_UNIT_WINDOW` of days
+    for insights, so that a large advertiser is staged and retried in parts.
+    """
+    windows = [None]
+    if date_from is not None and date_to is not None:
+        windows = []
+        window_from = date_from
+        while window_from.date() <= date_to.date():
+            window_to = min(
+                window_from + RUN_UNIT_WINDOW - datetime.timedelta(days=1), date_to
+            )
+            windows.append((window_from, window_to))
+            window_from = window_to + datetime.timedelta(days=1)
+
+    return [
+        (
+            advertiser_id
+            if window is None
+            else "{}_{}".format(advertiser_id, window[0].strftime("%Y-%m-%d")),
+            advertiser_id,
+            window,
+        )
+        for advertiser_id in advertiser_ids
+        for window in windows
+    ]
+
+
+def _stage_run_units(
+    uploader: s3_client.TiktokS3Uploader,
+    run_id: str,
+    run_parameters: typing.Dict,
+    resource_type: enums.ResourceType,
+    dataset: enums.Dataset,
+    units: typing.List[RunUnit],
+    iter_pages: typing.Callable[
+        [str, typing.Optional[RunWindow]], typing.Iterable[typing.List[typing.Dict]]
+    ],
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    advertiser_results: typing.Optional[
+        typing.Dict[str, results.AdvertiserResult]
+    ] = None,
+    isolate_failures: bool = False,
+    shard: typing.Optional[int] = None,
+    on_unit_staged: typing.Optional[typing.Callable[[str], None]] = None,
+) -> typing.Dict:
+    """
+    Imports every unit of the run `run_id` separately and returns the run
+    checkpoint.
+
+    The records of a unit are streamed to a staging file while they are fetched,
+    and the unit is then recorded in the run checkpoint (one per `shard` when
+    the run is sharded). Units already recorded by a previous attempt are not
+    fetched again. With `isolate_failures`, a unit that fails is not staged and
+    fails its advertiser instead of the run. The outcome of every advertiser is
+    recorded in `advertiser_results`.
+    """
+    run_checkpoint = uploader.get_run_checkpoint(
+        resource_type=resource_type, dataset=dataset, run_id=run_id, shard=shard
+    ) or {"run_id": run_id, "parameters": run_parameters, "units": {}}
+    if run_checkpoint["parameters"] != run_parameters:
+        raise exceptions.ImporterException(
+            "Run (run_id={}) was started with different parameters (parameters={})".format(
+                run_id, run_checkpoint["parameters"]
+            )
+        )
+
+    logger.warning(
+        "Starting {} {} run (run_id={}, shard={}) with {} of {} units completed".format(
+            resource_type.value,
+            dataset.value,
+            run_id,
+            shard,
+            sum(unit_id in run_checkpoint["units"] for unit_id, _, _ in units),
+            len(units),
+        )
+    )
+    run_checkpoint_lock = threading.Lock()
+    unit_results = {}
+
+    def import_unit(unit: RunUnit) -> None:
+        unit_id, advertiser_id, window = unit
+        if unit_id in run_checkpoint["units"]:
+            unit_results[unit_id] = results.AdvertiserResult(
+                advertiser_id=advertiser_id,
+                status=enums.ResultStatus.SUCCEEDED,
+                records_count=run_checkpoint["units"][unit_id]["records_count"],
+            )
+            return
+
+        started_at = datetime.datetime.utcnow()
+        started_time = time.monotonic()
+        records_count = 0
+
+        def iter_unit_records() -> typing.Iterator[typing.Dict]:
+            nonlocal records_count
+            for page in iter_pages(advertiser_id, window):
+                records_count += len(page)
+                yield from page
+
         try:
-            adgroup_insights = tiktok_integration_client.get_insights(
+            uploaded_path = uploader.stream_run_records(
+                records=iter_unit_records(),
+                resource_type=resource_type,
+                dataset=dataset,
+                run_id=run_id,
+                unit_id=unit_id,
+            )
+        except exceptions.ImporterException as e:
+            error = e.__cause__ or e
+            unit_results[unit_id] = results.AdvertiserResult(
                 advertiser_id=advertiser_id,
-                resource_type=enums.ResourceType.AD_GROUP,
-                from_datetime=date_from,
-                to_datetime=date_to,
+                status=enums.ResultStatus.FAILED,
+                error_class=error.__class__.__name__,
+                error_message=utils.get_exception_message(exception=e),
+                started_at=started_at,
+                duration_seconds=time.monotonic() - started_time,
             )
-        except tiktok_client_exceptions.TiktokClientError as e:
-            raise exceptions.ImporterException(utils.get_exception_message(exception=e))
+            if not isolate_failures:
+                raise
 
-        adgroups_insights.extend(adgroup_insights)
+            logger.warning(
+                "Skipping failed unit (unit_id={}). Error: {}".format(
+                    unit_id, utils.get_exception_message(exception=e)
+                )
+            )
+            return
+
+        unit_results[unit_id] = results.AdvertiserResult(
+            advertiser_id=advertiser_id,
+            status=enums.ResultStatus.SUCCEEDED,
+            records_count=records_count,
+            started_at=started_at,
+            duration_seconds=time.monotonic() - started_time,
+        )
+        with run_checkpoint_lock:
+            run_checkpoint["units"][unit_id] = {
+                "advertiser_id": advertiser_id,
+                "path": uploaded_path,
+                "records_count": records_count,
+            }
+            uploader.upload_run_checkpoint(
+                run_checkpoint=run_checkpoint,
+                resource_type=resource_type,
+                dataset=dataset,
+                run_id=run_id,
+                shard=shard,
+            )
+
+        if on_unit_staged:
+            on_unit_staged(unit_id)
 
     try:
-        uploaded_paths = s3_client.TiktokS3Uploader(
-            s3_path=s3_path
-        ).upload_resource_performance(
-            resource_performance=adgroups_insights,
-            resource_type=enums.ResourceType.AD_GROUP,
-            date_created=datetime.datetime.utcnow(),
+        concurrency.map_concurrently(
+            func=import_unit, items=units, max_workers=max_workers
         )
-    except s3_client_exceptions.TiktokS3UploaderError as e:
-        raise exceptions.ImporterException(utils.get_exception_message(exception=e))
+    finally:
+        if advertiser_results is not None:
+            advertiser_results.update(
+                _get_advertiser_results(
+                    unit_results=[
+                        unit_results[unit_id]
+                        for unit_id, _, _ in units
+                        if unit_id in unit_results
+                    ]
+                )
+            )
 
-    return uploaded_paths, True
+    return run_checkpoint
 
 
-def get_ad_insights(
-    user_access_token: str,
-    app_id: str,
-    secret: str,
-    s3_path: str,
+def _get_advertiser_results(
+    unit_results: typing.List[results.AdvertiserResult],
+) -> typing.Dict[str, results.AdvertiserResult]:
+    """
+    Combines the results of the units of every advertiser. An advertiser fails
+    with the error of its first failed unit and then contributes no records.
+    """
+    advertiser_results = {}
+    for unit_result in unit_results:
+        advertiser_result = advertiser_results.setdefault(
+            unit_result.advertiser_id,
+            results.AdvertiserResult(
+                advertiser_id=unit_result.advertiser_id,
+                status=enums.ResultStatus.SUCCEEDED,
+            ),
+        )
+        advertiser_result.duration_seconds += unit_result.duration_seconds
+        if unit_result.started_at and (
+            not advertiser_result.started_at
+            or unit_result.started_at < advertiser_result.started_at
+        ):
+            advertiser_result.started_at = unit_result.started_at
+        if advertiser_result.status == enums.ResultStatus.FAILED:
+            continue
+
+        if unit_result.status == enums.ResultStatus.FAILED:
+            advertiser_result.status = enums.ResultStatus.FAILED
+            advertiser_result.records_count = 0
+            advertiser_result.error_class = unit_result.error_class
+            advertiser_result.error_message = unit_result.error_message
+        else:
+            advertiser_result.records_count += unit_result.records_count
+
+    return advertiser_results
+
+
+def _iter_run_records(
+    uploader: s3_client.TiktokS3Uploader,
+    run_id: str,
+    resource_type: enums.ResourceType,
+    dataset: enums.Dataset,
+    unit_ids: typing.List[str],
+) -> typing.Iterator[typing.Dict]:
+    for unit_id in unit_ids:
+        records = uploader.get_run_records(
+            resource_type=resource_type,
+            dataset=dataset,
+            run_id=run_id,
+            unit_id=unit_id,
+        )
+        if records is None:
+            raise exceptions.ImporterException(
+                "Staged records of run (run_id={}, unit_id={}) are missing".format(
+                    run_id, unit_id
+                )
+            )
+
+        yield from records
+
+
+def _import_free_shards(
+    first_shard_index: int, shards_count: int, **kwargs: typing.Any
+) -> typing.List[results.ImportResult]:
+    """
+    Imports, one after another starting at `first_shard_index`, every shard not
+    leased by another worker.
+    """
+    shard_results = []
+    for offset in range(shards_count):
+        shard_result = import_shard(
+            shard_index=(first_shard_index + offset) % shards_count,
+            shards_count=shards_count,
+            **kwargs,
+        )
+        if shard_result:
+            shard_results.append(shard_result)
+
+    return shard_results
+
+
+def _get_shard_result(
+    run_checkpoint: typing.Dict,
+    resource_type: enums.ResourceType,
+    dataset: enums.Dataset,
+    advertiser_results: typing.Optional[
+        typing.Dict[str, results.AdvertiserResult]
+    ] = None,
+) -> results.ImportResult:
+    advertiser_results = advertiser_results or _get_advertiser_results(
+        unit_results=[
+            results.AdvertiserResult(
+                advertiser_id=unit["advertiser_id"],
+                status=enums.ResultStatus.SUCCEEDED,
+                records_count=unit["records_count"],
+            )
+            for unit in run_checkpoint["units"].values()
+        ]
+    )
+    return _get_import_result(
+        resource_type=resource_type,
+        dataset=dataset,
+        uploaded_paths=[unit["path"] for unit in run_checkpoint["units"].values()],
+        advertiser_ids=run_checkpoint["advertiser_ids"],
+        advertiser_results=advertiser_results,
+    )
+
+
+def _get_run_parameters(
+    dataset: enums.Dataset,
+    date_from: typing.Optional[datetime.datetime],
+    date_to: typing.Optional[datetime.datetime],
+    fields: typing.Optional[typing.List[str]],
+    metrics: typing.Optional[typing.List[str]],
+    output_format: s3_client_enums.OutputFormat,
+) -> typing.Dict:
+    if dataset == enums.Dataset.DETAILS:
+        return {"fields": fields, "output_format": output_format.value}
+
+    return {
+        "date_from": date_from.isoformat(),
+        "date_to": date_to.isoformat(),
+        "metrics": metrics,
+        "output_format": output_format.value,
+    }
+
+
+def _get_run_lease(
+    uploader: s3_client.TiktokS3Uploader,
+    lease_dir: typing.Optional[str],
+    run_id: str,
+    resource_type: enums.ResourceType,
+    dataset: enums.Dataset,
+    lease_name: str,
+    lease_seconds: float,
+) -> concurrency.Lease:
+    if lease_dir is None:
+        return concurrency.Lease(
+            get_lease=lambda: uploader.get_run_lease(
+                resource_type=resource_type,
+                dataset=dataset,
+                run_id=run_id,
+                lease_name=lease_name,
+            ),
+            put_lease=lambda lease: uploader.upload_run_lease(
+                lease=lease,
+                resource_type=resource_type,
+                dataset=dataset,
+                run_id=run_id,
+                lease_name=lease_name,
+            ),
+            lease_seconds=lease_seconds,
+        )
+
+    lease_path = os.path.join(
+        lease_dir,
+        run_id,
+        resource_type.value,
+        dataset.value,
+        "{}.json".format(lease_name),
+    )
+    return concurrency.Lease(
+        get_lease=lambda: _read_lease_file(path=lease_path),
+        put_lease=lambda lease: _write_lease_file(path=lease_path, lease=lease),
+        lease_seconds=lease_seconds,
+    )
+
+
+def _read_lease_file(path: str) -> typing.Optional[typing.Dict]:
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def _write_lease_file(path: str, lease: typing.Dict) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temporary_path = "{}.{}.tmp".format(path, uuid.uuid4().hex)
+    with open(temporary_path, "w") as f:
+        json.dump(lease, f)
+    os.replace(temporary_path, path)
+
+
+def _collect_resource_changes(
+    advertiser_id: str,
+    resource_details: typing.List[typing.Dict],
+    advertiser_state: typing.Dict,
+    resource_changes: typing.Dict[str, typing.List[typing.Dict]],
+    is_full_fetch: bool,
+) -> typing.Dict:
+    previous_hashes = advertiser_state.get("hashes", {})
+    hashes = {} if is_full_fetch else dict(previous_hashes)
+    watermark = advertiser_state.get("watermark")
+
+    for resource in resource_details:
+        resource_hash = utils.get_data_hash(data=resource)
+        previous_hash = previous_hashes.get(resource["id"])
+        if previous_hash is None:
+            resource_changes["inserted"].append(resource)
+        elif previous_hash != resource_hash:
+            resource_changes["updated"].append(resource)
+
+        hashes[resource["id"]] = resource_hash
+        if not watermark or resource["updated_time"] > watermark:
+            watermark = resource["updated_time"]
+
+    if is_full_fetch:
+        resource_changes["deleted"].extend(
+            {"id": resource_id, "account_id": advertiser_id}
+            for resource_id in previous_hashes
+            if resource_id not in hashes
+        )
+
+    return {"watermark": watermark, "hashes": hashes}
+
+
+def _is_full_snapshot_due(
+    resource_state: typing.Dict,
+    snapshot_interval: datetime.timedelta,
+    date_created: datetime.datetime,
+) -> bool:
+    if not resource_state.get("snapshot_created"):
+        return True
+
+    snapshot_created = datetime.datetime.fromisoformat(
+        resource_state["snapshot_created"]
+    )
+    return date_created - snapshot_created >= snapshot_interval
+
+
+def _get_resource_details(
+    tiktok_integration_client: tiktok_client.TiktokClient,
+    resource_type: enums.ResourceType,
+    advertiser_id: str,
+    modified_since: typing.Optional[str] = None,
+    fields: typing.Optional[typing.List[str]] = None,
+) -> typing.List[typing.Dict]:
+    try:
+        return tiktok_integration_client.get_account_resource_details(
+            advertiser_id=advertiser_id,
+            resource_type=resource_type,
+            modified_since=modified_since,
+            fields=fields,
+        )
+    except tiktok_client_exceptions.TiktokClientError as e:
+        raise exceptions.ImporterException(
+            utils.get_exception_message(exception=e)
+        ) from e
+
+
+def _iter_resource_details(
+    tiktok_integration_client: tiktok_client.TiktokClient,
+    resource_type: enums.ResourceType,
+    advertiser_id: str,
+    fields: typing.Optional[typing.List[str]] = None,
+) -> typing.Iterator[typing.List[typing.Dict]]:
+    try:
+        yield from tiktok_integration_client.iter_account_resource_details(
+            advertiser_id=advertiser_id, resource_type=resource_type, fields=fields
+        )
+    except tiktok_client_exceptions.TiktokClientError as e:
+        raise exceptions.ImporterException(
+            utils.get_exception_message(exception=e)
+        ) from e
+
+
+def _iter_resource_insights(
+    tiktok_integration_client: tiktok_client.TiktokClient,
+    resource_type: enums.ResourceType,
+    advertiser_id: str,
     date_from: datetime.datetime,
     date_to: datetime.datetime,
-) -> typing.Tuple[typing.List[str], bool]:
-    ads_insights = []
-    tiktok_integration_client = tiktok_client.TiktokClient(
-        user_access_token=user_access_token
-    )
+    metrics: typing.Optional[typing.List[str]] = None,
+) -> typing.Iterator[typing.List[typing.Dict]]:
     try:
-        advertiser_ids = tiktok_integration_client.get_account_ids(
-            app_id=app_id, secret=secret
+        yield from tiktok_integration_client.iter_insights(
+            advertiser_id=advertiser_id,
+            resource_type=resource_type,
+            from_datetime=date_from,
+            to_datetime=date_to,
+            metrics=metrics,
         )
     except tiktok_client_exceptions.TiktokClientError as e:
-        raise exceptions.ImporterException(utils.get_exception_message(exception=e))
+        raise exceptions.ImporterException(
+            utils.get_exception_message(exception=e)
+        ) from e
 
-    for advertiser_id in advertiser_ids:
-        try:
-            ad_insights = tiktok_integration_client.get_insights(
-                advertiser_id=advertiser_id,
-                resource_type=enums.ResourceType.AD,
-                from_datetime=date_from,
-                to_datetime=date_to,
+
+def _get_iter_pages(
+    tiktok_integration_client: tiktok_client.TiktokClient,
+    dataset: enums.Dataset,
+    resource_type: enums.ResourceType,
+    date_from: typing.Optional[datetime.datetime],
+    date_to: typing.Optional[datetime.datetime],
+    fields: typing.Optional[typing.List[str]],
+    metrics: typing.Optional[typing.List[str]],
+) -> typing.Callable[..., typing.Iterable[typing.List[typing.Dict]]]:
+    """
+    Returns a function fetching the pages of an advertiser, optionally limited
+    to a `(date_from, date_to)` window for insights.
+    """
+    if dataset == enums.Dataset.DETAILS:
+        return lambda advertiser_id, window=None: _iter_resource_details(
+            tiktok_integration_client=tiktok_integration_client,
+            resource_type=resource_type,
+            advertiser_id=advertiser_id,
+            fields=fields,
+        )
+
+    return lambda advertiser_id, window=None: _iter_resource_insights(
+        tiktok_integration_client=tiktok_integration_client,
+        resource_type=resource_type,
+        advertiser_id=advertiser_id,
+        date_from=window[0] if window else date_from,
+        date_to=window[1] if window else date_to,
+        metrics=metrics,
+    )
+
+
+def _get_advertiser_pages(
+    advertiser_id: str,
+    iter_pages: typing.Callable[[str], typing.Iterable[typing.List[typing.Dict]]],
+    advertiser_results: typing.Dict[str, results.AdvertiserResult],
+    isolate_failures: bool,
+) -> typing.Optional[typing.List[typing.List[typing.Dict]]]:
+    """
+    Fetches all pages of one advertiser and records the outcome in
+    `advertiser_results`. With `isolate_failures`, returns None instead of
+    raising when the advertiser fails; pages are only returned once complete, so
+    a failing advertiser never contributes partial data.
+    """
+    started_at = datetime.datetime.utcnow()
+    started_time = time.monotonic()
+    try:
+        pages = list(iter_pages(advertiser_id))
+    except exceptions.ImporterException as e:
+        error = e.__cause__ or e
+        advertiser_results[advertiser_id] = results.AdvertiserResult(
+            advertiser_id=advertiser_id,
+            status=enums.ResultStatus.FAILED,
+            error_class=error.__class__.__name__,
+            error_message=utils.get_exception_message(exception=e),
+            started_at=started_at,
+            duration_seconds=time.monotonic() - started_time,
+        )
+        if not isolate_failures:
+            raise
+
+        logger.warning(
+            "Skipping failed advertiser (advertiser_id={}). Error: {}".format(
+                advertiser_id, utils.get_exception_message(exception=e)
             )
-        except tiktok_client_exceptions.TiktokClientError as e:
-            raise exceptions.ImporterException(utils.get_exception_message(exception=e))
+        )
+        return None
+
+    advertiser_results[advertiser_id] = results.AdvertiserResult(
+        advertiser_id=advertiser_id,
+        status=enums.ResultStatus.SUCCEEDED,
+        records_count=sum(len(page) for page in pages),
+        started_at=started_at,
+        duration_seconds=time.monotonic() - started_time,
+    )
+    return pages
 
-        ads_insights.extend(ad_insights)
 
+def _get_unit_pages(
+    unit: RunUnit,
+    iter_pages: typing.Callable[..., typing.Iterable[typing.List[typing.Dict]]],
+    unit_results: typing.Dict[str, results.AdvertiserResult],
+    isolate_failures: bool,
+) -> typing.Optional[typing.List[typing.List[typing.Dict]]]:
+    """
+    Fetches all pages of one run unit like `_get_advertiser_pages`, and records
+    its outcome in `unit_results` under the unit id.
+    """
+    unit_id, advertiser_id, window = unit
+    advertiser_results = {}
     try:
-        uploaded_paths = s3_client.TiktokS3Uploader(
-            s3_path=s3_path
-        ).upload_resource_performance(
-            resource_performance=ads_insights,
-            resource_type=enums.ResourceType.AD,
-            date_created=datetime.datetime.utcnow(),
+        return _get_advertiser_pages(
+            advertiser_id=advertiser_id,
+            iter_pages=lambda advertiser_id: iter_pages(advertiser_id, window),
+            advertiser_results=advertiser_results,
+            isolate_failures=isolate_failures,
         )
-    except s3_client_exceptions.TiktokS3UploaderError as e:
-        raise exceptions.ImporterException(utils.get_exception_message(exception=e))
+    finally:
+        if advertiser_id in advertiser_results:
+            unit_results[unit_id] = advertiser_results[advertiser_id]
+
+
+def _get_import_result(
+    resource_type: enums.ResourceType,
+    dataset: enums.Dataset,
+    uploaded_paths: typing.List[str],
+    advertiser_ids: typing.List[str],
+    advertiser_results: typing.Dict[str, results.AdvertiserResult],
+) -> results.ImportResult:
+    return results.ImportResult(
+        resource_type=resource_type,
+        dataset=dataset,
+        uploaded_paths=uploaded_paths,
+        advertisers=[
+            advertiser_results[advertiser_id]
+            for advertiser_id in advertiser_ids
+            if advertiser_id in advertiser_results
+        ],
+    )
+
+
+def _iter_records(
+    pages: typing.Iterable[typing.List[typing.Dict]],
+    resource_type: enums.ResourceType,
+) -> typing.Iterator[typing.Dict]:
+    records_count = 0
+    for page in pages:
+        records_count += len(page)
+        yield from page
+
+    logger.warning("Fetched {} {} records".format(records_count, resource_type.value))
+
+
+def _get_advertiser_ids(
+    tiktok_integration_client: tiktok_client.TiktokClient, app_id: str, secret: str
+) -> typing.List[str]:
+    try:
+        advertiser_ids = tiktok_integration_client.get_account_ids(
+            app_id=app_id, secret=secret
+        )
+    except tiktok_client_exceptions.TiktokClientError as e:
+        raise exceptions.ImporterException(
+            utils.get_exception_message(exception=e)
+        ) from e
+
+    logger.warning("Fetched {} advertiser ids".format(len(advertiser_ids)))
 
-    return uploaded_paths, True
+    return advertiser_ids
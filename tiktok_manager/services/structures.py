@@ -0,0 +1,607 @@
+import collections
+import logging
+import typing
+
+from tiktok_manager import concurrency, enums, exceptions, plans, results, utils
+from tiktok_manager.integrations.clients.tiktok import client as tiktok_client
+from tiktok_manager.integrations.clients.tiktok import (
+    constants as tiktok_client_constants,
+)
+from tiktok_manager.integrations.clients.tiktok import (
+    exceptions as tiktok_client_exceptions,
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_WORKERS = 8
+
+_RESOURCE_TYPES = [
+    enums.ResourceType.CAMPAIGN,
+    enums.ResourceType.AD_GROUP,
+    enums.ResourceType.AD,
+]
+_NAME_KEYS = {
+    enums.ResourceType.CAMPAIGN: "campaign_name",
+    enums.ResourceType.AD_GROUP: "adgroup_name",
+    enums.ResourceType.AD: "ad_name",
+}
+_CHILDREN = {
+    enums.ResourceType.CAMPAIGN: ("adgroups", enums.ResourceType.AD_GROUP),
+    enums.ResourceType.AD_GROUP: ("ads", enums.ResourceType.AD),
+}
+_PARENT_ID_KEYS = {
+    enums.ResourceType.CAMPAIGN: None,
+    enums.ResourceType.AD_GROUP: "campaign_id",
+    enums.ResourceType.AD: "adgroup_id",
+}
+
+
+def plan(
+    user_access_token: str,
+    advertiser_id: str,
+    campaigns: typing.List[typing.Dict],
+) -> plans.Plan:
+    """
+    Compares the desired `campaigns` of an advertiser with their current state and
+    returns the changes needed to reach it, without applying anything.
+
+    Every campaign holds its adgroups under "adgroups" and every adgroup its ads
+    under "ads", with the same details as the create actions. Entities are
+    matched by name within their parent. Existing entities are only updated when
+    one of the given budget, bid or creative fields differs, and their status is
+    changed separately. Entities missing from `campaigns` are left untouched.
+    """
+    client = tiktok_client.TiktokClient(user_access_token=user_access_token)
+    client.warm_up()
+    try:
+        resources_state = concurrency.map_concurrently(
+            func=lambda resource_type: client.get_account_resource_state(
+                advertiser_id=advertiser_id, resource_type=resource_type
+            ),
+            items=_RESOURCE_TYPES,
+            max_workers=len(_RESOURCE_TYPES),
+        )
+    except tiktok_client_exceptions.TiktokClientError as e:
+        raise exceptions.ActionException(
+            utils.get_exception_message(exception=e)
+        ) from e
+
+    structure_plan = plans.Plan(advertiser_id=advertiser_id)
+    _plan_entities(
+        structure_plan=structure_plan,
+        resource_type=enums.ResourceType.CAMPAIGN,
+        entities_details=campaigns,
+        entities_state=dict(zip(_RESOURCE_TYPES, resources_state)),
+        parent_path=(),
+        parent_id=None,
+    )
+
+    logger.warning(
+        "Planned structure changes (advertiser_id={}, changes={})".format(
+            advertiser_id,
+            dict(
+                collections.Counter(
+                    "{}_{}".format(change.resource_type.value, change.action.value)
+                    for change in structure_plan.changes
+                )
+            ),
+        )
+    )
+
+    return structure_plan
+
+
+def apply(
+    user_access_token: str,
+    structure_plan: plans.Plan,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+) -> typing.List[results.ActionResult]:
+    """
+    Applies the changes of a plan and returns one result per change, in the order
+    of the plan.
+
+    Campaigns are applied before their adgroups and adgroups before their ads,
+    each level with up to `max_workers` requests at a time. The ads of an adgroup
+    are created in one request and updated in another, and status changes are
+    grouped by resource type and status. Changes below a failed entity fail
+    without calling the API; a failed change does not stop the others.
+    """
+    client = tiktok_client.TiktokClient(user_access_token=user_access_token)
+    client.warm_up()
+    advertiser_id = structure_plan.advertiser_id
+    entity_ids = dict(structure_plan.entity_ids)
+    action_results = [None] * len(structure_plan.changes)
+
+    for resource_type in [enums.ResourceType.CAMPAIGN, enums.ResourceType.AD_GROUP]:
+        indexed_changes = structure_plan.get_changes(
+            resource_type=resource_type,
+            actions=[enums.ChangeAction.CREATE, enums.ChangeAction.UPDATE],
+        )
+        for (index, change), action_result in zip(
+            indexed_changes,
+            concurrency.map_concurrently(
+                func=lambda indexed_change: _apply_change(
+                    client=client,
+                    advertiser_id=advertiser_id,
+                    change=indexed_change[1],
+                    parent_id=entity_ids.get(indexed_change[1].path[:-1]),
+                ),
+                items=indexed_changes,
+                max_workers=max_workers,
+            ),
+        ):
+            action_results[index] = action_result
+            if action_result.status == enums.ResultStatus.SUCCEEDED:
+                entity_ids[change.path] = action_result.entity_id
+
+    ad_groups = collections.defaultdict(list)
+    for index, change in structure_plan.get_changes(
+        resource_type=enums.ResourceType.AD,
+        actions=[enums.ChangeAction.CREATE, enums.ChangeAction.UPDATE],
+    ):
+        ad_groups[(change.path[:-1], change.action)].append((index, change))
+
+    status_groups = collections.defaultdict(list)
+    for index, change in structure_plan.get_changes(
+        resource_type=None, actions=[enums.ChangeAction.UPDATE_STATUS]
+    ):
+        status_groups[
+            (change.resource_type, change.details["operation_status"])
+        ].append((index, change))
+
+    batches = [
+        (indexed_changes, entity_ids.get(adgroup_path))
+        for (adgroup_path, _), indexed_changes in ad_groups.items()
+    ]
+    batch_size = tiktok_client_constants.STATUS_UPDATE_BATCH_SIZE
+    for indexed_changes in status_groups.values():
+        for offset in range(0, len(indexed_changes), batch_size):
+            batches.append((indexed_changes[offset : offset + batch_size], None))
+
+    for (indexed_changes, _), batch_results in zip(
+        batches,
+        concurrency.map_concurrently(
+            func=lambda batch: _apply_batch(
+                client=client,
+                advertiser_id=advertiser_id,
+                changes=[change for _, change in batch[0]],
+                adgroup_id=batch[1],
+            ),
+            items=batches,
+            max_workers=max_workers,
+        ),
+    ):
+        for (index, _), action_result in zip(indexed_changes, batch_results):
+            action_results[index] = action_result
+
+    logger.warning(
+        "Applied structure changes (advertiser_id={}, count={}, failed={})".format(
+            advertiser_id,
+            len(action_results),
+            sum(
+                action_result.status == enums.ResultStatus.FAILED
+                for action_result in action_results
+            ),
+        )
+    )
+
+    return action_results
+
+
+def sync(
+    user_access_token: str,
+    advertiser_id: str,
+    campaigns: typing.List[typing.Dict],
+    max_workers: int = DEFAULT_MAX_WORKERS,
+) -> typing.List[results.ActionResult]:
+    """
+    Plans and applies the desired `campaigns` of an advertiser. See `plan` and
+    `apply`.
+    """
+    return apply(
+        user_access_token=user_access_token,
+        structure_plan=plan(
+            user_access_token=user_access_token,
+            advertiser_id=advertiser_id,
+            campaigns=campaigns,
+        ),
+        max_workers=max_workers,
+    )
+
+
+def _plan_entities(
+    structure_plan: plans.Plan,
+    resource_type: enums.ResourceType,
+    entities_details: typing.List[typing.Dict],
+    entities_state: typing.Dict[enums.ResourceType, typing.List[typing.Dict]],
+    parent_path: typing.Tuple[str, ...],
+    parent_id: typing.Optional[str],
+) -> None:
+    name_key = _NAME_KEYS[resource_type]
+    children_key, children_resource_type = _CHILDREN.get(resource_type, (None, None))
+    parent_id_key = _PARENT_ID_KEYS[resource_type]
+    existing_entities = collections.defaultdict(list)
+    if parent_id or not parent_id_key:
+        for entity_state in entities_state[resource_type]:
+            if not parent_id_key or entity_state[parent_id_key] == parent_id:
+                existing_entities[entity_state["name"]].append(entity_state)
+
+    for entity_details in entities_details:
+        name = entity_details.get(name_key)
+        if not name:
+            raise exceptions.ActionException(
+                "Desired {} has no name (path={}, {}={})".format(
+                    resource_type.value, parent_path, name_key, name
+                )
+            )
+
+        path = parent_path + (name,)
+        if len(existing_entities[name]) > 1:
+            raise exceptions.ActionException(
+                "Desired {} matches several existing entities (path={}, ids={})".format(
+                    resource_type.value,
+                    path,
+                    [entity_state["id"] for entity_state in existing_entities[name]],
+                )
+            )
+
+        entity_state = existing_entities[name][0] if existing_entities[name] else None
+        details = {
+            key: value for key, value in entity_details.items() if key != children_key
+        }
+        structure_plan.changes.extend(
+            _get_changes(
+                resource_type=resource_type,
+                path=path,
+                details=details,
+                entity_state=entity_state,
+            )
+        )
+        entity_id = entity_state["id"] if entity_state else None
+        if entity_id:
+            structure_plan.entity_ids[path] = entity_id
+
+        if children_key:
+            _plan_entities(
+                structure_plan=structure_plan,
+                resource_type=children_resource_type,
+                entities_details=entity_details.get(children_key, []),
+                entities_state=entities_state,
+                parent_path=path,
+                parent_id=entity_id,
+            )
+
+
+def _get_changes(
+    resource_type: enums.ResourceType,
+    path: typing.Tuple[str, ...],
+    details: typing.Dict,
+    entity_state: typing.Optional[typing.Dict],
+) -> typing.List[plans.Change]:
+    if not entity_state:
+        return [
+            plans.Change(
+                action=enums.ChangeAction.CREATE,
+                resource_type=resource_type,
+                path=path,
+                details=details,
+            )
+        ]
+
+    changes = []
+    changed_fields = [
+        field
+        for field in tiktok_client_constants.TIKTOK_RESOURCE_STATE_FIELDS[resource_type]
+        if field in details
+        and not _is_same_value(
+            value=details[field], state_value=entity_state.get(field)
+        )
+    ]
+    if changed_fields:
+        changes.append(
+            plans.Change(
+                action=enums.ChangeAction.UPDATE,
+                resource_type=resource_type,
+                path=path,
+                entity_id=entity_state["id"],
+                details={
+                    key: value
+                    for key, value in details.items()
+                    if key != "operation_status"
+                },
+                changed_fields=changed_fields,
+            )
+        )
+
+    operation_status = details.get("operation_status")
+    if operation_status and operation_status != entity_state["effective_status"]:
+        changes.append(
+            plans.Change(
+                action=enums.ChangeAction.UPDATE_STATUS,
+                resource_type=resource_type,
+                path=path,
+                entity_id=entity_state["id"],
+                details={"operation_status": operation_status},
+                changed_fields=["operation_status"],
+            )
+        )
+
+    return changes
+
+
+def _is_same_value(value: typing.Any, state_value: typing.Any) -> bool:
+    if (
+        isinstance(value, (int, float))
+        and not isinstance(value, bool)
+        and state_value is not None
+    ):
+        try:
+            return float(value) == float(state_value)
+        except (TypeError, ValueError):
+            return False
+
+    return value == state_value
+
+
+def _apply_change(
+    client: tiktok_client.TiktokClient,
+    advertiser_id: str,
+    change: plans.Change,
+    parent_id: typing.Optional[str],
+) -> results.ActionResult:
+    details = dict(change.details)
+    created = change.action == enums.ChangeAction.CREATE
+    updated = False
+    entity_id = change.entity_id
+    if change.resource_type == enums.ResourceType.AD_GROUP:
+        if not parent_id:
+            return _get_missing_parent_result(
+                advertiser_id=advertiser_id, change=change
+            )
+
+        details["campaign_id"] = parent_id
+
+    try:
+        if change.resource_type == enums.ResourceType.CAMPAIGN and created:
+            entity_id = client.create_campaign(
+                advertiser_id=advertiser_id, campaign_details=details
+            )
+        elif change.resource_type == enums.ResourceType.CAMPAIGN:
+            updated = client.update_campaign(
+                advertiser_id=advertiser_id,
+                campaign_id=entity_id,
+                campaign_details=details,
+            )
+        elif created:
+            entity_id = client.create_adgroup(
+                advertiser_id=advertiser_id, adgroup_details=details
+            )
+        else:
+            updated = client.update_adgroup(
+                advertiser_id=advertiser_id,
+                adgroup_id=entity_id,
+                adgroup_details=details,
+            )
+    except tiktok_client_exceptions.TiktokClientError as e:
+        return _get_failed_result(advertiser_id=advertiser_id, entity_id=entity_id, e=e)
+
+    return results.ActionResult(
+        advertiser_id=advertiser_id,
+        status=enums.ResultStatus.SUCCEEDED,
+        entity_id=entity_id,
+        created=created,
+        updated=updated,
+    )
+
+
+def _apply_batch(
+    client: tiktok_client.TiktokClient,
+    advertiser_id: str,
+    changes: typing.List[plans.Change],
+    adgroup_id: typing.Optional[str],
+) -> typing.List[results.ActionResult]:
+    if changes[0].action == enums.ChangeAction.UPDATE_STATUS:
+        return _apply_status_changes(
+            client=client, advertiser_id=advertiser_id, changes=changes
+        )
+
+    return _apply_ads_changes(
+        client=client,
+        advertiser_id=advertiser_id,
+        changes=changes,
+        adgroup_id=adgroup_id,
+    )
+
+
+def _apply_ads_changes(
+    client: tiktok_client.TiktokClient,
+    advertiser_id: str,
+    changes: typing.List[plans.Change],
+    adgroup_id: typing.Optional[str],
+) -> typing.List[results.ActionResult]:
+    """
+    Creates or updates the ads of one adgroup in a single request.
+    """
+    if not adgroup_id:
+        return [
+            _get_missing_parent_result(advertiser_id=advertiser_id, change=change)
+            for change in changes
+        ]
+
+    created = changes[0].action == enums.ChangeAction.CREATE
+    creatives = [
+        {**change.details, **({} if created else {"ad_id": change.entity_id})}
+        for change in changes
+    ]
+    try:
+        if created:
+            ad_ids = client.create_ads(
+                advertiser_id=advertiser_id,
+                adgroup_id=adgroup_id,
+                ad_details={"creatives": creatives},
+            )
+            updated = False
+        else:
+            ad_ids = [change.entity_id for change in changes]
+            updated = client.update_ads(
+                advertiser_id=advertiser_id,
+                adgroup_id=adgroup_id,
+                ad_details={"creatives": creatives},
+            )
+    except tiktok_client_exceptions.TiktokClientError as e:
+        return [
+            _get_failed_result(
+                advertiser_id=advertiser_id, entity_id=change.entity_id, e=e
+            )
+            for change in changes
+        ]
+
+    if len(ad_ids) != len(changes):
+        return _get_created_ads_results(
+            client=client,
+            advertiser_id=advertiser_id,
+            adgroup_id=adgroup_id,
+            changes=changes,
+        )
+
+    return [
+        results.ActionResult(
+            advertiser_id=advertiser_id,
+            status=enums.ResultStatus.SUCCEEDED,
+            entity_id=ad_id,
+            created=created,
+            updated=updated,
+        )
+        for ad_id in ad_ids
+    ]
+
+
+def _get_created_ads_results(
+    client: tiktok_client.TiktokClient,
+    advertiser_id: str,
+    adgroup_id: str,
+    changes: typing.List[plans.Change],
+) -> typing.List[results.ActionResult]:
+    """
+    Reads back the ads of the adgroup and matches them to the created ones by
+    name, when the response has not one ad id per creative. Ads that do not match
+    exactly one existing ad are reported as failed.
+    """
+    try:
+        ads_state = client.get_account_resource_state(
+            advertiser_id=advertiser_id, resource_type=enums.ResourceType.AD
+        )
+    except tiktok_client_exceptions.TiktokClientError as e:
+        return [
+            _get_failed_result(advertiser_id=advertiser_id, entity_id=None, e=e)
+            for _ in changes
+        ]
+
+    ad_ids_by_name = collections.defaultdict(list)
+    for ad_state in ads_state:
+        if ad_state["adgroup_id"] == adgroup_id:
+            ad_ids_by_name[ad_state["name"]].append(ad_state["id"])
+
+    action_results = []
+    for change in changes:
+        ad_ids = ad_ids_by_name[change.path[-1]]
+        if len(ad_ids) == 1:
+            action_results.append(
+                results.ActionResult(
+                    advertiser_id=advertiser_id,
+                    status=enums.ResultStatus.SUCCEEDED,
+                    entity_id=ad_ids[0],
+                    created=True,
+                )
+            )
+        else:
+            action_results.append(
+                results.ActionResult(
+                    advertiser_id=advertiser_id,
+                    status=enums.ResultStatus.FAILED,
+                    error_class=exceptions.ActionException.__name__,
+                    error_message="Created ad could not be matched by name (path={}, ad_ids={})".format(
+                        change.path, ad_ids
+                    ),
+                )
+            )
+
+    return action_results
+
+
+def _apply_status_changes(
+    client: tiktok_client.TiktokClient,
+    advertiser_id: str,
+    changes: typing.List[plans.Change],
+) -> typing.List[results.ActionResult]:
+    """
+    Sets the same status on entities of the same resource type in a single request.
+    """
+    resource_type = changes[0].resource_type
+    entity_ids = [change.entity_id for change in changes]
+    operation_status = changes[0].details["operation_status"]
+    try:
+        if resource_type == enums.ResourceType.CAMPAIGN:
+            updated = client.update_campaigns_status(
+                advertiser_id=advertiser_id,
+                campaigns_status_details={
+                    "campaign_ids": entity_ids,
+                    "operation_status": operation_status,
+                },
+            )
+        elif resource_type == enums.ResourceType.AD_GROUP:
+            updated = client.update_adgroups_status(
+                advertiser_id=advertiser_id,
+                adgroups_status_details={
+                    "adgroup_ids": entity_ids,
+                    "operation_status": operation_status,
+                },
+            )
+        else:
+            updated = client.update_ads_status(
+                advertiser_id=advertiser_id,
+                ads_status_details={
+                    "ad_ids": entity_ids,
+                    "operation_status": operation_status,
+                },
+            )
+    except tiktok_client_exceptions.TiktokClientError as e:
+        return [
+            _get_failed_result(advertiser_id=advertiser_id, entity_id=entity_id, e=e)
+            for entity_id in entity_ids
+        ]
+
+    return [
+        results.ActionResult(
+            advertiser_id=advertiser_id,
+            status=enums.ResultStatus.SUCCEEDED,
+            entity_id=entity_id,
+            updated=updated,
+        )
+        for entity_id in entity_ids
+    ]
+
+
+def _get_failed_result(
+    advertiser_id: str, entity_id: typing.Optional[str], e: Exception
+) -> results.ActionResult:
+    return results.ActionResult(
+        advertiser_id=advertiser_id,
+        status=enums.ResultStatus.FAILED,
+        entity_id=entity_id,
+        error_class=e.__class__.__name__,
+        error_message=utils.get_exception_message(exception=e),
+    )
+
+
+def _get_missing_parent_result(
+    advertiser_id: str, change: plans.Change
+) -> results.ActionResult:
+    return results.ActionResult(
+        advertiser_id=advertiser_id,
+        status=enums.ResultStatus.FAILED,
+        error_class=exceptions.ActionException.__name__,
+        error_message="Parent of {} was not created (path={})".format(
+            change.resource_type.value, change.path
+        ),
+    )
@@ -1,4 +1,5 @@
 import datetime
+import hashlib
 import json
 import typing
 
@@ -41,3 +42,23 @@ def convert_schema_list_and_dict_fields_to_json_string(
 
 def format_tiktok_date(date_start: datetime.datetime) -> str:
     return date_start.strftime("%Y-%m-%d")
+
+
+def get_data_hash(data: typing.Dict) -> str:
+    return hashlib.sha1(
+        json.dumps(data, sort_keys=True).encode(encoding="utf-8")
+    ).hexdigest()
+
+
+def get_shard_index(key: str, shards_count: int) -> int:
+    """
+    Assigns `key` to one of `shards_count` shards by rendezvous hashing, so
+    changing the number of shards only moves the keys of the added or removed
+    shards.
+    """
+    return max(
+        range(shards_count),
+        key=lambda shard_index: hashlib.sha1(
+            "{}:{}".format(shard_index, key).encode(encoding="utf-8")
+        ).digest(),
+    )